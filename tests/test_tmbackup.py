@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# tmbackup.py: içerik adresli depo ve cihaz bazında değişiklik takibi
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import tmbackup
+
+KARTAL = {"region": 5, "tm": "Kartal", "device": "Kyland-1"}
+PENDIK = {"region": 5, "tm": "Pendik", "device": "Kyland-1"}
+
+class ConfigStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.store = tmbackup.ConfigStore(self.root)
+
+    def test_identical_content_is_stored_once(self):
+        a = self.store.record("10.5.1.94", KARTAL, "hostname A\n", "2026-01-01 10:00:00")
+        b = self.store.record("10.5.2.94", PENDIK, "hostname A\n", "2026-01-01 10:00:00")
+        self.assertEqual(a[1], b[1])
+        objects = [f for _, _, files in os.walk(self.store.objects) for f in files]
+        self.assertEqual(len(objects), 1)
+        self.assertEqual(self.store.get(a[1]), "hostname A\n")
+
+    def test_status_transitions(self):
+        self.assertEqual(self.store.record("10.5.1.94", KARTAL, "v1", "2026-01-01 10:00:00")[0], tmbackup.NEW)
+        self.assertEqual(self.store.record("10.5.1.94", KARTAL, "v1", "2026-01-02 10:00:00")[0], tmbackup.SAME)
+        status, digest = self.store.record("10.5.1.94", KARTAL, "v2", "2026-01-03 10:00:00")
+        self.assertEqual(status, tmbackup.CHANGED)
+        entry = self.store.index["10.5.1.94"]
+        self.assertEqual(self.store.get(entry["previous"]), "v1")
+        self.assertEqual((entry["hash"], entry["changed"]), (digest, "2026-01-03 10:00:00"))
+
+    def test_changes_are_tracked_per_device(self):
+        self.store.record("10.5.1.94", KARTAL, "v1", "2026-01-01 10:00:00")
+        self.store.record("10.5.2.94", PENDIK, "v1", "2026-01-01 10:00:00")
+        self.store.record("10.5.2.94", PENDIK, "v2", "2026-01-02 10:00:00")
+        # Sadece Kartal'ı kapsayan sonraki toplama Pendik'in değişikliğini gizlemez
+        self.store.record("10.5.1.94", KARTAL, "v1", "2026-01-03 10:00:00")
+        changed = self.store.changed_in_last_collection()
+        self.assertEqual([ip for ip, _ in changed], ["10.5.2.94"])
+        self.assertEqual(self.store.changed_in_last_collection({"10.5.1.94"}), [])
+        self.assertEqual(self.store.last_collection(), "2026-01-03 10:00:00")
+
+    def test_same_second_collection_is_not_reported_as_change(self):
+        self.store.record("10.5.1.94", KARTAL, "v1", "2026-01-01 10:00:00")
+        self.store.record("10.5.1.94", KARTAL, "v1", "2026-01-01 10:00:00")
+        self.assertEqual(self.store.changed_in_last_collection(), [])
+
+    def test_index_round_trip(self):
+        self.store.record("10.5.1.94", KARTAL, "v1", "2026-01-01 10:00:00")
+        self.store.save_index()
+        store = tmbackup.ConfigStore(self.root)
+        self.assertIsNone(store.broken_index)
+        self.assertEqual(store.index, self.store.index)
+        self.assertEqual([ip for ip, _ in store.changed_in_last_collection()], ["10.5.1.94"])
+
+    def test_corrupt_index_starts_empty_and_is_set_aside(self):
+        digest = self.store.record("10.5.1.94", KARTAL, "v1", "2026-01-01 10:00:00")[1]
+        self.store.save_index()
+        with open(self.store.index_path, "r+", encoding="utf-8") as f:
+            f.truncate(10)  # Yarım kalmış yazma
+        store = tmbackup.ConfigStore(self.root)
+        self.assertEqual(store.index, {})
+        self.assertEqual(store.broken_index, store.index_path + ".bozuk")
+        self.assertTrue(os.path.exists(store.broken_index))
+        self.assertEqual(store.get(digest), "v1")  # Nesneler etkilenmez
+        self.assertEqual(store.record("10.5.1.94", KARTAL, "v1", "2026-01-02 10:00:00")[0], tmbackup.NEW)
+        store.save_index()
+        self.assertIsNone(tmbackup.ConfigStore(self.root).broken_index)
+
+if __name__ == "__main__":
+    unittest.main()
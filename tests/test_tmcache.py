@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# tmcache.py: komut çıktısı önbelleği (TTL, LRU, --refresh)
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import tmcache
+
+DAY = 24 * 3600
+T0 = 1_700_000_000.0
+
+class OutputCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.root = os.path.join(tempfile.mkdtemp(), "onbellek")
+        self.addCleanup(shutil.rmtree, os.path.dirname(self.root))
+
+    def cache(self, **kwargs):
+        return tmcache.OutputCache(self.root, **kwargs)
+
+    def test_entry_expires_after_ttl(self):
+        cache = self.cache()
+        cache.put("10.5.1.94", "show vlan brief", "VLAN 100", now=T0)
+        self.assertEqual(cache.get("10.5.1.94", "show vlan brief", now=T0 + DAY - 1), ("VLAN 100", DAY - 1))
+        self.assertIsNone(cache.get("10.5.1.94", "show vlan brief", now=T0 + DAY + 1))
+        self.assertIsNone(cache.get("10.5.2.94", "show vlan brief", now=T0))
+
+    def test_zero_ttl_commands_are_not_stored(self):
+        cache = self.cache()
+        cache.put("10.5.1.94", "show clock", "12:00", now=T0)
+        cache.put("10.5.1.94", "show running-config", "hostname A", now=T0)  # Listede yok: TTL 0
+        self.assertIsNone(cache.get("10.5.1.94", "show clock", now=T0))
+        self.assertEqual(cache.index, {})
+        self.assertFalse(os.path.exists(self.root))
+
+    def test_command_is_normalized_for_key_and_ttl(self):
+        cache = self.cache()
+        cache.put("10.5.1.94", "show ver", "v1", now=T0)
+        self.assertEqual(cache.get("10.5.1.94", " Show  Ver ", now=T0 + 6 * DAY), ("v1", 6 * DAY))
+        cache.put("10.5.1.94", "SHOW VER", "v2", now=T0 + DAY)
+        self.assertEqual(len(cache.index), 1)
+        self.assertEqual(next(iter(cache.index.values()))["command"], "show ver")
+        self.assertEqual(cache.get("10.5.1.94", "show ver", now=T0 + DAY)[0], "v2")
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = self.cache(max_bytes=10)
+        cache.put("10.5.1.94", "show ver", "aaaa", now=T0)
+        cache.put("10.5.2.94", "show ver", "bbbb", now=T0 + 1)
+        cache.get("10.5.1.94", "show ver", now=T0 + 2)  # İlk kayıt yeniden kullanıldı
+        cache.put("10.5.3.94", "show ver", "cccc", now=T0 + 3)
+        self.assertIsNotNone(cache.get("10.5.1.94", "show ver", now=T0 + 4))
+        self.assertIsNone(cache.get("10.5.2.94", "show ver", now=T0 + 4))
+        self.assertIsNotNone(cache.get("10.5.3.94", "show ver", now=T0 + 4))
+        self.assertEqual(sorted(f for f in os.listdir(self.root) if f.endswith(".txt")),
+                         sorted(key + ".txt" for key in cache.index))
+
+    def test_refresh_skips_reads_but_stores_new_output(self):
+        self.cache().put("10.5.1.94", "show ver", "eski", now=T0)
+        cache = self.cache(refresh=True)
+        self.assertIsNone(cache.get("10.5.1.94", "show ver", now=T0 + 1))
+        cache.put("10.5.1.94", "show ver", "yeni", now=T0 + 2)
+        self.assertEqual(self.cache().get("10.5.1.94", "show ver", now=T0 + 3), ("yeni", 1))
+
+    def test_last_use_survives_reload(self):
+        cache = self.cache()
+        cache.put("10.5.1.94", "show ver", "v1", now=T0)
+        cache.get("10.5.1.94", "show ver", now=T0 + 60)
+        cache.save()
+        entry = next(iter(self.cache().index.values()))
+        self.assertEqual(entry["used"], T0 + 60)
+
+if __name__ == "__main__":
+    unittest.main()
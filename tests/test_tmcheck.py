@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# tmcheck.py: parçalı tarama bölüşümü ve rapor birleştirme
+
+import contextlib
+import csv
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import tmcheck
+
+from tests.test_tmscan import make_tm
+
+HEADER = "Bolge_No,TM_Adi,TM_Tipi,TM_Prefix,Cihaz_Adi,Cihaz_IP,Ping_Durumu,Web_Port_Durumu"
+
+def inventory():
+    tms = []
+    for region in (3, 5, 7):
+        for i in range(1, 6):
+            tms.append(make_tm(f"TM{region}-{i}", region=region, ip=f"10.{region}.{i}.93", kyland=i % 4 + 1, c3530=i % 3))
+    return tms
+
+class ShardTest(unittest.TestCase):
+    def test_shards_are_disjoint_and_cover_selection(self):
+        tms = inventory()
+        for total in (1, 2, 3, 4, len(tms) + 2):
+            shards = [tmcheck.select_shard(tms, i, total) for i in range(1, total + 1)]
+            ids = [id(tm) for shard in shards for tm in shard]
+            self.assertEqual(len(ids), len(set(ids)))
+            self.assertEqual(sorted(ids), sorted(id(tm) for tm in tms))
+            for shard in shards:  # Parça içinde envanter sırası korunur
+                self.assertEqual(shard, [tm for tm in tms if tm in shard])
+
+    def test_shards_are_balanced_and_deterministic(self):
+        tms = inventory()
+        loads = [sum(len(tm['plan']) for tm in tmcheck.select_shard(tms, i, 3)) for i in (1, 2, 3)]
+        self.assertLessEqual(max(loads) - min(loads), max(len(tm['plan']) for tm in tms))
+        self.assertEqual([tm['name'] for tm in tmcheck.select_shard(list(reversed(tms)), 2, 3)],
+                         [tm['name'] for tm in reversed(tmcheck.select_shard(tms, 2, 3))])
+
+class MergeTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.output = os.path.join(self.root, "TM_Rapor_birlesik.csv")
+
+    def report(self, name, shard, rows):
+        path = os.path.join(self.root, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(HEADER + "\n")
+            f.write(f"# parca: {shard}\n")
+            for row in rows:
+                f.write(row + "\n")
+            f.write("# bitis: 2026-01-01T10:00:00\n")
+        return path
+
+    def merge(self, paths):
+        out = io.StringIO()
+        with mock.patch.object(tmcheck, "CSV_FILENAME", self.output), contextlib.redirect_stdout(out):
+            tmcheck.merge_reports(paths)
+        with open(self.output, encoding="utf-8") as f:
+            return list(csv.reader(f)), out.getvalue()
+
+    def test_duplicates_dropped_with_one_warning_and_canonical_order(self):
+        kartal = ["5,Kartal,OTOMASYONLU,10.5.1,Sdwan,10.5.1.97,SUCCESS,N/A",
+                  "5,Kartal,OTOMASYONLU,10.5.1,Kyland-1,10.5.1.94,FAILED,N/A"]
+        first = self.report("p1.csv", "1/3", ["7,Avcilar,KLASIK,10.7.1,Sdwan,10.7.1.97,SUCCESS,N/A"] + kartal)
+        second = self.report("p2.csv", "2/3", ["3,Bagcilar,OTOMASYONLU,10.3.1,Sdwan,10.3.1.97,FAILED,N/A"]
+                             + [row.replace("FAILED", "SUCCESS") for row in kartal])
+        third = self.report("p3.csv", "3/3", kartal + ["5,Pendik,OTOMASYONLU,10.5.2,Sdwan,10.5.2.97,SUCCESS,N/A"])
+        rows, out = self.merge([first, second, third])
+
+        self.assertEqual(rows[0], HEADER.split(","))
+        self.assertEqual([(r[0], r[1], r[4]) for r in rows[1:]], [
+            ("3", "Bagcilar", "Sdwan"), ("5", "Kartal", "Sdwan"), ("5", "Kartal", "Kyland-1"),
+            ("5", "Pendik", "Sdwan"), ("7", "Avcilar", "Sdwan")])
+        self.assertEqual(rows[3][6], "FAILED")  # İlk raporun kaydı kullanılır
+        self.assertEqual(out.count("birden fazla raporda var"), 1)
+        self.assertIn("PARÇALAR:", out)
+        self.assertNotIn("EKSİK", out)
+
+    def test_missing_shard_is_reported(self):
+        first = self.report("p1.csv", "1/2", ["5,Kartal,OTOMASYONLU,10.5.1,Sdwan,10.5.1.97,SUCCESS,N/A"])
+        rows, out = self.merge([first])
+        self.assertEqual(len(rows), 2)
+        self.assertIn("EKSİK: 2", out)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# tmfilter.py: --filter sorgu dili (tokenizer, parser, index'li seçim)
+
+import unittest
+
+import tmfilter
+from tmcheck import normalize_text
+from tmfilter import FilterError, compile_query
+
+def tm(region, name, ip, kyland=1, c3530=0, vlan=100):
+    last = ip.rsplit(".", 1)[1]
+    return {"region": region, "name": name, "ip": ip, "type": "OTOMASYONLU" if last == "93" else "KLASİK",
+            "prefix": ip.rsplit(".", 1)[0], "c3530": c3530, "cKyland": kyland, "mgmt_vlan": vlan}
+
+DB = [
+    tm(3, "Bağcılar", "10.3.1.93", kyland=3, c3530=2),
+    tm(3, "Bağcılar GIS", "10.3.2.66", kyland=2, vlan=101),
+    tm(5, "Ataköy", "10.5.1.66", c3530=2),
+    tm(5, "Kartal", "10.5.2.93"),
+    tm(7, "Şile", "10.7.1.93", kyland=2),
+]
+
+class TokenizeTest(unittest.TestCase):
+    def test_quoted_and_unquoted_values(self):
+        self.assertEqual(tmfilter._tokenize('name="Kartal"'),
+                         [("word", "name", 1), ("op", "=", 5), ("str", "Kartal", 7)])
+        self.assertEqual(tmfilter._tokenize("name~'GIS'"),
+                         [("word", "name", 1), ("op", "~", 5), ("str", "GIS", 7)])
+        self.assertEqual(tmfilter._tokenize("name~GIS"),
+                         [("word", "name", 1), ("op", "~", 5), ("word", "GIS", 6)])
+
+    def test_quoted_value_keeps_spaces_and_operators(self):
+        tokens = tmfilter._tokenize('name = "Bağcılar GIS" and ip!="a=b"')
+        self.assertIn(("str", "Bağcılar GIS", 9), tokens)
+        self.assertIn(("str", "a=b", 32), tokens)
+
+    def test_two_character_operators(self):
+        ops = [v for k, v, _ in tmfilter._tokenize("a>=1 b<=2 c!=3 d!~x e==4") if k == "op"]
+        self.assertEqual(ops, [">=", "<=", "!=", "!~", "=="])
+
+    def test_unexpected_character(self):
+        with self.assertRaisesRegex(FilterError, r"konum 6"):
+            tmfilter._tokenize('name="Kartal')
+
+class QueryTest(unittest.TestCase):
+    def setUp(self):
+        self.inventory = tmfilter.Inventory(DB, normalize_text)
+
+    def names(self, query):
+        return [t["name"] for t in self.inventory.select(compile_query(query, normalize_text))]
+
+    def test_quoted_equality_and_contains(self):
+        self.assertEqual(self.names('name="Kartal"'), ["Kartal"])
+        self.assertEqual(self.names('name~"GIS"'), ["Bağcılar GIS"])
+        self.assertEqual(self.names("name~'gıs'"), ["Bağcılar GIS"])
+        self.assertEqual(self.names('name="Bağcılar GIS"'), ["Bağcılar GIS"])
+
+    def test_unquoted_values_and_turkish_folding(self):
+        self.assertEqual(self.names("name=kartal"), ["Kartal"])
+        self.assertEqual(self.names("name~bagcilar"), ["Bağcılar", "Bağcılar GIS"])
+        self.assertEqual(self.names("ad=sile"), ["Şile"])
+        self.assertEqual(self.names("name!~bagcilar and region<7"), ["Ataköy", "Kartal"])
+
+    def test_in_and_not_in(self):
+        self.assertEqual(self.names("region in (3,5)"), ["Bağcılar", "Bağcılar GIS", "Ataköy", "Kartal"])
+        self.assertEqual(self.names("region not in (3, 5)"), ["Şile"])
+        self.assertEqual(self.names('name in ("Kartal", \'Ataköy\')'), ["Ataköy", "Kartal"])
+
+    def test_numeric_and_type_fields(self):
+        self.assertEqual(self.names("cKyland>=2"), ["Bağcılar", "Bağcılar GIS", "Şile"])
+        self.assertEqual(self.names("type=OTOMASYONLU and c3530>0"), ["Bağcılar"])
+        self.assertEqual(self.names("vlan=101"), ["Bağcılar GIS"])
+        self.assertEqual(self.names("tip=klasik"), ["Bağcılar GIS", "Ataköy"])
+
+    def test_or_not_and_parentheses(self):
+        self.assertEqual(self.names("region=7 or name=kartal"), ["Kartal", "Şile"])
+        self.assertEqual(self.names("not region=3"), ["Ataköy", "Kartal", "Şile"])
+        self.assertEqual(self.names("not (region=3 or region=5)"), ["Şile"])
+        self.assertEqual(self.names("(region=3 or region=7) and cKyland=2"), ["Bağcılar GIS", "Şile"])
+        # and, or'dan önce bağlar
+        self.assertEqual(self.names("region=7 or region=3 and cKyland=3"), ["Bağcılar", "Şile"])
+
+    def test_keywords_are_case_insensitive(self):
+        self.assertEqual(self.names("region IN (7) AND NOT cKyland=1"), ["Şile"])
+
+    def test_index_candidates_match_full_scan(self):
+        for query in ("region in (3,5) and cKyland>=2", "ip=10.5.2.93", "region=3 or name~ata", "not region=5"):
+            node = compile_query(query, normalize_text)
+            full = [t["name"] for pos, t in enumerate(DB) if node.matches(self.inventory.rows[pos])]
+            self.assertEqual(self.names(query), full, query)
+
+class ErrorTest(unittest.TestCase):
+    def error(self, query):
+        with self.assertRaises(FilterError) as ctx:
+            compile_query(query)
+        return str(ctx.exception)
+
+    def test_messages(self):
+        self.assertEqual(self.error(""), "Boş filtre ifadesi.")
+        self.assertIn("Bilinmeyen alan 'colour'", self.error("colour=red"))
+        self.assertIn("sayısal değer bekliyor", self.error("region=abc"))
+        self.assertIn("'~' operatörü sayısal 'region'", self.error("region~3"))
+        self.assertIn("'>' operatörü metin alanı 'name'", self.error("name>a"))
+        self.assertEqual(self.error("region=3 and"), "İfade beklenmedik şekilde bitti.")
+        self.assertEqual(self.error("region=3 region=5"), "Beklenmeyen 'region' (konum 10).")
+        self.assertIn("operatör bekleniyordu (konum 8)", self.error("region 3"))
+        self.assertEqual(self.error("(region=3"), "İfade beklenmedik şekilde bitti.")
+        self.assertEqual(self.error("region in (3 5)"), "Beklenmeyen '5' (konum 14).")
+        self.assertIn("Değer bekleniyordu, '(' bulundu", self.error("name=("))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# tmgovernor.py: kayıp / gecikme tabanlı geri çekilme ve global eşzamanlılık sınırı
+
+import threading
+import unittest
+from unittest import mock
+
+import tmgovernor
+import tmprobe
+from tmgovernor import Governor
+
+REGIONS = {"10.5.1": 5, "10.5.2": 5}
+
+def answered(received=1, sent=1, rtt=2.0):
+    loss = int(round(100.0 * (sent - received) / sent))
+    return tmprobe.PingStats(sent, received, loss, rtt, rtt, rtt, 0.0, None)
+
+class ObserveTest(unittest.TestCase):
+    def setUp(self):
+        self.governor = Governor(REGIONS, region_rate=20)
+        with self.governor.slot("10.5.1.1"):  # Bölge kovası ilk probda oluşur
+            pass
+
+    def rate(self):
+        return self.governor.region_rates()[5][0]
+
+    def observe_all(self, stats, ips=("10.5.1.1", "10.5.2.1")):
+        # Her gözlemde ADJUST_COOLDOWN dolmuş say
+        for i in range(20):
+            with mock.patch("time.monotonic", return_value=1000.0 + i * tmgovernor.ADJUST_COOLDOWN):
+                self.governor.observe(ips[i % len(ips)], stats)
+
+    def test_dead_devices_do_not_throttle(self):
+        self.observe_all(tmprobe.failed_stats(1))
+        self.assertEqual(self.rate(), 20)
+        self.assertEqual(self.governor.backoffs, 0)
+        self.assertEqual(self.governor.region_rates()[5][1], 0.0)
+
+    def test_single_packet_timeouts_of_live_devices_throttle(self):
+        # Varsayılan rapor: cihaz başına 1 paket, kayıp received=0 olarak görünür
+        self.observe_all(tmprobe.failed_stats(1), ips=("10.5.1.1", "10.5.1.2"))
+        self.assertEqual(self.governor.backoffs, 0)
+        for i in range(20):
+            with mock.patch("time.monotonic", return_value=1000.0 + i * tmgovernor.ADJUST_COOLDOWN):
+                self.governor.observe("10.5.1.1", tmprobe.failed_stats(1), expected=True)
+        self.assertGreater(self.governor.backoffs, 0)
+        self.assertLess(self.rate(), 20)
+
+    def test_timeout_after_earlier_answer_throttles(self):
+        self.governor.observe("10.5.1.1", answered())
+        self.governor.observe("10.5.2.1", answered())
+        self.observe_all(tmprobe.failed_stats(1))  # Bu taramada cevap vermişlerdi
+        self.assertGreater(self.governor.backoffs, 0)
+        self.assertLess(self.rate(), 20)
+
+    def test_partial_loss_throttles(self):
+        self.observe_all(answered(received=2, sent=4))
+        self.assertGreater(self.governor.backoffs, 0)
+        self.assertLess(self.rate(), 20)
+        self.assertGreaterEqual(self.rate(), tmgovernor.MIN_REGION_RATE)
+
+    def test_rtt_inflation_throttles(self):
+        self.governor.observe("10.5.1.1", answered(rtt=2.0))  # Prefix taban RTT'si
+        self.observe_all(answered(rtt=200.0), ips=("10.5.1.1",))
+        self.assertGreater(self.governor.backoffs, 0)
+
+    def test_rate_recovers_when_clean(self):
+        self.observe_all(answered(received=1, sent=4))
+        slowed = self.rate()
+        self.observe_all(answered())
+        self.assertGreater(self.rate(), slowed)
+
+class InflightTest(unittest.TestCase):
+    def test_cap_is_independent_of_workers(self):
+        governor = Governor(REGIONS, region_rate=1000, prefix_rate=1000, max_inflight=2)
+        inside = threading.Semaphore(0)
+        release = threading.Event()
+
+        def probe():
+            with governor.slot("10.5.1.1"):
+                inside.release()
+                release.wait(5)
+
+        threads = [threading.Thread(target=probe) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for _ in range(2):
+            self.assertTrue(inside.acquire(timeout=5))
+        # Üçüncü prob sınır nedeniyle bekler
+        self.assertFalse(inside.acquire(timeout=0.2))
+        release.set()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(governor.max_inflight, 2)
+
+if __name__ == "__main__":
+    unittest.main()
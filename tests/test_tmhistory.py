@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# tmhistory.py: şema, toplu yazma ve trend sorguları
+
+import os
+import tempfile
+import unittest
+
+import tmhistory
+import tmprobe
+
+TM = {"region": 5, "name": "Kartal", "type": "OTOMASYONLU", "prefix": "10.5.1"}
+
+def stats(ok=True, loss=0):
+    if not ok:
+        return tmprobe.failed_stats(1)
+    return tmprobe.PingStats(4, 4, loss, 1.0, 2.0, 3.0, 0.5, 0.7)
+
+class StoreTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fd)
+        os.unlink(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def columns(self, conn):
+        return [row[1] for row in conn.execute("PRAGMA table_info(results)")]
+
+    def test_new_store_has_current_schema(self):
+        conn = tmhistory.open_store(self.path)
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], tmhistory.SCHEMA_VERSION)
+        self.assertEqual(sorted(self.columns(conn)), sorted(tmhistory.RESULT_COLUMNS))
+        conn.close()
+
+class QueryTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = tmhistory.open_store(":memory:")
+        self.ts = [tmhistory.since_ts(0.01 * (10 - i)) for i in range(6)]  # Son birkaç saat, artan sırada
+        rows = []
+        # Sdwan: OK, FAIL, FAIL, OK, FAIL, FAIL (son kesinti devam ediyor)
+        for ts, ok in zip(self.ts, (1, 0, 0, 1, 0, 0)):
+            rows.append(tmhistory.make_row(TM, "Sdwan", "10.5.1.1", ok, "N/A", stats(ok), ts=ts))
+        for ts in self.ts:
+            rows.append(tmhistory.make_row(TM, "Kyland-1", "10.5.1.21", True, "N/A", stats(), ts=ts))
+        other = dict(TM, name="Pendik")
+        for ts in self.ts[:2]:
+            rows.append(tmhistory.make_row(other, "Sdwan", "10.5.2.1", True, "N/A", stats(), ts=ts))
+        self.run_id = tmhistory.save_run(self.conn, {"started": self.ts[0], "mode": "report"}, rows)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_save_run_writes_all_rows_with_run_id(self):
+        count, runs = self.conn.execute("SELECT COUNT(*), COUNT(DISTINCT run_id) FROM results").fetchone()
+        self.assertEqual((count, runs), (14, 1))
+        self.assertEqual(self.conn.execute("SELECT id, mode FROM runs").fetchall(), [(self.run_id, "report")])
+
+    def test_ping_measurements_are_stored(self):
+        row = self.conn.execute(
+            "SELECT loss, rtt_min, rtt_avg, rtt_max, rtt_mdev, jitter FROM results WHERE device = 'Kyland-1' LIMIT 1"
+        ).fetchone()
+        self.assertEqual(row, (0, 1.0, 2.0, 3.0, 0.5, 0.7))
+
+    def test_make_row_without_measurements(self):
+        row = tmhistory.make_row(TM, "Sdwan", "10.5.1.1", False, "N/A", inferred=True, ts=self.ts[0])
+        self.assertEqual(len(row), len(tmhistory.RESULT_COLUMNS) - 1)
+        self.assertEqual(row[-1], 1)
+        self.assertTrue(all(v is None for v in row[9:-1]))
+
+    def test_availability(self):
+        result = {r[0]: r for r in tmhistory.availability(self.conn, "Kartal")}
+        self.assertEqual(result["Sdwan"][1:4], (6, 2, 100.0 * 2 / 6))
+        self.assertEqual(result["Sdwan"][4:], (self.ts[-1], False))
+        self.assertEqual(result["Kyland-1"][1:3], (6, 6))
+        only = tmhistory.availability(self.conn, "Kartal", device="Kyland-1")
+        self.assertEqual([r[0] for r in only], ["Kyland-1"])
+
+    def test_outages(self):
+        windows = tmhistory.outages(self.conn, "Kartal")
+        self.assertEqual(windows, [
+            ("Sdwan", self.ts[1], self.ts[3], 2),
+            ("Sdwan", self.ts[4], None, 2),
+        ])
+        self.assertEqual(tmhistory.outages(self.conn, "Pendik"), [])
+
+    def test_worst_tms(self):
+        worst = tmhistory.worst_tms(self.conn)
+        self.assertEqual(list(worst), [5])
+        self.assertEqual(worst[5], [("Kartal", 12, 4, 100.0 * 8 / 12)])  # Pendik hatasız, listede yok
+        self.assertEqual(tmhistory.worst_tms(self.conn, region=3), {})
+
+    def test_days_window_excludes_old_rows(self):
+        old = tmhistory.make_row(TM, "Sdwan", "10.5.1.1", False, "N/A", ts="2000-01-01 00:00:00")
+        tmhistory.save_run(self.conn, {"started": "2000-01-01 00:00:00"}, [old])
+        self.assertEqual(tmhistory.availability(self.conn, "Kartal", "Sdwan")[0][1], 6)
+        self.assertEqual(tmhistory.availability(self.conn, "Kartal", "Sdwan", days=None)[0][1], 7)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# tmprobe.py: ping çıktısı ayrıştırma ve web kontrolü durum eşlemesi
+
+import socket
+import threading
+import unittest
+from unittest import mock
+
+import tmprobe
+import tmscan
+
+PING_OK = """PING 10.5.1.1 (10.5.1.1) 56(84) bytes of data.
+64 bytes from 10.5.1.1: icmp_seq=1 ttl=64 time=1.00 ms
+64 bytes from 10.5.1.1: icmp_seq=2 ttl=64 time=3.00 ms
+64 bytes from 10.5.1.1: icmp_seq=4 ttl=64 time=2.00 ms
+
+--- 10.5.1.1 ping statistics ---
+4 packets transmitted, 3 received, 25% packet loss, time 603ms
+rtt min/avg/max/mdev = 1.000/2.000/3.000/0.816 ms
+"""
+
+PING_DOWN = """PING 10.5.1.1 (10.5.1.1) 56(84) bytes of data.
+
+--- 10.5.1.1 ping statistics ---
+1 packets transmitted, 0 received, 100% packet loss, time 0ms
+"""
+
+class ParsePingTest(unittest.TestCase):
+    def test_partial_loss(self):
+        stats = tmprobe.parse_ping(PING_OK, 4)
+        self.assertTrue(stats.ok)
+        self.assertEqual((stats.sent, stats.received, stats.loss), (4, 3, 25))
+        self.assertEqual((stats.rtt_min, stats.rtt_avg, stats.rtt_max, stats.rtt_mdev), (1.0, 2.0, 3.0, 0.816))
+        self.assertAlmostEqual(stats.jitter, 1.5)  # |3-1|, |2-3|
+
+    def test_no_reply(self):
+        stats = tmprobe.parse_ping(PING_DOWN, 1)
+        self.assertFalse(stats.ok)
+        self.assertEqual(stats, tmprobe.failed_stats(1))
+
+    def test_missing_summary_uses_reply_lines(self):
+        lines = PING_OK.split("\n--- ")[0]
+        stats = tmprobe.parse_ping(lines, 4)
+        self.assertEqual((stats.sent, stats.received, stats.loss), (4, 3, 25))
+        self.assertEqual((stats.rtt_min, stats.rtt_avg, stats.rtt_max), (1.0, 2.0, 3.0))
+
+    def test_busybox_summary_and_sub_ms_rtt(self):
+        output = ("64 bytes from 10.5.1.1: seq=0 ttl=64 time<1 ms\n"
+                  "2 packets transmitted, 2 packets received, 0% packet loss\n")
+        stats = tmprobe.parse_ping(output, 2)
+        self.assertEqual((stats.sent, stats.received, stats.loss), (2, 2, 0))
+        self.assertEqual(stats.rtt_min, 1.0)
+
+    def test_empty_output(self):
+        self.assertFalse(tmprobe.parse_ping("", 3).ok)
+
+class Server:
+    """Yerel test sunucusu: her bağlantıda handler(conn) çalıştırır."""
+
+    def __init__(self, handler):
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(4)
+        self.port = self.sock.getsockname()[1]
+        self.handler = handler
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        try:
+            conn, _ = self.sock.accept()
+        except OSError:
+            return
+        with conn:
+            self.handler(conn)
+
+    def close(self):
+        self.sock.close()
+
+def reply(data):
+    def handler(conn):
+        conn.recv(1024)
+        conn.sendall(data)
+    return handler
+
+class WebCheckTest(unittest.TestCase):
+    def check(self, scheme, handler=None, timeout=tmprobe.WEB_TIMEOUT):
+        if handler is None:
+            # Kapalı port: bağlanıp hemen bırakılan bir port numarası
+            probe = socket.socket()
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+            probe.close()
+        else:
+            server = Server(handler)
+            self.addCleanup(server.close)
+            port = server.port
+        with mock.patch.dict(tmprobe.WEB_PORTS, {scheme: port}):
+            return tmprobe.web_check("127.0.0.1", scheme, timeout=timeout)
+
+    def test_http_ok(self):
+        web = self.check("HTTP", reply(b"HTTP/1.1 302 Found\r\n\r\n"))
+        self.assertEqual((web.state, web.code), ("OK", 302))
+        self.assertIsNotNone(web.connect_ms)
+        self.assertIsNotNone(web.ttfb_ms)
+        self.assertIsNone(web.tls_ms)
+        self.assertEqual(tmscan.web_status("HTTP", web), "HTTP_OK (302)")
+
+    def test_closed_port(self):
+        web = self.check("HTTP")
+        self.assertEqual(web, tmprobe.WebStats("KAPALI", None, None, None, None))
+        self.assertEqual(tmscan.web_status("HTTP", web), "HTTP_KAPALI (Ping Var)")
+
+    def test_no_http_answer(self):
+        web = self.check("HTTP", reply(b"SSH-2.0-OpenSSH\r\n"))
+        self.assertEqual(web.state, "YANIT_YOK")
+        self.assertIsNotNone(web.connect_ms)
+
+    def test_silent_server_times_out(self):
+        web = self.check("HTTP", lambda conn: conn.recv(1024) and threading.Event().wait(1), timeout=0.3)
+        self.assertEqual(web.state, "YANIT_YOK")
+
+    def test_tls_failure(self):
+        web = self.check("HTTPS", reply(b"not a tls server\r\n" * 4))
+        self.assertEqual(web.state, "TLS_HATA")
+        self.assertEqual(tmscan.web_status("HTTPS", web), "HTTPS_TLS_HATA (Ping Var)")
+
+if __name__ == "__main__":
+    unittest.main()
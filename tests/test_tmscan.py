@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+# tmscan.py: Scanner prob akışı (problar sahte, ağa çıkılmaz)
+
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+import tmprobe
+import tmscan
+from tmtopology import compile_plan
+
+def make_tm(name="Kartal", region=5, ip="10.5.1.93", kyland=2, c3530=1):
+    tm = {"region": region, "name": name, "ip": ip, "type": "OTOMASYONLU", "prefix": ip.rsplit(".", 1)[0],
+          "cKyland": kyland, "c3530": c3530, "mgmt_vlan": 100}
+    tm["plan"] = compile_plan(tm)
+    return tm
+
+def ok_stats():
+    return tmprobe.PingStats(1, 1, 0, 1.0, 1.0, 1.0, 0.0, None)
+
+class FakeScanner(tmscan.Scanner):
+    """Problar ağ yerine 'down' kümesine göre cevap verir ve çağrılar kaydedilir."""
+
+    def __init__(self, options=None, down=(), **kwargs):
+        super().__init__(options, **kwargs)
+        self.down = set(down)
+        self.calls = []
+        self.expected = {}
+        self.calls_lock = threading.Lock()
+
+    def record(self, kind, ip):
+        with self.calls_lock:
+            self.calls.append((kind, ip))
+
+    def ping(self, ip, expected=False):
+        self.record("ping", ip)
+        self.expected[ip] = expected
+        return tmprobe.failed_stats(1) if ip in self.down else ok_stats()
+
+    def port(self, ip, port):
+        self.record("port", ip)
+        return True
+
+    def web(self, ip, check):
+        self.record("web", ip)
+        return tmprobe.WebStats("OK", 200, 1.0, 1.0 if check == "HTTPS" else None, 1.0)
+
+    def probed(self, kind):
+        return [ip for k, ip in self.calls if k == kind]
+
+class WebGatingTest(unittest.TestCase):
+    def test_web_only_for_devices_that_answered(self):
+        tm = make_tm(kyland=3)
+        ulak = next(p for p in tm['plan'] if p.name == "ULAK_Sanal")
+        kyland2 = next(p for p in tm['plan'] if p.name == "Kyland-2")
+        scanner = FakeScanner(tmscan.ScanOptions(checks=("ping", "web")), down={kyland2.ip})
+        results = list(scanner.scan([tm]))
+        self.assertEqual([r.name for r in results], [p.name for p in tm['plan']])
+        by_name = {r.name: r for r in results}
+        # Kyland-2 cevap vermedi: web kontrolü yok, zincirdeki Kyland-3 atlandı
+        self.assertNotIn(kyland2.ip, scanner.probed("web"))
+        self.assertEqual(by_name["Kyland-3"].skipped, tmscan.GATED)
+        self.assertEqual(by_name["SEL3555(O)"].web_stat, "HTTPS_OK (200)")
+        self.assertEqual(sorted(scanner.probed("web")),
+                         sorted(r.ip for r in results if r.probed and r.ok and r.check != "PING"))
+
+        scanner = FakeScanner(tmscan.ScanOptions(checks=("ping", "web")), down={ulak.ip})
+        results = list(scanner.scan([tm]))
+        self.assertEqual(scanner.probed("web"), [])  # Altyapı düştü: hiçbir web denemesi yapılmaz
+        self.assertTrue(all(r.skipped == tmscan.GATED for r in results[3:]))
+
+class ExpectedAliveTest(unittest.TestCase):
+    def test_devices_behind_an_answering_gate_are_expected_up(self):
+        tm = make_tm(kyland=3)
+        plan = {p.name: p for p in tm['plan']}
+        scanner = FakeScanner(tmscan.ScanOptions(checks=("ping",)), down={plan["Kyland-2"].ip})
+        list(scanner.scan([tm]))
+        self.assertFalse(scanner.expected[plan["Sdwan"].ip])  # Kök: kanıt yok
+        self.assertTrue(scanner.expected[plan["Kyland-2"].ip])
+        self.assertNotIn(plan["Kyland-3"].ip, scanner.expected)  # Kyland-2 düştü: atlandı
+
+        history = {(5, "Kartal", "Sdwan"): (10, 2, 5.0, None, 0)}
+        scanner = FakeScanner(tmscan.ScanOptions(checks=("ping",)), history=history)
+        list(scanner.scan([tm]))
+        self.assertTrue(scanner.expected[plan["Sdwan"].ip])
+
+class SecondPassTest(unittest.TestCase):
+    def test_only_failed_and_skipped_devices_are_reprobed(self):
+        tm = make_tm(kyland=3)
+        plan = {p.name: p for p in tm['plan']}
+        options = tmscan.ScanOptions(checks=("ping", "web"))
+        first = FakeScanner(options, down={plan["Kyland-2"].ip, plan["SEL3530_1"].ip})
+        previous = {r.ip: r for r in first.scan([tm])}
+        self.assertEqual(previous[plan["Kyland-3"].ip].skipped, tmscan.GATED)
+
+        second = FakeScanner(options, down={plan["SEL3530_1"].ip})
+        results = {r.name: r for r in second.scan([tm], previous=previous)}
+        self.assertEqual(sorted(second.probed("ping")),
+                         sorted(plan[n].ip for n in ("Kyland-2", "Kyland-3", "SEL3530_1")))
+        self.assertEqual(sorted(second.probed("web")), sorted(plan[n].ip for n in ("Kyland-2", "Kyland-3")))
+        # İlk turda cevap verenlerin sonucu (web dahil) aynen korunur
+        self.assertIs(results["SEL3555(O)"], previous[plan["SEL3555(O)"].ip])
+        self.assertEqual(results["Kyland-2"].retry, tmscan.RECOVERED)
+        self.assertEqual(results["Kyland-3"].retry, tmscan.PHASE2_ONLY)
+        self.assertEqual(results["SEL3530_1"].retry, tmscan.CONFIRMED)
+        self.assertEqual(results["Sdwan"].retry, "")
+
+    def test_prefetch_skips_devices_whose_gate_was_down(self):
+        tm = make_tm(kyland=3)
+        plan = {p.name: p for p in tm['plan']}
+        options = tmscan.ScanOptions(checks=("ping", "web"))
+        first = FakeScanner(options, down={plan["Kyland-2"].ip, plan["SEL3530_1"].ip})
+        previous = {r.ip: r for r in first.scan([tm])}
+
+        prefetched = []
+        def ping_many(ips, count, timeout):
+            prefetched.extend(ips)
+            return {ip: tmprobe.failed_stats(count) for ip in ips}
+
+        second = FakeScanner(options._replace(ping_count=4))
+        with mock.patch.object(tmprobe, "ping_many", ping_many):
+            results = {r.name: r for r in second.scan([tm], previous=previous)}
+        # Kyland-3'ün bağlı olduğu Kyland-2 ilk turda düşmüştü: toplu pinge girmez, Kyland-2 yine düşünce atlanır
+        self.assertEqual(sorted(prefetched), sorted(plan[n].ip for n in ("Kyland-2", "SEL3530_1")))
+        self.assertEqual(second.probed("ping"), [])
+        self.assertEqual(results["Kyland-3"].skipped, tmscan.GATED)
+
+    def test_timed_out_web_is_rechecked(self):
+        tm = make_tm()
+        plan = {p.name: p for p in tm['plan']}
+        options = tmscan.ScanOptions(checks=("ping", "web"))
+        first = FakeScanner(options)
+        slow_web = tmprobe.WebStats("YANIT_YOK", None, 1.0, None, None)
+        first.web = lambda ip, check: slow_web if ip == plan["SEL3555(O)"].ip else FakeScanner.web(first, ip, check)
+        previous = {r.ip: r for r in first.scan([tm])}
+        self.assertTrue(previous[plan["SEL3555(O)"].ip].timed_out)
+
+        second = FakeScanner(options)
+        results = {r.name: r for r in second.scan([tm], previous=previous)}
+        self.assertEqual(second.probed("web"), [plan["SEL3555(O)"].ip])
+        self.assertEqual(results["SEL3555(O)"].web_stat, "HTTPS_OK (200)")
+
+class TimeoutOptionsTest(unittest.TestCase):
+    def test_web_and_version_timeouts_come_from_options(self):
+        options = tmscan.ScanOptions(checks=("ping", "web", "version"), web_timeout=1.0, version_timeout=5)
+        scanner = tmscan.Scanner(options)
+        with mock.patch.object(tmprobe, "web_check") as web_check:
+            scanner.web("10.5.1.66", "HTTPS")
+        self.assertEqual(web_check.call_args[0][2], 1.0)
+        with mock.patch.object(tmscan, "kyland_version", return_value=(True, "v", "")) as version:
+            scanner.version("10.5.1.94")
+        self.assertEqual(version.call_args[0][2], 5)
+        fast = tmscan.tm_cost(make_tm(), options)
+        self.assertLess(fast, tmscan.tm_cost(make_tm(), options._replace(web_timeout=3.0, version_timeout=10)))
+
+class ScanApiTest(unittest.TestCase):
+    def test_results_follow_plan_order_within_each_tm(self):
+        tms = [make_tm(name, ip=f"10.5.{i}.93") for i, name in enumerate(("Kartal", "Pendik", "Tuzla"), 1)]
+        for concurrency in (1, 3):
+            scanner = FakeScanner(tmscan.ScanOptions(checks=("ping", "web")))
+            results = list(scanner.scan(tms, concurrency))
+            for tm in tms:
+                self.assertEqual([r.name for r in results if r.tm is tm], [p.name for p in tm['plan']])
+
+    def test_gated_and_filtered_devices_are_emitted_without_probing(self):
+        tm = make_tm(kyland=3, c3530=2)
+        plan = {p.name: p for p in tm['plan']}
+        options = tmscan.ScanOptions(checks=("ping", "web"), device_filter="kyland")
+        scanner = FakeScanner(options, down={plan["Kyland-2"].ip})
+        results = {r.name: r for r in scanner.scan([tm])}
+        self.assertEqual(set(results), set(plan))
+        for name, result in results.items():
+            if plan[name].infra or "Kyland" in name:
+                self.assertNotEqual(result.skipped, tmscan.FILTERED, name)
+            else:
+                self.assertEqual(result.skipped, tmscan.FILTERED, name)
+                self.assertIsNone(result.ok)
+                self.assertEqual(result.status_text, tmscan.FILTERED)
+                self.assertNotIn(result.ip, scanner.probed("ping"))
+        self.assertEqual(results["Kyland-3"].skipped, tmscan.GATED)
+        self.assertEqual(results["Kyland-3"].status_text, "FAILED")
+        self.assertEqual(results["Kyland-2"].status_text, "FAILED")
+        self.assertEqual(results["Sdwan"].status_text, "SUCCESS")
+
+    def test_early_close_stops_probing_and_web_pool(self):
+        tms = [make_tm(name, ip=f"10.5.{i}.93") for i, name in enumerate(("Kartal", "Pendik", "Tuzla", "Kadıköy"), 1)]
+        total = sum(len(tm['plan']) for tm in tms)
+        for concurrency in (1, 2):
+            scanner = FakeScanner(tmscan.ScanOptions(checks=("ping", "web")))
+            results = scanner.scan(tms, concurrency)
+            next(r for r in results if r.web_stat != "N/A")
+            results.close()
+            self.assertIsNone(scanner.web_pool)
+            probed = len(scanner.probed("ping"))
+            self.assertLess(probed, total)
+            self.assertEqual(len(scanner.probed("ping")), probed)  # Kapanıştan sonra yeni prob yok
+
+class CostModelTest(unittest.TestCase):
+    PING_ONLY = tmscan.ScanOptions(checks=("ping",))
+
+    def test_cost_from_plan_alone(self):
+        tm = make_tm(kyland=2, c3530=1)
+        ping = tmscan.DEFAULT_FAIL_RATE * 1 + (1 - tmscan.DEFAULT_FAIL_RATE) * tmscan.DEFAULT_RTT_MS / 1000.0
+        self.assertAlmostEqual(tmscan.probe_cost(tm['plan'][0], self.PING_ONLY)[0], ping)
+        # Her prob, zincirde üstündeki cihazların cevap verme olasılığıyla ağırlıklanır
+        up = 1 - tmscan.DEFAULT_FAIL_RATE
+        expected = ping * (1 + up + up ** 2 + 4 * up ** 3)
+        self.assertAlmostEqual(tmscan.tm_cost(tm, self.PING_ONLY), expected)
+        # Filtre dışı cihazlar sayılmaz, büyük TM daha pahalıdır
+        filtered = self.PING_ONLY._replace(device_filter="Sdwan")
+        self.assertAlmostEqual(tmscan.tm_cost(tm, filtered), ping * (1 + up + up ** 2))
+        self.assertGreater(tmscan.tm_cost(make_tm(kyland=4, c3530=3), self.PING_ONLY), expected)
+
+    def test_cost_from_history(self):
+        tm = make_tm(kyland=2, c3530=1)
+        # Sdwan her zaman zaman aşımına uğruyor: arkasındaki cihazlara ulaşılmaz, maliyet tek ping süre sınırı
+        dead = {(5, "Kartal", "Sdwan"): (10, 10, None, None, 0)}
+        self.assertAlmostEqual(tmscan.tm_cost(tm, self.PING_ONLY, dead), 1.0)
+
+        web = tmscan.ScanOptions(checks=("ping", "web"))
+        sel = next(p for p in tm['plan'] if p.name == "SEL3555(O)")
+        fast = tmscan.probe_cost(sel, web, (10, 0, 2.0, 50.0, 0))
+        slow = tmscan.probe_cost(sel, web, (10, 0, 2.0, 50.0, 10))  # Web her seferinde süre sınırına kadar bekledi
+        self.assertEqual((fast[1], slow[1]), (0.0, 0.0))
+        self.assertAlmostEqual(fast[0], 0.002 + 0.05)
+        self.assertAlmostEqual(slow[0], 0.002 + web.web_timeout)
+
+    def test_dispatch_order_longest_first_ties_stable(self):
+        small_a = make_tm("A", ip="10.5.1.93", kyland=1, c3530=0)
+        big = make_tm("B", ip="10.5.2.93", kyland=4, c3530=3)
+        small_c = make_tm("C", ip="10.5.3.93", kyland=1, c3530=0)
+        medium = make_tm("D", ip="10.5.4.93", kyland=2, c3530=1)
+        scanner = tmscan.Scanner(self.PING_ONLY)
+        order = scanner.dispatch_order([small_a, big, small_c, medium])
+        self.assertEqual([tm['name'] for tm in order], ["B", "D", "A", "C"])
+        order = scanner.dispatch_order([small_c, small_a])
+        self.assertEqual([tm['name'] for tm in order], ["C", "A"])
+        # Geçmişte kök cihazı hep zaman aşımına uğrayan küçük TM, süre sınırı kadar beklettiği için öne geçer
+        scanner = tmscan.Scanner(self.PING_ONLY, history={(5, "A", "Sdwan"): (10, 10, None, None, 0)})
+        self.assertEqual([tm['name'] for tm in scanner.dispatch_order([big, medium, small_a])], ["A", "B", "D"])
+
+class AscanTest(unittest.TestCase):
+    def run_ascan(self, consume):
+        tms = [make_tm(name, ip=f"10.5.{i}.93") for i, name in enumerate(("Kartal", "Pendik", "Tuzla"), 1)]
+        scanner = FakeScanner(tmscan.ScanOptions(checks=("ping", "web")))
+        released = threading.Event()
+        probe_ping = scanner.ping
+
+        def slow_ping(ip, expected=False):
+            if not ip.startswith("10.5.1."):
+                released.wait(1)  # İlk TM'den sonrası tüketici durana kadar bekler
+            return probe_ping(ip, expected)
+
+        scanner.ping = slow_ping
+        with mock.patch.object(tmscan, "scan", lambda *args, **kwargs: scanner.scan(tms)):
+            asyncio.run(consume(tmscan.ascan(tms)))
+        released.set()
+        for thread in threading.enumerate():
+            if thread.name == "ascan":
+                thread.join(5)
+        self.assertFalse(any(t.name == "ascan" for t in threading.enumerate()))
+        self.assertIsNone(scanner.web_pool)
+        self.assertLess(len(scanner.probed("ping")), sum(len(tm['plan']) for tm in tms))
+
+    def test_break_stops_producer(self):
+        async def consume(results):
+            async for _ in results:
+                break
+            await results.aclose()
+
+        self.run_ascan(consume)
+
+    def test_cancel_while_probing_stops_producer(self):
+        async def consume(results):
+            async def drain():
+                async for _ in results:
+                    pass
+            task = asyncio.ensure_future(drain())
+            await asyncio.sleep(0.2)  # İkinci TM'nin probu sürerken iptal
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        self.run_ascan(consume)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# tmupstream.py: bölge kesintisi durum makinesi ve Scanner entegrasyonu
+
+import unittest
+
+import tmprobe
+import tmscan
+import tmupstream
+from tmupstream import UpstreamTracker
+
+from tests.test_tmscan import FakeScanner, make_tm, ok_stats
+
+def region_tms(region, count):
+    return [make_tm(f"TM{i}", region=region, ip=f"10.{region}.{i}.93", kyland=1, c3530=0) for i in range(count)]
+
+class Confirm:
+    """confirm() sahtesi: çağrılan IP'leri kaydeder, 'up' ise ilk IP cevap vermiş sayılır."""
+
+    def __init__(self, up):
+        self.up = up
+        self.calls = []
+
+    def __call__(self, ips):
+        self.calls.append(list(ips))
+        return {ip: ok_stats() if self.up and i == 0 else tmprobe.failed_stats(1) for i, ip in enumerate(ips)}
+
+class TrackerTest(unittest.TestCase):
+    def tracker(self, tms, up, prune_after=3, sample=2):
+        confirm = Confirm(up)
+        return UpstreamTracker(tms, tmscan.root_ip, confirm, prune_after, sample), confirm
+
+    def run_failures(self, tracker, tms, count):
+        for tm in tms[:count]:
+            self.assertFalse(tracker.begin(tm))
+            tracker.report(tm, False)
+
+    def test_k_failures_confirmed_down_prunes_rest(self):
+        tms = region_tms(5, 8)
+        tracker, confirm = self.tracker(tms, up=False)
+        self.run_failures(tracker, tms, 2)
+        self.assertEqual(confirm.calls, [])  # K'den az başarısızlıkta doğrulama yok
+        self.assertEqual(tracker.state[5], tmupstream.OPEN)
+
+        self.run_failures(tracker, tms[2:], 1)
+        # Kalan 5 TM'nin ilk ve sonuncusu örneklenir
+        self.assertEqual(confirm.calls, [[tmscan.root_ip(tms[3]), tmscan.root_ip(tms[7])]])
+        self.assertEqual(tracker.state[5], tmupstream.DOWN)
+        # Örneklenen TM'ler ölçülmüş sayılır, sadece diğerleri çıkarım
+        self.assertEqual([tracker.begin(tm) for tm in tms[3:]], [False, True, True, True, False])
+        self.assertFalse(tracker.sample_result(tms[3]).ok)
+        self.assertIsNone(tracker.sample_result(tms[3]))
+        self.assertIsNone(tracker.sample_result(tms[4]))
+        self.assertEqual(tracker.down_regions(), [(5, 3, 2, 3)])
+
+    def test_sample_answered_keeps_region_open_for_probing(self):
+        tms = region_tms(5, 6)
+        tracker, confirm = self.tracker(tms, up=True)
+        self.run_failures(tracker, tms, 3)
+        self.assertEqual(len(confirm.calls), 1)
+        self.assertEqual(tracker.state[5], tmupstream.HEALTHY)
+        self.assertFalse(any(tracker.begin(tm) for tm in tms[3:]))
+        tracker.report(tms[3], False)  # Karar verildi: yeni başarısızlıklar tekrar doğrulama başlatmaz
+        self.assertEqual(len(confirm.calls), 1)
+        self.assertEqual(tracker.down_regions(), [])
+
+    def test_success_before_k_resets_region(self):
+        tms = region_tms(5, 6)
+        tracker, confirm = self.tracker(tms, up=False)
+        self.run_failures(tracker, tms, 2)
+        tracker.begin(tms[2])
+        tracker.report(tms[2], True)
+        self.run_failures(tracker, tms[3:], 3)
+        self.assertEqual(confirm.calls, [])
+        self.assertEqual(tracker.state[5], tmupstream.HEALTHY)
+
+    def test_regions_are_independent(self):
+        down, healthy = region_tms(5, 5), region_tms(6, 5)
+        tracker, _ = self.tracker(down + healthy, up=False)
+        tracker.begin(healthy[0])
+        tracker.report(healthy[0], True)
+        self.run_failures(tracker, down, 3)
+        self.assertEqual(tracker.state, {5: tmupstream.DOWN, 6: tmupstream.HEALTHY})
+        self.assertFalse(tracker.begin(healthy[1]))
+
+    def test_no_pending_tms_left_to_sample(self):
+        tms = region_tms(5, 3)
+        tracker, confirm = self.tracker(tms, up=False)
+        self.run_failures(tracker, tms, 3)
+        self.assertEqual(confirm.calls, [])
+        self.assertEqual(tracker.down_regions(), [])
+
+class ScannerPruneTest(unittest.TestCase):
+    def test_pruning_is_off_by_default(self):
+        tms = region_tms(5, 6)
+        down = {p.ip for tm in tms for p in tm['plan']}
+        scanner = FakeScanner(down=down)
+        results = list(scanner.scan(tms))
+        self.assertIsNone(scanner.upstream)
+        self.assertFalse(any(r.inferred for r in results))
+        self.assertEqual(len(scanner.probed("ping")), len(tms))  # Her TM'nin kök cihazı problandı
+
+    def test_confirmed_outage_marks_rest_inferred(self):
+        tms = region_tms(5, 6)
+        down = {p.ip for tm in tms for p in tm['plan']}
+        scanner = FakeScanner(down=down, prune_after=3)
+        confirm = Confirm(up=False)
+        scanner.confirm_upstream = confirm
+        results = list(scanner.scan(tms))
+        self.assertEqual(len(results), sum(len(tm['plan']) for tm in tms))
+        inferred = [r.tm['name'] for r in results if r.inferred]
+        self.assertEqual(inferred, ["TM4"])
+        # Örneklenen TM3 / TM5 kökleri doğrulamada ölçüldü: tekrar pinglenmez, ölçülmüş FAILED olarak çıkar
+        self.assertEqual(confirm.calls, [[tmscan.root_ip(tms[3]), tmscan.root_ip(tms[5])]])
+        self.assertEqual(len(scanner.probed("ping")), 3)
+        roots = {r.tm['name']: r for r in results if r.ip == tmscan.root_ip(r.tm)}
+        for name in ("TM3", "TM5"):
+            self.assertTrue(roots[name].probed)
+            self.assertIsNotNone(roots[name].stats)
+        self.assertTrue(all(not r.ok for r in results))
+        self.assertEqual(scanner.upstream.down_regions(), [(5, 3, 2, 1)])
+
+if __name__ == "__main__":
+    unittest.main()
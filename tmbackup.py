@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------------
+# Kyland Konfigürasyon Yedek Deposu
+#
+# Konfigürasyonlar içerik adresli saklanır: dosya adı içeriğin SHA-256 özeti,
+# içerik gzip ile sıkıştırılır (objects/ab/abcdef....gz). Değişmeyen bir
+# konfigürasyon tekrar yazılmaz, sadece index'teki zaman damgası güncellenir.
+# index.json: cihaz IP'si -> TM, cihaz adı, son özet, önceki özet, zaman damgaları ve
+# cihazın son toplamasındaki durum (YENI / DEGISTI / AYNI).
+# ----------------------------------------------------------------------------------
+
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Kayıt durumları
+NEW = "YENI"
+CHANGED = "DEGISTI"
+SAME = "AYNI"
+
+def atomic_write(path, data):
+    """Geçici dosyaya yazıp yerine taşır; yarım kalmış dosya oluşmaz (tmcache.py de kullanır)."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+class ConfigStore:
+    """İçerik adresli, sıkıştırılmış konfigürasyon deposu ve cihaz index'i.
+    Okunamayan (bozuk / yarım) index boş kabul edilir ve kenara alınır; 'broken_index' o dosyanın yolu olur.
+    Konfigürasyon nesneleri index'ten bağımsızdır, sonraki toplama index'i yeniden kurar."""
+
+    def __init__(self, root):
+        self.root = root
+        self.objects = os.path.join(root, "objects")
+        self.index_path = os.path.join(root, "index.json")
+        self.index = {}
+        self.broken_index = None
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self.index = json.load(f)
+            except (OSError, ValueError):
+                self.index = {}
+                self.broken_index = self.index_path + ".bozuk"
+                os.replace(self.index_path, self.broken_index)
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects, digest[:2], digest + ".gz")
+
+    def put(self, content):
+        """İçeriği saklar (zaten varsa yazmaz) ve özetini döner."""
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, gzip.compress(data))
+        return digest
+
+    def get(self, digest):
+        with gzip.open(self._object_path(digest), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def record(self, ip, meta, content, ts=None):
+        """Cihazın yeni konfigürasyonunu kaydeder. (durum, özet) döner.
+        meta: region, tm, device (index'te gösterim için)."""
+        ts = ts or datetime.datetime.now().strftime(TS_FORMAT)
+        digest = self.put(content)
+        entry = self.index.get(ip)
+        if entry is None:
+            status = NEW
+            entry = {"previous": None, "changed": ts}
+        elif entry["hash"] != digest:
+            status = CHANGED
+            entry["previous"] = entry["hash"]
+            entry["changed"] = ts
+        else:
+            status = SAME
+        entry.update(meta)
+        entry["hash"] = digest
+        entry["ts"] = ts
+        entry["status"] = status
+        self.index[ip] = entry
+        return status, digest
+
+    def save_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        atomic_write(self.index_path, json.dumps(self.index, ensure_ascii=False, indent=1, sort_keys=True).encode("utf-8"))
+
+    def changed_in_last_collection(self, ips=None):
+        """Kendi son toplamasında konfigürasyonu değişen (yeni dahil) cihazlar: [(ip, entry)]
+        Karşılaştırma cihaz bazındadır; kısmi kapsamlı bir toplama diğer cihazların sonucunu gizlemez.
+        ips: verilirse sadece bu cihazlar."""
+        return sorted(((ip, e) for ip, e in self.index.items()
+                       if e["status"] != SAME
+                       and (ips is None or ip in ips)),
+                      key=lambda x: (x[1].get("region", 0), x[1].get("tm", ""), x[1].get("device", "")))
+
+    def last_collection(self):
+        """En son toplama turunun zaman damgası (index'teki en yeni 'ts')."""
+        return max((e["ts"] for e in self.index.values()), default=None)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------------
+# Kyland Komut Çıktısı Önbelleği
+#
+# kyland_check.py her çağrıda cihaza yeniden giriş yapar (10-20 sn). Nadiren değişen
+# 'show' çıktıları (cihaz, komut) başına diskte saklanır ve komuta özel süre (TTL)
+# boyunca cihaza gidilmeden kullanılır. Süresi 0 olan komutlar (show clock) hiç
+# saklanmaz. Toplam boyut sınırı aşılınca en uzun süredir kullanılmayan kayıtlar
+# silinir (LRU). index.json: anahtar -> ip, komut, alınma / son kullanım zamanı, boyut.
+# ----------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from tmbackup import atomic_write
+
+# Komut -> saniye. Listede olmayan komutlar önbelleğe alınmaz.
+DEFAULT_TTLS = {
+    "show ver": 7 * 24 * 3600,
+    "show vlan brief": 24 * 3600,
+    "show interface brief": 0,  # Port durumu anlık bilgidir
+    "show clock": 0,
+}
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+
+def normalize_command(command):
+    """Komutu anahtar ve TTL için tek biçime getirir: 'Show  Ver ' -> 'show ver'."""
+    return " ".join(command.split()).lower()
+
+def format_age(seconds):
+    """Kayıt yaşını kısa metne çevirir: 45 sn, 12 dk, 3 sa, 2 gün."""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds} sn"
+    if seconds < 3600:
+        return f"{seconds // 60} dk"
+    if seconds < 86400:
+        return f"{seconds // 3600} sa"
+    return f"{seconds // 86400} gün"
+
+class OutputCache:
+    """(cihaz IP, komut) başına çıktı önbelleği (thread-safe). Dizin ilk yazmada oluşturulur.
+    refresh=True iken kayıtlar okunmaz (her komut cihazdan alınır) ama yeni çıktılar saklanır."""
+
+    def __init__(self, root, ttls=None, max_bytes=DEFAULT_MAX_BYTES, refresh=False):
+        self.root = root
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.index_path = os.path.join(root, "index.json")
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.index = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self.index = json.load(f)
+            except (OSError, ValueError):
+                self.index = {}  # Bozuk index: önbellek boş kabul edilir
+
+    @staticmethod
+    def key(ip, command):
+        return hashlib.sha256(f"{ip}\0{normalize_command(command)}".encode("utf-8")).hexdigest()[:32]
+
+    def _path(self, key):
+        return os.path.join(self.root, key + ".txt")
+
+    def ttl(self, command):
+        return self.ttls.get(normalize_command(command), 0)
+
+    def get(self, ip, command, now=None):
+        """Süresi dolmamış kayıt varsa (çıktı, yaş sn), yoksa None döner."""
+        if self.refresh or self.ttl(command) <= 0:
+            return None
+        now = time.time() if now is None else now
+        key = self.key(ip, command)
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None or now - entry["ts"] > self.ttl(command):
+                return None
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    output = f.read()
+            except OSError:
+                del self.index[key]
+                self.dirty = True
+                return None
+            entry["used"] = now
+            self.dirty = True
+            return output, now - entry["ts"]
+
+    def put(self, ip, command, output, now=None):
+        """Çıktıyı saklar (TTL'i 0 olan komutlar hariç) ve boyut sınırını uygular."""
+        if self.ttl(command) <= 0:
+            return
+        now = time.time() if now is None else now
+        key = self.key(ip, command)
+        data = output.encode("utf-8")
+        with self.lock:
+            os.makedirs(self.root, exist_ok=True)
+            atomic_write(self._path(key), data)
+            self.index[key] = {"ip": ip, "command": normalize_command(command), "ts": now, "used": now, "size": len(data)}
+            self._evict()
+            self._save()
+
+    def _evict(self):
+        """Toplam boyut sınırın altına inene kadar en uzun süredir kullanılmayan kayıtları siler."""
+        total = sum(e["size"] for e in self.index.values())
+        for key, entry in sorted(self.index.items(), key=lambda x: x[1]["used"]):
+            if total <= self.max_bytes:
+                break
+            total -= entry["size"]
+            del self.index[key]
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+
+    def _save(self):
+        atomic_write(self.index_path, json.dumps(self.index, ensure_ascii=False, indent=1, sort_keys=True).encode("utf-8"))
+        self.dirty = False
+
+    def save(self):
+        """Son kullanım zamanlarını diske yazar (sadece değişiklik varsa)."""
+        with self.lock:
+            if self.dirty and os.path.isdir(self.root):
+                self._save()
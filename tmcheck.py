@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 # ----------------------------------------------------------------------------------
-# Transformer Substation Check - Python Edition v2.7
+# Transformer Substation Check - Python Edition v4.3
 # (Bash v58 based - DEVICE & REGION VALIDATION + KYLAND VERSION & VLAN CHECK)
 #
 # ÖZELLİKLER:
@@ -20,6 +20,23 @@
 # - GÜNCELLEME v2.5: CLI çıktı temizliği iyileştirildi (Boşluklar ve Debug mesajları gizlendi).
 # - GÜNCELLEME v2.6: Komut modu başlığı kaldırıldı. 'down' linkler kırmızı yapıldı. 'show clock' eklendi.
 # - GÜNCELLEME v2.7: Yardım menüsü "Kullanıcı Rehberi" formatında yeniden tasarlandı. 'report' komutu eklendi.
+# - GÜNCELLEME v2.8: Cihaz yerleşimi tmtopology.py'ye taşındı. Her TM yüklemede prob planına derlenir.
+# - GÜNCELLEME v2.9: --shard i/N ve --regions ile parçalı rapor, 'merge' ile parçalı raporların birleştirilmesi.
+# - GÜNCELLEME v3.0: --history ile SQLite geçmiş deposu, 'history' sorguları ve CSV içe aktarma.
+# - GÜNCELLEME v3.1: --parallel ile paralel tarama. Global/bölge/prefix hız limitli governor (tmgovernor.py).
+# - GÜNCELLEME v3.2: --dashboard ile curses canlı panel (tmdash.py). Filtreleme tm_selected()'a taşındı.
+# - GÜNCELLEME v3.3: Ping sonuçları yapılandırıldı (tmprobe.py): kayıp, min/ort/max/mdev RTT, jitter.
+#                    Tekil TM sorgusunda tüm cihazlara ping dizisi aynı anda gönderilir. Raporda RTT kolonları.
+# - GÜNCELLEME v3.4: --web ile derin HTTP/HTTPS kontrolü (TLS el sıkışması + HEAD, süreler ayrı ölçülür).
+# - GÜNCELLEME v3.5: --profile ile faz/prob zaman çizelgesi (Chrome trace JSON + özet), --profile-py ile cProfile.
+# - GÜNCELLEME v3.6: --watch ile tekil TM sürekli izleme (açık ICMP soketi, kayan pencere kayıp/RTT, tmwatch.py).
+# - GÜNCELLEME v3.7: 'backup' ile paralel Kyland running-config yedeği (içerik adresli depo, tmbackup.py).
+# - GÜNCELLEME v3.8: --filter sorgu dili (tmfilter.py). Tüm hedef seçimi index'li envanter üzerinden tek sorguyla yapılır.
+# - GÜNCELLEME v3.9: Bölge kesintisi budaması (tmupstream.py). Çıkarım sonuçları raporda 'Cikarim' kolonunda. --prune-upstream ile açılır.
+# - GÜNCELLEME v4.0: --two-phase ile iki fazlı tarama: hızlı ilk tur, sadece hatalı TM'lerde uzun süreli tekrar. Raporda 'Faz2' kolonu.
+# - GÜNCELLEME v4.1: Prob motoru tmscan.py'ye taşındı (global durumsuz Scanner, scan()/ascan() API). CLI sonuç akışını tüketir.
+# - GÜNCELLEME v4.2: Kyland show çıktıları için komut bazlı TTL'li disk önbelleği (tmcache.py, LRU boyut sınırı). --refresh ile atlanır.
+# - GÜNCELLEME v4.3: Paralel taramada TM'ler tahmini maliyete göre (plan + geçmiş gecikme/zaman aşımı) en pahalıdan başlatılır.
 # ----------------------------------------------------------------------------------
 
 import sys
@@ -29,7 +46,24 @@ import socket
 import datetime
 import re
 import csv
+import contextlib
 import operator
+import time
+import difflib
+from concurrent.futures import ThreadPoolExecutor
+
+import tmbackup
+import tmcache
+import tmfilter
+import tmhistory
+import tmprobe
+import tmscan
+import tmwatch
+from tmdash import Dashboard
+from tmprofile import Profiler
+from tmgovernor import Governor, DEFAULT_REGION_RATE, DEFAULT_PREFIX_RATE, DEFAULT_MAX_INFLIGHT
+from tmtopology import compile_plan, split_ip, find_probe, DEFAULT_PREFIX
+from tmupstream import PRUNE_AFTER
 
 # --- RENKLER (ANSI) ---
 class Colors:
@@ -50,18 +84,43 @@ SOURCE_DIR = os.path.join(HOME, "source")
 DATE_STR = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 CSV_FILENAME = os.path.join(SOURCE_DIR, f"TM_Rapor_{DATE_STR}.csv")
 DEFAULT_DB = os.path.join(SOURCE_DIR, "veritabani.csv")
+HISTORY_DB = os.path.join(SOURCE_DIR, "tm_gecmis.sqlite")
+BACKUP_DIR = os.path.join(SOURCE_DIR, "kyland_yedek")
+CACHE_DIR = os.path.join(SOURCE_DIR, "kyland_onbellek")
+KYLAND_SCRIPT = "/usr/local/bin/kyland_check.py"
+COST_HISTORY_DAYS = 14 # TM maliyet tahmininde kullanılan geçmiş (gün)
 
 if not os.path.exists(SOURCE_DIR):
     os.makedirs(SOURCE_DIR)
 
 # Varsayılanlar
 PING_COUNT = 1
+SINGLE_TM = False # Tekil TM sorgusu: 4 paket ve Kyland versiyon kontrolü
+# --two-phase tur ayarları (tmscan.ScanOptions alanları)
+FAST_PASS = {"ping_count": 1, "ping_timeout": 0.5, "port_timeout": 0.5, "web_timeout": 1.0, "version_timeout": 5,
+             "prefetch": True}
+SLOW_PASS = {"ping_count": 4, "ping_timeout": 2, "port_timeout": 3.0, "web_timeout": tmprobe.WEB_TIMEOUT,
+             "version_timeout": tmscan.VERSION_TIMEOUT, "prefetch": False}
 VALID_DEVICE_TYPES = ["Sdwan", "SEL3555", "SEL3530", "Ulak", "Kyland"]
 VALID_DEVICE_REGEX = r"(?i)^(" + "|".join(VALID_DEVICE_TYPES) + ")$"
 VALID_SHOW_COMMANDS = ["show interface brief", "show vlan brief", "show clock"]
+BACKUP_COMMAND = "show running-config"
+BACKUP_WORKERS = 8 # Yedek toplamada varsayılan eşzamanlı cihaz sayısı
+REPORT_HEADER = ("Bolge_No,TM_Adi,TM_Tipi,TM_Prefix,Cihaz_Adi,Cihaz_IP,Ping_Durumu,Web_Port_Durumu,"
+                 "Kayip_Yuzde,RTT_Min,RTT_Ort,RTT_Max,RTT_Mdev,Jitter,"
+                 "Web_Kod,Web_Baglanti_ms,Web_TLS_ms,Web_Ilk_Bayt_ms,Cikarim,Faz2")
+
 
-# Global değişkenler
-CURRENT_PING_LOSS = ""
+# Global değişkenler (komut satırı ayarları; tarama durumu tmscan.Scanner'dadır)
+PARALLEL_WORKERS = 1 # --parallel N: aynı anda taranan TM sayısı
+GOVERNOR = None # Paralel modda prob hız/eşzamanlılık yöneticisi (tmgovernor.py)
+DASHBOARD = None # --dashboard: curses canlı gösterge paneli (tmdash.py)
+WEB_DEEP = False # --web: HTTP/HTTPS uygulama seviyesinde kontrol (TLS + HEAD)
+TWO_PHASE = False # --two-phase: hızlı ilk tur + hatalı TM'lerde hedefli tekrar
+CACHE = None # Kyland show komutu çıktı önbelleği (tmcache.py)
+COST_HISTORY = None # Paralel tarama zamanlaması için geçmiş cihaz ölçümleri (tmhistory.device_costs)
+PROFILER = None # --profile: faz ve prob span kayıtları (tmprofile.py)
+HISTORY_ROWS = None # --history aktifse bu taramanın sonuçları (tek transaction ile yazılır)
 LOG_TO_FILE = True
 ONLY_LIST = False
 FILTER_SCOPE = "ALL" # ALL, REGION, NAME, FILE
@@ -72,6 +131,7 @@ VERBOSE_MODE = False
 CUSTOM_COMMAND_MODE = False
 CUSTOM_COMMAND_STR = ""
 TARGET_IPS = set() # Dosya modunda taranacak IP listesi
+FILTER_QUERY = tmfilter.MATCH_ALL # --filter ifadesinin derlenmiş hali (tmfilter.py)
 
 # --- YARDIMCI FONKSİYONLAR ---
 
@@ -108,7 +168,7 @@ def clean_cli_output(text):
             continue
 
         # Komutun kendisinin ekrana yansımasını (echo) engelle
-        if stripped in VALID_SHOW_COMMANDS or stripped == "exit":
+        if stripped in VALID_SHOW_COMMANDS or stripped in (BACKUP_COMMAND, "exit"):
             continue
 
         # Prompt satırlarını atla (Örn: KARSIYAKA#, KARSIYAKA>exit)
@@ -123,7 +183,7 @@ def clean_cli_output(text):
 
 def print_help():
     print(f"{Colors.YELLOW}================================================================{Colors.NC}")
-    print(f"{Colors.YELLOW}   TM CHECKER - PYTHON EDITION (v2.7)")
+    print(f"{Colors.YELLOW}   TM CHECKER - PYTHON EDITION (v4.3)")
     print(f"{Colors.YELLOW}================================================================{Colors.NC}")
     print(f"{Colors.CYAN}VERİTABANI:{Colors.NC} {DEFAULT_DB}")
     print("")
@@ -134,11 +194,20 @@ def print_help():
     print(f"  {Colors.WHITE}tmcheck.py Bagcilar{Colors.NC}")
     print("      -> 'Bağcılar' ismini arar. Tek sonuçsa detaylı tarar.")
     print("      -> Çoklu sonuç varsa (Bagcilar GIS, Bagcilar TM vb.) seçim menüsü sunar.")
+    print(f"  {Colors.WHITE}tmcheck.py Bagcilar --watch 0.5{Colors.NC}  (aralık sn, varsayılan 1)")
+    print("      -> TM'yi sürekli izler: yerinde güncellenen tablo, UP/DOWN geçişleri,")
+    print("         son --window N (varsayılan 30) örnekte kayıp yüzdesi ve RTT eğilimi. Çıkış: Ctrl+C")
     print(f"  {Colors.WHITE}tmcheck.py 5{Colors.NC}")
     print("      -> 5. Bölgedeki tüm merkezleri sırayla tarar.")
     print(f"  {Colors.WHITE}tmcheck.py 5 kyland{Colors.NC}")
     print("      -> 5. Bölgedeki sadece 'Kyland' cihazlarını tarar.")
 
+    print(f"  {Colors.WHITE}tmcheck.py --filter 'region in (3,5) and type=OTOMASYONLU and cKyland>=2 and name~\"GIS\"'{Colors.NC}")
+    print("      -> Sorguya uyan TM'leri tarar. Sonuna 'list', 'report', cihaz tipi veya show komutu eklenebilir.")
+    print("      -> Alanlar: region, name, ip, type, prefix, c3530, cKyland, vlan")
+    print("         Operatörler: = != < <= > >= ~ (içerir) !~ in (...) not in (...), and / or / not, parantez.")
+    print("      -> Bölge / isim hedefiyle birlikte kullanılırsa ikisi birden uygulanır (tmcheck.py 5 --filter 'c3530>0').")
+
     print(f"\n{Colors.GREEN}--- 2. CİHAZ KOMUT MODU (KYLAND) ---{Colors.NC}")
     print("  Belirtilen TM'nin Kyland cihazına bağlanır ve komut çıktısını gösterir.")
     print(f"  {Colors.WHITE}tmcheck.py Bagcilar \"show interface brief\"{Colors.NC}")
@@ -157,6 +226,22 @@ def print_help():
     print(f"  {Colors.WHITE}tmcheck.py report{Colors.NC}  (veya {Colors.WHITE}rapor{Colors.NC})")
     print("      -> Tüm veritabanını tarar (Hızlı Mod).")
     print(f"      -> Sonuçları {Colors.CYAN}~/source/TM_Rapor_TARIH.csv{Colors.NC} dosyasına kaydeder.")
+    print(f"  {Colors.WHITE}tmcheck.py report --shard 2/4{Colors.NC}  (veya {Colors.WHITE}--regions 3,5{Colors.NC})")
+    print("      -> Veritabanını prob sayısına göre dengeli 4 parçaya böler, sadece 2. parçayı tarar.")
+    print("      -> Farklı sıçrama sunucularında çalıştırılıp parçalı raporlar üretmek içindir.")
+    print(f"  {Colors.WHITE}tmcheck.py merge TM_Rapor_A.csv TM_Rapor_B.csv ...{Colors.NC}")
+    print("      -> Parçalı raporları bölge/isim sırasında tek bir TM_Rapor dosyasında birleştirir.")
+    print(f"  {Colors.WHITE}tmcheck.py report --history{Colors.NC}")
+    print(f"      -> Sonuçları ayrıca {Colors.CYAN}~/source/tm_gecmis.sqlite{Colors.NC} geçmiş deposuna yazar.")
+    print(f"  {Colors.WHITE}tmcheck.py history availability Bagcilar Kyland-2 --days 30{Colors.NC}")
+    print("      -> Geçmiş deposundan erişilebilirlik yüzdesi. Diğer sorgular: 'outages', 'worst [Bölge]'.")
+    print(f"  {Colors.WHITE}tmcheck.py history import TM_Rapor_*.csv{Colors.NC}")
+    print("      -> Eski CSV raporlarını geçmiş deposuna aktarır.")
+    print(f"  {Colors.WHITE}tmcheck.py backup [veritabani.csv] [Bölge|TM] [-j 8]{Colors.NC}  (veya {Colors.WHITE}yedek{Colors.NC})")
+    print(f"      -> Kapsamdaki tüm Kyland'ların running-config'ini paralel çeker, {Colors.CYAN}~/source/kyland_yedek{Colors.NC}")
+    print("         altında içerik özetiyle sıkıştırılmış saklar (değişmeyen konfigürasyon tekrar yazılmaz).")
+    print(f"  {Colors.WHITE}tmcheck.py backup changes{Colors.NC}  /  {Colors.WHITE}tmcheck.py backup diff Bagcilar Kyland-2{Colors.NC}")
+    print("      -> Kendi son toplamasında değişen cihazlar / önceki yedekle satır farkı.")
     print(f"  {Colors.WHITE}tmcheck.py list{Colors.NC}")
     print("      -> Ping atmaz. Veritabanındaki tüm kayıtları tablo olarak listeler.")
     print(f"  {Colors.WHITE}tmcheck.py 5 list{Colors.NC}")
@@ -164,6 +249,28 @@ def print_help():
 
     print(f"\n{Colors.GREEN}--- PARAMETRELER ---{Colors.NC}")
     print(f"  {Colors.CYAN}-v{Colors.NC}      : (Verbose) Kyland taramalarında versiyon bilgisini satıra ekler.")
+    print(f"  {Colors.CYAN}--shard i/N{Colors.NC}     : Taramayı N dengeli parçanın i. parçasıyla sınırlar.")
+    print(f"  {Colors.CYAN}--regions 3,5{Colors.NC}   : Taramayı verilen bölgelerle sınırlar.")
+    print(f"  {Colors.CYAN}--prune-upstream{Colors.NC}: Bölge kesintisi budaması (varsayılan kapalı, her TM problanır). Bölgenin ilk {PRUNE_AFTER} TM'sinde")
+    print("                    Sdwan düşerse küçük bir örnekle doğrulanır, kalan TM'ler problanmadan 'UPSTREAM' (çıkarım) işaretlenir.")
+    print(f"  {Colors.CYAN}--two-phase{Colors.NC}     : İki fazlı tarama. Önce tüm TM'ler tek paket ve kısa süre sınırıyla taranır,")
+    print("                    sonra sadece hatalı TM'lerde başarısız/atlanan cihazlar daha sabırlı tekrar problanır.")
+    print(f"                    Raporun 'Faz2' kolonu: {tmscan.RECOVERED} (tekrarda cevap verdi), {tmscan.CONFIRMED}, {tmscan.PHASE2_ONLY} (ilk turda atlanmıştı).")
+    print(f"  {Colors.CYAN}--refresh{Colors.NC}       : Kyland önbelleğini atlar, show çıktıları cihazdan yeniden alınır. Önbellek süreleri:")
+    print("                    show ver 7 gün, show vlan brief 1 gün, show interface brief ve show clock saklanmaz.")
+    print(f"  {Colors.CYAN}--history{Colors.NC}       : Tarama sonuçlarını SQLite geçmiş deposuna kaydeder.")
+    print(f"  {Colors.CYAN}--web{Colors.NC}           : Web portunu uygulama seviyesinde test eder (TLS el sıkışması + HTTP HEAD).")
+    print("                    Bağlantı, TLS ve ilk bayt süreleri ayrı ölçülür ve rapora yazılır.")
+    print(f"  {Colors.CYAN}--profile{Colors.NC}       : Faz ve prob sürelerini kaydeder. ~/source/TM_Profil_TARIH.json (Chrome trace,")
+    print("                    chrome://tracing veya ui.perfetto.dev) ve .txt özet (en çok zaman harcayanlar) yazar.")
+    print(f"  {Colors.CYAN}--profile-py{Colors.NC}    : --profile + cProfile (ana thread Python fonksiyonları, .pstats dosyası).")
+    print(f"  {Colors.CYAN}--dashboard{Colors.NC}     : Satır satır çıktı yerine yerinde güncellenen canlı panel (ilerleme, ETA, hatalar).")
+    print(f"  {Colors.CYAN}--parallel N{Colors.NC}    : (-j N) N TM'yi paralel tarar. Çıktı yine bölge/isim sırasındadır.")
+    print("                    Pahalı TM'ler (çok cihaz, Kyland, geçmişte yavaş / zaman aşımı) önce başlatılır.")
+    print(f"  {Colors.CYAN}--region-rate R{Colors.NC} : Paralel modda bölge başına saniyede en fazla R prob (varsayılan {DEFAULT_REGION_RATE:g}).")
+    print(f"  {Colors.CYAN}--prefix-rate R{Colors.NC} : Paralel modda /24 başına saniyede en fazla R prob (varsayılan {DEFAULT_PREFIX_RATE:g}).")
+    print(f"  {Colors.CYAN}--max-inflight N{Colors.NC}: Paralel modda aynı anda en fazla N prob (varsayılan {DEFAULT_MAX_INFLIGHT}).")
+    print("                    Bölgede kayıp veya gecikme artarsa hız otomatik düşürülür.")
     print("")
     print(f"{Colors.YELLOW}================================================================{Colors.NC}")
     sys.exit(0)
@@ -194,14 +301,19 @@ def load_database(filepath):
                 if not r_kyland.isdigit(): r_kyland = "1"
                 if not r_vlan.isdigit(): r_vlan = "0"
                 
-                data.append({
+                tm = {
                     "region": int(r_region),
                     "name": r_name,
                     "ip": r_ip,
                     "c3530": int(r_3530),
                     "cKyland": int(r_kyland),
                     "mgmt_vlan": int(r_vlan)
-                })
+                }
+                # Cihaz planı yüklemede bir kez derlenir (tmtopology.py)
+                prefix, tm["type"] = split_ip(r_ip)
+                tm["prefix"] = prefix or DEFAULT_PREFIX
+                tm["plan"] = compile_plan(tm)
+                data.append(tm)
         data.sort(key=operator.itemgetter("region", "name"))
         return data
     except Exception as e:
@@ -218,110 +330,102 @@ def check_region_exists(db_data, region_val):
         return False
     return False
 
+def profiled(name, cat="prob", **args):
+    """--profile aktifse bloğu span olarak kaydeder. Dönen sözlüğe sonuç eklenebilir."""
+    if PROFILER is None:
+        return contextlib.nullcontext({})
+    return PROFILER.span(name, cat, **args)
+
 def check_ping(ip):
-    global CURRENT_PING_LOSS
-    CURRENT_PING_LOSS = ""
-    param_c = '-c'
-    param_w = '-W' 
-    command = ['ping', param_c, str(PING_COUNT), param_w, '1', ip]
-    try:
-        result = subprocess.run(
-            command, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE, 
-            text=True
-        )
-        if result.returncode == 0:
-            match = re.search(r'(\d+)% packet loss', result.stdout)
-            if match:
-                loss = int(match.group(1))
-                if loss > 0:
-                    CURRENT_PING_LOSS = f"{Colors.ORANGE}(Loss: %{loss}){Colors.NC}"
-            return True
-        else:
-            return False
-    except Exception:
-        return False
+    """Komut ve yedek modlarında tek cihaz erişim kontrolü, tmprobe.PingStats döner (stats.ok: cevap var)."""
+    with profiled("ping", ip=ip) as span:
+        stats = tmprobe.ping(ip, PING_COUNT)
+        span["sonuc"] = "OK" if stats.ok else "FAILED"
+    return stats
 
-def check_port(ip, port):
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.settimeout(2)
-    try:
-        result = sock.connect_ex((ip, port))
-        sock.close()
-        return result == 0
-    except:
-        return False
+def format_ping(stats):
+    """Sonuç satırı için kayıp ve (çoklu pakette) RTT/jitter özeti."""
+    if stats is None or not stats.ok:
+        return ""
+    parts = []
+    if stats.loss:
+        parts.append(f"{Colors.ORANGE}(Loss: %{stats.loss}){Colors.NC}")
+    if stats.sent > 1:
+        rtt = "/".join(tmprobe.format_ms(v) for v in (stats.rtt_min, stats.rtt_avg, stats.rtt_max, stats.rtt_mdev))
+        parts.append(f"{Colors.GRAY}[RTT {rtt} ms, Jitter {tmprobe.format_ms(stats.jitter)} ms]{Colors.NC}")
+    return " ".join(parts)
 
-def check_kyland_extra(ip):
-    """Sadece Kyland Versiyon kontrolü yapar."""
-    cmd = ["python3", "/usr/local/bin/kyland_check.py", ip, "show ver"]
-    try:
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=10)
-        output = result.stdout
-        found_version = None
-        for line in output.splitlines():
-            line = line.strip()
-            if line.startswith("SICOM"):
-                found_version = line.split(',')[0].strip()
-                break
-        
-        if found_version:
-            expected = "SICOM3028GPT-L2GT-T1080"
-            if found_version == expected:
-                return True, found_version
+def format_web(web):
+    """Derin web kontrolünde bağlantı / TLS / ilk bayt sürelerini özetler."""
+    if web is None or web.connect_ms is None:
+        return ""
+    parts = [f"TCP {tmprobe.format_ms(web.connect_ms)}"]
+    if web.tls_ms is not None:
+        parts.append(f"TLS {tmprobe.format_ms(web.tls_ms)}")
+    if web.ttfb_ms is not None:
+        parts.append(f"TTFB {tmprobe.format_ms(web.ttfb_ms)}")
+    return f"{Colors.GRAY}({' / '.join(parts)} ms){Colors.NC}"
+
+def print_command_output(raw_output):
+    """Kyland komut çıktısını temizleyip renklendirerek basar."""
+    cleaned_output = clean_cli_output(raw_output)
+    
+    # Çıktıyı renklendirme
+    print("-" * 80)
+    if not cleaned_output:
+        print(f"{Colors.YELLOW}Uyarı: Komut çalıştı ancak gösterilecek veri bulunamadı.{Colors.NC}")
+    else:
+        for line in cleaned_output.splitlines():
+            # Header Renklendirme
+            if "Port" in line and "Type" in line: # Interface Header
+                print(f"{Colors.YELLOW}{line}{Colors.NC}")
+            elif "Existing Vlans" in line: # Vlan Header
+                print(f"{Colors.YELLOW}{line}{Colors.NC}")
+            # Durum Renklendirme
+            elif "down" in line.lower():
+                 print(f"{Colors.RED}{line}{Colors.NC}")
+            elif "up" in line.lower():
+                 print(f"{Colors.GREEN}{line}{Colors.NC}")
             else:
-                return False, found_version
-        else:
-            return False, "Versiyon Okunamadı"
-    except subprocess.TimeoutExpired:
-        return False, "Timeout"
-    except Exception as e:
-        return False, "Script Hatası"
+                print(line)
+    print("-" * 80)
 
 def run_kyland_command_mode(tm, command_str):
     """Özel Kyland komutlarını çalıştırır ve çıktıyı basar."""
-    # Kyland-1 IP'sini hesapla (Prefix.94)
-    parts = tm['ip'].split('.')
-    prefix = ".".join(parts[:3])
-    target_ip = f"{prefix}.94"
+    # Kyland-1 IP'si derlenmiş plandan alınır
+    probe = find_probe(tm['plan'], "Kyland-1")
+    if probe is None:
+        print(f"{Colors.RED}HATA: {tm['name']} için Kyland-1 adresi hesaplanamadı (IP: {tm['ip']}).{Colors.NC}")
+        return
+    target_ip = probe.ip
     
     print(f"\n{Colors.CYAN}>>> BAĞLANIYOR: {tm['name']} - KYLAND ({target_ip}){Colors.NC}")
-    print(f"{Colors.GRAY}>>> KOMUT: {command_str}{Colors.NC}\n")
+    print(f"{Colors.GRAY}>>> KOMUT: {command_str}{Colors.NC}")
+
+    # Önbellekte süresi dolmamış çıktı varsa cihaza bağlanılmaz
+    hit = CACHE.get(target_ip, command_str) if CACHE is not None else None
+    if hit is not None:
+        raw_output, age = hit
+        print(f"{Colors.GRAY}>>> KAYNAK: Önbellek ({tmcache.format_age(age)} önce alındı, --refresh ile cihazdan alınır){Colors.NC}\n")
+        print_command_output(raw_output)
+        return
+    print(f"{Colors.GRAY}>>> KAYNAK: Cihaz (canlı){Colors.NC}\n")
     
-    if not check_ping(target_ip):
+    if not check_ping(target_ip).ok:
         print(f"{Colors.RED}HATA: Cihaza ping atılamadı!{Colors.NC}")
         return
 
     # Komutu çalıştır
-    cmd = ["python3", "/usr/local/bin/kyland_check.py", target_ip, command_str]
+    cmd = ["python3", KYLAND_SCRIPT, target_ip, command_str]
     try:
         # Timeout süresini biraz uzun tutuyoruz çünkü show komutları uzun sürebilir
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=20)
+        with profiled("kyland_check", ip=target_ip, komut=command_str):
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=20)
         
         if result.returncode == 0 and result.stdout:
-            raw_output = result.stdout
-            cleaned_output = clean_cli_output(raw_output)
-            
-            # Çıktıyı renklendirme
-            print("-" * 80)
-            if not cleaned_output:
-                print(f"{Colors.YELLOW}Uyarı: Komut çalıştı ancak gösterilecek veri bulunamadı.{Colors.NC}")
-            else:
-                for line in cleaned_output.splitlines():
-                    # Header Renklendirme
-                    if "Port" in line and "Type" in line: # Interface Header
-                        print(f"{Colors.YELLOW}{line}{Colors.NC}")
-                    elif "Existing Vlans" in line: # Vlan Header
-                        print(f"{Colors.YELLOW}{line}{Colors.NC}")
-                    # Durum Renklendirme
-                    elif "down" in line.lower():
-                         print(f"{Colors.RED}{line}{Colors.NC}")
-                    elif "up" in line.lower():
-                         print(f"{Colors.GREEN}{line}{Colors.NC}")
-                    else:
-                        print(line)
-            print("-" * 80)
+            if CACHE is not None:
+                CACHE.put(target_ip, command_str, result.stdout)
+            print_command_output(result.stdout)
         else:
             print(f"{Colors.RED}HATA: Komut çıktısı alınamadı veya boş.{Colors.NC}")
             if result.stderr:
@@ -332,20 +436,40 @@ def run_kyland_command_mode(tm, command_str):
     except Exception as e:
         print(f"{Colors.RED}HATA: Beklenmeyen hata: {e}{Colors.NC}")
 
-def log_result(tm, dev_name, dev_ip, status_text, web_stat):
+def emit(line):
+    """Konsol satırı basar (canlı panel açıkken basılmaz)."""
+    if DASHBOARD is not None: return
+    with profiled("konsol", "cikti"):
+        print(line)
+
+def format_csv_values(values):
+    return ",".join("" if v is None else (str(v) if isinstance(v, int) else f"{v:.3f}") for v in values)
+
+def log_result(tm, dev_name, dev_ip, status_text, web_stat, stats=None, web=None, inferred=False, retry=""):
     if not LOG_TO_FILE: return
+    if stats is None:
+        measures = ",,,,,"
+    else:
+        measures = format_csv_values((stats.loss, stats.rtt_min, stats.rtt_avg, stats.rtt_max, stats.rtt_mdev, stats.jitter))
+    if web is None:
+        measures += ",,,,"
+    else:
+        measures += "," + format_csv_values((web.code, web.connect_ms, web.tls_ms, web.ttfb_ms))
+    measures += ",UPSTREAM" if inferred else ","
+    measures += "," + retry
+    line = f"{tm['region']},{tm['name']},{tm['type']},{tm['prefix']},{dev_name},{dev_ip},{status_text},{web_stat},{measures}\n"
     try:
         with open(CSV_FILENAME, 'a') as f:
-            tm_type = "BELIRSIZ"
-            if tm['ip'].endswith(".93"): tm_type = "OTOMASYONLU"
-            elif tm['ip'].endswith(".66"): tm_type = "KLASİK"
-            parts = tm['ip'].split('.')
-            prefix = ".".join(parts[:3]) if len(parts) == 4 else "0.0.0"
-            f.write(f"{tm['region']},{tm['name']},{tm_type},{prefix},{dev_name},{dev_ip},{status_text},{web_stat}\n")
+            f.write(line)
     except:
         pass
 
-def print_result(tm, dev_name, dev_ip, status, web_msg="", extra_info=None, inline_extra=False):
+def record_history(tm, dev_name, dev_ip, status, web_stat, stats=None, web=None, inferred=False):
+    """--history aktifse sonucu bellekte biriktirir (tarama sonunda toplu yazılır)."""
+    if HISTORY_ROWS is None: return
+    HISTORY_ROWS.append(tmhistory.make_row(tm, dev_name, dev_ip, status, web_stat, stats, web, inferred))
+
+def print_result(tm, dev_name, dev_ip, status, web_msg="", extra_info=None, inline_extra=False, stats=None):
     if LOG_TO_FILE or ONLY_LIST: return
     
     status_text = "SUCCESS" if status else "FAILED"
@@ -360,75 +484,58 @@ def print_result(tm, dev_name, dev_ip, status, web_msg="", extra_info=None, inli
         f"{meta_color}{nm_clean[:20]:<20}{Colors.NC} | "
         f"{meta_color}{dev_clean[:16]:<16} {dev_ip:<15}{Colors.NC} : "
         f"{status_color}{status_text:<10}{Colors.NC} "
-        f"{CURRENT_PING_LOSS} {web_msg}"
+        f"{format_ping(stats)} {web_msg}"
     )
 
     if extra_info:
         if inline_extra:
-            print(f"{line} {extra_info}")
+            emit(f"{line} {extra_info}")
         else:
-            print(line)
+            emit(line)
             prefix_padding = " " * 29
-            print(f"{prefix_padding}{Colors.GRAY}↳{Colors.NC} {extra_info}")
+            emit(f"{prefix_padding}{Colors.GRAY}↳{Colors.NC} {extra_info}")
     else:
-        print(line)
+        emit(line)
 
-def run_check(tm, dev_name, dev_ip, check_type):
-    global CURRENT_PING_LOSS
+def report_check(result):
+    """Web/port kontrollü cihazın (tmscan.DeviceResult) sonucunu rapora, geçmişe ve konsola işler."""
+    tm, dev_name, dev_ip = result.tm, result.name, result.ip
+    w_stat = result.web_stat
+    p_stat = result.ok
+    web = result.web
+    stats = result.stats
     
-    # Komut modundaysak normal check yapma, doğrudan komutu çalıştır
-    if CUSTOM_COMMAND_MODE and "Kyland" in dev_name:
-         # Sadece Kyland-1 için çalıştır (genellikle .94)
-         if dev_ip.endswith(".94"):
-             run_kyland_command_mode(tm, CUSTOM_COMMAND_STR)
-         return True # Diğer checkleri atla
-
-    if FILTER_DEVICE:
-        if FILTER_DEVICE.lower() not in dev_name.lower():
-            return True
-
-    p_stat = False
-    w_stat = "N/A"
-    
-    if check_ping(dev_ip):
-        p_stat = True
-        if check_type == "HTTPS":
-            if check_port(dev_ip, 443): w_stat = "HTTPS_OPEN"
-            else: w_stat = "HTTPS_KAPALI (Ping Var)"
-        elif check_type == "HTTP":
-            if check_port(dev_ip, 80): w_stat = "HTTP_OPEN"
-            else: w_stat = "HTTP_KAPALI (Ping Var)"
-            
-    status_text = "SUCCESS" if p_stat else "FAILED"
-    
-    log_result(tm, dev_name, dev_ip, status_text, w_stat)
+    log_result(tm, dev_name, dev_ip, result.status_text, w_stat, stats, web, retry=result.retry)
+    record_history(tm, dev_name, dev_ip, p_stat, w_stat, stats, web)
     
     web_msg_colored = ""
     if w_stat != "N/A":
-        if "KAPALI" in w_stat:
+        if "(Ping Var)" in w_stat:
             web_msg_colored = f"{Colors.MAGENTA}[Web: {w_stat}]{Colors.NC}"
         else:
             web_msg_colored = f"[Web: {w_stat}]"
-
-    should_check_deep = (PING_COUNT == 4) or (VERBOSE_MODE)
+        if web is not None:
+            web_msg_colored += f" {format_web(web)}"
 
     extra_msg_list = []
     # GÜNCELLEME: VLAN kontrolü kaldırıldı, sadece Versiyon kontrolü kaldı.
-    if should_check_deep and "Kyland" in dev_name and p_stat:
-        if os.path.exists("/usr/local/bin/kyland_check.py"):
-             v_ok, v_out = check_kyland_extra(dev_ip)
-             v_color = Colors.GREEN if v_ok else Colors.RED
-             extra_msg_list.append(f"{v_color}[{v_out}]{Colors.NC}")
+    if result.version is not None:
+        v_ok, v_out, v_age = result.version
+        v_color = Colors.GREEN if v_ok else Colors.RED
+        if v_age is not None:
+            v_out += f" {Colors.GRAY}(önbellek, {tmcache.format_age(v_age)}){v_color}"
+        extra_msg_list.append(f"{v_color}[{v_out}]{Colors.NC}")
     
     extra_info_str = " ".join(extra_msg_list) if extra_msg_list else None
     inline_mode = True if VERBOSE_MODE else False
 
-    print_result(tm, dev_name, dev_ip, p_stat, web_msg_colored, extra_info=extra_info_str, inline_extra=inline_mode)
-    
-    return p_stat
+    print_result(tm, dev_name, dev_ip, p_stat, web_msg_colored, extra_info=extra_info_str, inline_extra=inline_mode, stats=stats)
 
-def check_infrastructure(tm, dev_name, dev_ip):
-    p_stat = check_ping(dev_ip)
+def report_infrastructure(result):
+    """Altyapı cihazının (Sdwan / ULAK) sonucunu işler. Başarılıysa sadece cihaz filtresine uyuyorsa basılır."""
+    tm, dev_name, dev_ip = result.tm, result.name, result.ip
+    stats = result.stats
+    p_stat = result.ok
     should_print = False
     
     if not p_stat:
@@ -439,8 +546,9 @@ def check_infrastructure(tm, dev_name, dev_ip):
         else:
             should_print = True
             
-    status_text = "SUCCESS" if p_stat else "FAILED"
-    log_result(tm, dev_name, dev_ip, status_text, "N/A")
+    status_text = result.status_text
+    log_result(tm, dev_name, dev_ip, status_text, "N/A", stats, retry=result.retry)
+    record_history(tm, dev_name, dev_ip, p_stat, "N/A", stats)
     
     if should_print and not LOG_TO_FILE and not ONLY_LIST:
         status_color = Colors.GREEN if p_stat else Colors.RED
@@ -453,16 +561,685 @@ def check_infrastructure(tm, dev_name, dev_ip):
             f"{meta_color}{nm_clean[:20]:<20}{Colors.NC} | "
             f"{meta_color}{dev_name[:16]:<16} {dev_ip:<15}{Colors.NC} : "
             f"{status_color}{status_text:<10}{Colors.NC} "
-            f"{CURRENT_PING_LOSS}"
+            f"{format_ping(stats)}"
         )
-        print(line)
+        emit(line)
+
+def report_inferred(result):
+    """Upstream'i erişilemez bölgedeki TM'nin problanmayan kök cihazını FAILED (çıkarım) olarak işler."""
+    tm, root_name, ip = result.tm, result.name, result.ip
+    log_result(tm, root_name, ip, "FAILED", "N/A", inferred=True)
+    record_history(tm, root_name, ip, False, "N/A", inferred=True)
+    if LOG_TO_FILE or ONLY_LIST: return
+    meta_color = Colors.YELLOW if tm['ip'].endswith(".93") else Colors.WHITE
+    emit(
+        f"{meta_color}{str(tm['region']):<3}{Colors.NC} | "
+        f"{meta_color}{clean_turkish(tm['name'])[:20]:<20}{Colors.NC} | "
+        f"{meta_color}{root_name[:16]:<16} {ip:<15}{Colors.NC} : "
+        f"{Colors.RED}{'FAILED':<10}{Colors.NC} {Colors.ORANGE}[UPSTREAM ERİŞİLEMEZ - çıkarım]{Colors.NC}"
+    )
+
+def report_result(result):
+    """tmscan.DeviceResult'ı işler. Atlanan cihazlar (bağımlılık / cihaz filtresi) raporlanmaz."""
+    if result.skipped:
+        return
+    if result.inferred:
+        report_inferred(result)
+    elif result.infra:
+        report_infrastructure(result)
+    else:
+        report_check(result)
+
+def scan_options(**overrides):
+    """Komut satırı ayarlarından tmscan.ScanOptions kurar. overrides: değiştirilecek alanlar."""
+    checks = ["ping", "web" if WEB_DEEP else "port"]
+    # Tekil TM sorgusunda veya -v ile Kyland versiyon kontrolü yapılır
+    if SINGLE_TM or VERBOSE_MODE:
+        checks.append("version")
+    options = tmscan.ScanOptions(checks=tuple(checks), ping_count=PING_COUNT,
+                                 device_filter=FILTER_DEVICE, kyland_script=KYLAND_SCRIPT)
+    return options._replace(**overrides)
+
+def load_cost_history():
+    """Geçmiş deposundan cihaz bazında gecikme / zaman aşımı ölçümleri. Depo yoksa veya okunamazsa None
+    (zamanlama sadece prob planına göre yapılır, tarama etkilenmez)."""
+    if not os.path.exists(HISTORY_DB):
+        return None
+    try:
+        conn = tmhistory.open_store(HISTORY_DB)
+        try:
+            return tmhistory.device_costs(conn, COST_HISTORY_DAYS)
+        finally:
+            conn.close()
+    except Exception:
+        return None
+
+def run_scan(tms, scanner):
+    """Scanner'ın sonuç akışını kanonik (bölge/isim) sırada işler. Sıradaki TM'nin sonuçları
+    geldikçe basılır; paralel modda diğer TM'lerinki sıra onlara gelene kadar bekletilir.
+    Canlı panel sonuç geldiği anda güncellenir."""
+    results = {id(tm): [] for tm in tms}
+    head, shown = 0, 0
+
+    def advance():
+        nonlocal head, shown
+        while head < len(tms):
+            current = results[id(tms[head])]
+            for result in current[shown:]:
+                report_result(result)
+            shown = len(current)
+            if shown < len(tms[head]['plan']):
+                return
+            head, shown = head + 1, 0
+
+    if DASHBOARD is not None:
+        for tm in tms:
+            if not tm['plan']:
+                DASHBOARD.tm_done(tm)
+    for result in scanner.scan(tms, PARALLEL_WORKERS):
+        tm = result.tm
+        done = results[id(tm)]
+        done.append(result)
+        if DASHBOARD is not None:
+            if not result.skipped:
+                DASHBOARD.record(tm, result.name, result.ip, result.ok, result.elapsed)
+            if len(done) == len(tm['plan']):
+                DASHBOARD.tm_done(tm)
+        advance()
+    advance()
+
+def scope_query():
+    """Konumsal argümanlardan gelen kapsamı (bölge / isim / dosya) sorgu ağacı olarak kurar."""
+    if FILTER_SCOPE == "REGION":
+        return tmfilter.field_test("region", "=", [FILTER_VAL], normalize_text)
+    if ONLY_LIST:
+        return tmfilter.MATCH_ALL
+    if FILTER_SCOPE == "NAME":
+        return tmfilter.field_test("name", "=" if FILTER_EXACT else "~", [FILTER_VAL], normalize_text)
+    if FILTER_SCOPE == "FILE":
+        return tmfilter.field_test("ip", "in", sorted(TARGET_IPS), normalize_text)
+    return tmfilter.MATCH_ALL
+
+def select_tms(inventory):
+    """Kapsam ve --filter ifadesine birlikte uyan TM'ler (bölge/isim sırasında)."""
+    return inventory.select(tmfilter.all_of(scope_query(), FILTER_QUERY))
+
+# --- İZLEME MODU (--watch) ---
+
+WATCH_EVENTS = 5 # Tablonun altında gösterilen son durum geçişi sayısı
+WATCH_SPARK = 20 # RTT grafiğinin genişliği (örnek)
+
+def watch_lines(tm, windows, pinger, interval, rounds, started, events):
+    """İzleme tablosunun satırları (her turda aynı sayıda satır)."""
+    elapsed = time.monotonic() - started
+    meta_color = Colors.YELLOW if tm['ip'].endswith(".93") else Colors.WHITE
+    lines = [
+        f"{Colors.YELLOW}İZLEME:{Colors.NC} {clean_turkish(tm['name'])} ({tm['ip']})   "
+        f"Aralık: {interval:g} sn   Tur: {rounds}   Süre: {int(elapsed) // 60:02d}:{int(elapsed) % 60:02d}   "
+        f"{Colors.GRAY}[{pinger.mode}] Çıkış: Ctrl+C{Colors.NC}",
+        "-" * 114,
+        f"{Colors.GRAY}{'CIHAZ':<16} {'IP ADRESI':<15} : {'DURUM':<6} {'SON ms':>8} {'ORT ms':>8} {'KAYIP':>7}  "
+        f"T {'RTT (son ' + str(WATCH_SPARK) + ')':<{WATCH_SPARK}}  {'GECIS':>5}  {'DEGISIM':<8}{Colors.NC}",
+    ]
+    for w in windows:
+        if w.up is None:
+            state = f"{Colors.GRAY}{'-':<6}{Colors.NC}"
+        elif w.up:
+            state = f"{Colors.GREEN}{'UP':<6}{Colors.NC}"
+        else:
+            state = f"{Colors.RED}{'DOWN':<6}{Colors.NC}"
+        loss = w.loss
+        loss_color = Colors.GREEN if loss == 0 else (Colors.ORANGE if loss < 50 else Colors.RED)
+        changed = time.strftime("%H:%M:%S", time.localtime(w.changed_at)) if w.changed_at else "-"
+        lines.append(
+            f"{meta_color}{w.name[:16]:<16} {w.ip:<15}{Colors.NC} : {state} "
+            f"{tmprobe.format_ms(w.last_rtt):>8} {tmprobe.format_ms(w.rtt_avg):>8} "
+            f"{loss_color}{loss:>6.1f}%{Colors.NC}  {w.trend()} {Colors.CYAN}{w.sparkline(WATCH_SPARK):<{WATCH_SPARK}}{Colors.NC}  "
+            f"{w.transitions:>5}  {changed:<8}"
+        )
+    lines.append("-" * 114)
+    recent = list(events)[-WATCH_EVENTS:]
+    lines.extend(recent + [""] * (WATCH_EVENTS - len(recent)))
+    return lines
+
+def run_watch(tm, interval, window):
+    """Tek TM'nin cihazlarını aralıklarla pingler, tabloyu yerinde günceller.
+    Soket, plan ve pencere durumları tur boyunca açık tutulur."""
+    probes = [p for p in tm['plan'] if not FILTER_DEVICE or FILTER_DEVICE.lower() in p.name.lower()]
+    if not probes:
+        print(f"{Colors.RED}HATA: İzlenecek cihaz bulunamadı.{Colors.NC}")
+        sys.exit(1)
+    windows = [tmwatch.DeviceWindow(p.name, p.ip, window) for p in probes]
+    ips = [p.ip for p in probes]
+    pinger = tmwatch.IcmpPinger()
+    timeout = min(interval * 0.9, 1.0)
+    interactive = sys.stdout.isatty()
+    events = []
+    drawn = 0
+    rounds = 0
+    started = time.monotonic()
+    next_tick = started
+    try:
+        while True:
+            results = pinger.probe(ips, timeout)
+            now = time.time()
+            rounds += 1
+            for w in windows:
+                if w.add(results.get(w.ip), now):
+                    color, text = (Colors.GREEN, "UP") if w.up else (Colors.RED, "DOWN")
+                    event = (f"{Colors.GRAY}{time.strftime('%H:%M:%S', time.localtime(now))}{Colors.NC} "
+                             f"{w.name:<16} {w.ip:<15} -> {color}{text}{Colors.NC}")
+                    events.append(event)
+                    if not interactive:
+                        print(event, flush=True)
+            del events[:-WATCH_EVENTS]
+
+            if interactive:
+                lines = watch_lines(tm, windows, pinger, interval, rounds, started, events)
+                out = f"\033[{drawn}F" if drawn else ""
+                out += "".join(f"\033[K{line}\n" for line in lines)
+                sys.stdout.write(out)
+                sys.stdout.flush()
+                drawn = len(lines)
+
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()  # Tur aralıktan uzun sürdüyse kaymayı biriktirme
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pinger.close()
+
+    print("-" * 114)
+    print(f"{Colors.CYAN}İZLEME ÖZETİ:{Colors.NC} {rounds} tur, {int(time.monotonic() - started)} sn")
+    for w in windows:
+        total_loss = 100.0 * w.lost / w.sent if w.sent else 0.0
+        loss_color = Colors.GREEN if w.lost == 0 else Colors.RED
+        print(f"{w.name[:16]:<16} {w.ip:<15} : {loss_color}Kayıp %{total_loss:.1f} ({w.lost}/{w.sent}){Colors.NC}  "
+              f"Geçiş: {w.transitions}")
+    print("-" * 114)
+
+# --- İKİ FAZLI TARAMA ---
+
+def pass_summary(options):
+    """Tur ayarlarının kısa özeti: '1 paket, ping 0.5 sn, web 1 sn, versiyon 5 sn'."""
+    parts = [f"{options.ping_count} paket", f"ping {options.ping_timeout:g} sn"]
+    if "web" in options.checks:
+        parts.append(f"web {options.web_timeout:g} sn")
+    elif "port" in options.checks:
+        parts.append(f"port {options.port_timeout:g} sn")
+    if "version" in options.checks:
+        parts.append(f"versiyon {options.version_timeout:g} sn")
+    return ", ".join(parts)
+
+def run_two_phase(tms, scanner):
+    """Önce tüm TM'ler tek paket ve kısa süre sınırlarıyla (ping, port, web, versiyon) taranır (scanner, FAST_PASS ayarlı).
+    Hatalı cihazı olan TM'lerde sadece başarısız, arkasında atlanan ve web / versiyon kontrolü süre sınırına
+    takılan cihazlar daha çok paket ve uzun süre sınırıyla tekrar problanır; ilk turda cevap verenlerin sonuçları (port / web / versiyon dahil) korunur. Sonuçlar iki tur bittikten sonra kanonik sırada basılır."""
+    started = time.monotonic()
+    results = {id(tm): [] for tm in tms}
+    with profiled("faz1", "faz", tm=len(tms)):
+        for result in scanner.scan(tms, PARALLEL_WORKERS):
+            results[id(result.tm)].append(result)
+    fast_secs = time.monotonic() - started
+
+    # Erişilemez olarak doğrulanan bölgelerde tekrar denemek anlamsız; ikinci turda budama yok
+    down = {region for region, _, _, _ in scanner.upstream.down_regions()} if scanner.upstream is not None else set()
+    retry = [tm for tm in tms if tm['region'] not in down
+             and any(r.probed and (not r.ok or r.timed_out) for r in results[id(tm)])]
+    print(f"{Colors.GRAY}FAZ 1: {len(tms)} TM {fast_secs:.1f} sn'de tarandı ({pass_summary(scanner.options)}). "
+          f"{len(retry)} TM tekrar problanacak.{Colors.NC}")
+
+    started = time.monotonic()
+    previous = {r.ip: r for tm in retry for r in results[id(tm)]}
+    slow = tmscan.Scanner(scanner.options._replace(**SLOW_PASS), GOVERNOR, PROFILER,
+                          cache=scanner.cache, history=scanner.history)
+    with profiled("faz2", "faz", tm=len(retry)):
+        for tm in retry:
+            results[id(tm)] = []
+        for result in slow.scan(retry, PARALLEL_WORKERS, previous):
+            results[id(result.tm)].append(result)
+    recovered = sum(1 for tm in retry for r in results[id(tm)] if r.retry == tmscan.RECOVERED)
+    print(f"{Colors.GRAY}FAZ 2: {len(retry)} TM {time.monotonic() - started:.1f} sn'de tekrar problandı "
+          f"({pass_summary(slow.options)}). {recovered} cihaz kurtarıldı.{Colors.NC}")
+    for tm in tms:
+        for result in results[id(tm)]:
+            report_result(result)
+
+def print_inventory_row(tm):
+    nm_clean = clean_turkish(tm["name"])
+    line_color = Colors.WHITE
+    if tm["ip"].endswith(".93"): line_color = Colors.YELLOW
+    
+    print(f"{line_color}{str(tm['region']):<3}{Colors.NC} | "
+          f"{line_color}{nm_clean[:25]:<25}{Colors.NC} | "
+          f"{line_color}{tm['ip']:<15}{Colors.NC} | "
+          f"{line_color}{str(tm['c3530']):<5}{Colors.NC} | "
+          f"{line_color}{str(tm['cKyland']):<6}{Colors.NC} | "
+          f"{line_color}{str(tm['mgmt_vlan'])}{Colors.NC}")
+
+def run_selected(selected, scanner):
+    """Seçilen TM'leri aktif moda göre işler (listeleme / komut / tarama)."""
+    scan_queue = []
+    for tm in selected:
+        if ONLY_LIST:
+            print_inventory_row(tm)
+            continue
         
-    return p_stat
+        # KOMUT MODU: Sadece Kyland-1 üzerinde komut çalıştırılır
+        if CUSTOM_COMMAND_MODE:
+             run_kyland_command_mode(tm, CUSTOM_COMMAND_STR)
+             continue
+
+        # NORMAL MOD AKIŞI: Derlenmiş planlar tmscan ile taranır
+        scan_queue.append(tm)
+
+    if scan_queue:
+        if TWO_PHASE:
+            run_two_phase(scan_queue, scanner)
+        else:
+            run_scan(scan_queue, scanner)
+
+# --- PARÇALI TARAMA (SHARD) & RAPOR BİRLEŞTİRME ---
+
+def pop_option(args, name):
+    """'--isim DEĞER' çiftini argüman listesinden çıkarır ve değeri döner. Yoksa None."""
+    if name not in args:
+        return None
+    idx = args.index(name)
+    if idx + 1 >= len(args) or args[idx + 1].startswith("--"):
+        print(f"{Colors.RED}HATA: {name} parametresi bir değer bekliyor.{Colors.NC}")
+        sys.exit(1)
+    value = args[idx + 1]
+    del args[idx:idx + 2]
+    return value
+
+def parse_shard(text):
+    """'i/N' formatını (i, N) olarak çözer. i 1'den başlar."""
+    match = re.match(r"^(\d+)/(\d+)$", text.strip())
+    if not match or not (1 <= int(match.group(1)) <= int(match.group(2))):
+        print(f"{Colors.RED}HATA: Geçersiz parça tanımı '{text}'. Örnek: --shard 2/4{Colors.NC}")
+        sys.exit(1)
+    return int(match.group(1)), int(match.group(2))
+
+def parse_regions(text):
+    """'3,5,7' formatındaki bölge listesini int kümesine çevirir."""
+    try:
+        return {int(r) for r in text.split(",") if r.strip()}
+    except ValueError:
+        print(f"{Colors.RED}HATA: Geçersiz bölge listesi '{text}'. Örnek: --regions 3,5{Colors.NC}")
+        sys.exit(1)
+
+def select_shard(db_data, index, total):
+    """TM listesini beklenen prob sayısına göre dengeli N parçaya böler ve i. parçayı döner.
+    Dağıtım deterministiktir: en pahalı TM önce, her zaman en az yüklü parçaya atanır."""
+    loads = [0] * total
+    owner = {}
+    for tm in sorted(db_data, key=lambda t: (-len(t['plan']), t['region'], t['name'])):
+        target = min(range(total), key=lambda s: (loads[s], s))
+        loads[target] += max(len(tm['plan']), 1)
+        owner[id(tm)] = target
+    return [tm for tm in db_data if owner[id(tm)] == index - 1]
+
+def write_report_meta(meta):
+    """Parçalı raporun başına/sonuna '# anahtar: değer' satırları ekler."""
+    try:
+        with open(CSV_FILENAME, 'a') as f:
+            for key, value in meta.items():
+                f.write(f"# {key}: {value}\n")
+    except:
+        pass
+
+def read_report(path):
+    """Rapor dosyasını okur: (meta sözlüğü, başlık satırı, veri satırları)."""
+    meta, header, rows = {}, None, []
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if line.startswith("#"):
+                key, _, value = line[1:].partition(":")
+                meta[key.strip()] = value.strip()
+                continue
+            if not line.strip():
+                continue
+            row = next(csv.reader([line]))
+            if header is None:
+                header = row
+            else:
+                rows.append(row)
+    return meta, header, rows
+
+def merge_reports(paths):
+    """Parçalı raporları bölge/isim sırasında tek bir TM_Rapor dosyasında birleştirir."""
+    if not paths:
+        print(f"{Colors.RED}HATA: Birleştirilecek rapor dosyası verilmedi.{Colors.NC}")
+        print(f"{Colors.YELLOW}Örnek:{Colors.NC} tmcheck.py merge TM_Rapor_*_parca*.csv")
+        sys.exit(1)
+
+    header = None
+    merged = []
+    seen_tms = {}
+    warned_tms = set()
+    shards_seen = set()
+    shard_total = None
+    incomplete = []
+
+    for path in paths:
+        if not os.path.isfile(path) and os.path.isfile(os.path.join(SOURCE_DIR, path)):
+            path = os.path.join(SOURCE_DIR, path)
+        try:
+            meta, f_header, rows = read_report(path)
+        except Exception as e:
+            print(f"{Colors.RED}HATA: Dosya okunamadı: {path} ({e}){Colors.NC}")
+            sys.exit(1)
+
+        if f_header is None:
+            print(f"{Colors.ORANGE}UYARI: Boş rapor atlanıyor: {path}{Colors.NC}")
+            continue
+        if header is None:
+            header = f_header
+        elif f_header != header:
+            print(f"{Colors.RED}HATA: Rapor başlığı uyuşmuyor: {path}{Colors.NC}")
+            sys.exit(1)
+
+        if "parca" in meta:
+            idx, total = parse_shard(meta["parca"])
+            shards_seen.add(idx)
+            shard_total = shard_total or total
+        if "bitis" not in meta:
+            incomplete.append(path)
+
+        for row in rows:
+            if len(row) < 2 or not row[0].isdigit():
+                continue
+            key = (int(row[0]), row[1])
+            owner = seen_tms.setdefault(key, path)
+            if owner != path:
+                if key not in warned_tms:
+                    warned_tms.add(key)
+                    print(f"{Colors.ORANGE}UYARI: {row[1]} birden fazla raporda var, ilk kayıt kullanılıyor ({owner}).{Colors.NC}")
+                continue
+            merged.append((key, row))
+
+    if header is None:
+        print(f"{Colors.RED}HATA: Birleştirilecek veri bulunamadı.{Colors.NC}")
+        sys.exit(1)
+
+    # Kararlı sıralama: TM içindeki cihaz sırası korunur
+    merged.sort(key=operator.itemgetter(0))
+
+    try:
+        with open(CSV_FILENAME, 'w', newline='') as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(header)
+            for _, row in merged:
+                writer.writerow(row)
+    except Exception as e:
+        print(f"{Colors.RED}HATA: Dosya oluşturulamadı: {CSV_FILENAME} ({e}){Colors.NC}")
+        sys.exit(1)
+
+    status_idx = header.index("Ping_Durumu") if "Ping_Durumu" in header else 6
+    failed_by_region = {}
+    success = failed = 0
+    for (region, _), row in merged:
+        if len(row) > status_idx and row[status_idx] == "SUCCESS":
+            success += 1
+        else:
+            failed += 1
+            failed_by_region[region] = failed_by_region.get(region, 0) + 1
+
+    print(f"{Colors.YELLOW}MOD:{Colors.NC} Rapor Birleştirme ({len(paths)} dosya)")
+    print("-" * 114)
+    if shard_total:
+        missing = sorted(set(range(1, shard_total + 1)) - shards_seen)
+        print(f"{Colors.CYAN}PARÇALAR:{Colors.NC} {len(shards_seen)}/{shard_total}", end="")
+        if missing:
+            print(f"  {Colors.RED}EKSİK: {', '.join(str(m) for m in missing)}{Colors.NC}")
+        else:
+            print()
+    for path in incomplete:
+        print(f"{Colors.ORANGE}UYARI: Tamamlanmamış parça (bitiş kaydı yok): {path}{Colors.NC}")
+    print(f"{Colors.CYAN}TM SAYISI:{Colors.NC} {len(seen_tms)}   "
+          f"{Colors.CYAN}CİHAZ:{Colors.NC} {len(merged)}   "
+          f"{Colors.GREEN}SUCCESS: {success}{Colors.NC}   {Colors.RED}FAILED: {failed}{Colors.NC}")
+    for region in sorted(failed_by_region):
+        print(f"  {str(region):<3} | FAILED: {failed_by_region[region]}")
+    print("-" * 114)
+    print(f"{Colors.GREEN}BİRLEŞTİRME BİTTİ.{Colors.NC} Rapor: {CSV_FILENAME}")
+
+# --- GEÇMİŞ DEPOSU (SQLITE) ---
+
+def resolve_history_tm(conn, term):
+    """Depodaki TM isimleri içinde arama yapar. Tam eşleşme öncelikli, tekil isim döner."""
+    search = normalize_text(term)
+    names = tmhistory.tm_names(conn)
+    exact = [n for n in names if normalize_text(n) == search]
+    if exact:
+        return exact[0]
+    matches = [n for n in names if search in normalize_text(n)]
+    if len(matches) == 1:
+        return matches[0]
+    if not matches:
+        print(f"{Colors.RED}HATA: '{term}' geçmiş deposunda bulunamadı.{Colors.NC}")
+    else:
+        print(f"{Colors.YELLOW}UYARI: Birden fazla TM eşleşti, daha net bir isim girin:{Colors.NC}")
+        for m in matches:
+            print(f"  - {m}")
+    sys.exit(1)
+
+def run_history_command(args):
+    """'history' alt komutları: import, availability, outages, worst."""
+    days_arg = pop_option(args, "--days")
+    top_arg = pop_option(args, "--top")
+    days = int(days_arg) if days_arg and days_arg.isdigit() else 30
+    top = int(top_arg) if top_arg and top_arg.isdigit() else 10
+
+    sub = args[0].lower() if args else ""
+    rest = args[1:]
+    conn = tmhistory.open_store(HISTORY_DB)
+
+    if sub in ["import", "ice-aktar"]:
+        if not rest:
+            print(f"{Colors.RED}HATA: İçe aktarılacak rapor dosyası verilmedi.{Colors.NC}")
+            sys.exit(1)
+        total = 0
+        for path in rest:
+            if not os.path.isfile(path) and os.path.isfile(os.path.join(SOURCE_DIR, path)):
+                path = os.path.join(SOURCE_DIR, path)
+            try:
+                meta, header, rows = read_report(path)
+                count = tmhistory.import_report(conn, path, meta, header or [], rows)
+            except Exception as e:
+                print(f"{Colors.RED}HATA: {path} aktarılamadı: {e}{Colors.NC}")
+                continue
+            if count is None:
+                print(f"{Colors.GRAY}Atlandı (daha önce aktarılmış): {path}{Colors.NC}")
+            else:
+                total += count
+                print(f"{Colors.GREEN}Aktarıldı:{Colors.NC} {path} ({count} kayıt)")
+        print(f"{Colors.CYAN}TOPLAM AKTARILAN KAYIT: {total}{Colors.NC} -> {HISTORY_DB}")
+
+    elif sub in ["availability", "erisim"] and rest:
+        tm = resolve_history_tm(conn, rest[0])
+        device = rest[1] if len(rest) > 1 else None
+        print(f"{Colors.YELLOW}ERİŞİLEBİLİRLİK:{Colors.NC} {tm} (Son {days} gün)")
+        print("-" * 80)
+        print(f"{Colors.GRAY}{'CIHAZ':<16} {'ORNEK':>6} {'BASARILI':>9} {'ORAN':>8}   {'SON ORNEK':<19} DURUM{Colors.NC}")
+        for dev, total, ok, pct, last_ts, last_ok in tmhistory.availability(conn, tm, device, days):
+            pct_color = Colors.GREEN if pct >= 99 else (Colors.ORANGE if pct >= 90 else Colors.RED)
+            last_text = f"{Colors.GREEN}SUCCESS{Colors.NC}" if last_ok else f"{Colors.RED}FAILED{Colors.NC}"
+            print(f"{dev[:16]:<16} {total:>6} {ok:>9} {pct_color}{pct:>7.2f}%{Colors.NC}   {last_ts:<19} {last_text}")
+        print("-" * 80)
+
+    elif sub in ["outages", "kesinti"] and rest:
+        tm = resolve_history_tm(conn, rest[0])
+        device = rest[1] if len(rest) > 1 else None
+        print(f"{Colors.YELLOW}KESİNTİ PENCERELERİ:{Colors.NC} {tm} (Son {days} gün)")
+        print("-" * 80)
+        print(f"{Colors.GRAY}{'CIHAZ':<16} {'BASLANGIC':<19}   {'BITIS':<19} {'ORNEK':>6}{Colors.NC}")
+        windows = tmhistory.outages(conn, tm, device, days)
+        for dev, start, end, samples in windows:
+            end_text = end if end else f"{Colors.RED}{'DEVAM EDIYOR':<19}{Colors.NC}"
+            print(f"{dev[:16]:<16} {start:<19} - {end_text:<19} {samples:>6}")
+        if not windows:
+            print(f"{Colors.GREEN}Kesinti kaydı yok.{Colors.NC}")
+        print("-" * 80)
+
+    elif sub in ["worst", "enkotu"]:
+        region = int(rest[0]) if rest and rest[0].isdigit() else None
+        print(f"{Colors.YELLOW}EN KÖTÜ TM'LER:{Colors.NC} (Son {days} gün, bölge başına ilk {top})")
+        print("-" * 80)
+        by_region = tmhistory.worst_tms(conn, region, days, top)
+        for reg in sorted(by_region):
+            for tm, total, failed, pct in by_region[reg]:
+                print(f"{str(reg):<3} | {clean_turkish(tm)[:25]:<25} | ORAN: {pct:>6.2f}%  FAILED: {failed}/{total}")
+        if not by_region:
+            print(f"{Colors.GREEN}Başarısız kayıt yok.{Colors.NC}")
+        print("-" * 80)
+
+    else:
+        print(f"{Colors.RED}HATA: Geçersiz history komutu.{Colors.NC}")
+        print(f"{Colors.YELLOW}Kullanım:{Colors.NC} tmcheck.py history import <rapor.csv ...>")
+        print("          tmcheck.py history availability <TM> [Cihaz] [--days 30]")
+        print("          tmcheck.py history outages <TM> [Cihaz] [--days 30]")
+        print("          tmcheck.py history worst [Bölge] [--days 30] [--top 10]")
+        sys.exit(1)
+    conn.close()
+
+# --- KYLAND KONFİGÜRASYON YEDEĞİ ---
+
+def fetch_running_config(ip):
+    """Kyland'dan running-config çeker. (True, temiz metin) veya (False, hata) döner."""
+    if not check_ping(ip).ok:
+        return False, "Ping Yok"
+    cmd = ["python3", KYLAND_SCRIPT, ip, BACKUP_COMMAND]
+    try:
+        with profiled("kyland_check", ip=ip, komut=BACKUP_COMMAND):
+            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=60)
+    except subprocess.TimeoutExpired:
+        return False, "Timeout"
+    except Exception:
+        return False, "Script Hatası"
+    config = clean_cli_output(result.stdout) if result.returncode == 0 else ""
+    if not config.strip():
+        return False, "Çıktı Boş"
+    return True, config + "\n"
+
+def backup_targets(db_data, term):
+    """Yedeklenecek Kyland'lar: [(tm, probe)]. term: bölge no, TM adı parçası veya boş (tümü)."""
+    if term and term.isdigit():
+        tms = [tm for tm in db_data if tm['region'] == int(term)]
+    elif term:
+        search = normalize_text(term)
+        tms = [tm for tm in db_data if search in normalize_text(tm['name'])]
+    else:
+        tms = db_data
+    return [(tm, probe) for tm in tms for probe in tm['plan'] if probe.name.startswith("Kyland")]
+
+def pop_database_arg(args):
+    """Tarama modlarındaki gibi baştaki argüman bir veritabanı dosyasıysa (.txt liste dosyaları hariç)
+    listeden çıkarır ve yolunu döner. Verilmediyse None."""
+    if not args or args[0].endswith(".txt"):
+        return None
+    for path in (args[0], os.path.join(SOURCE_DIR, args[0])):
+        if os.path.isfile(path):
+            args.pop(0)
+            return path
+    return None
+
+def run_backup_command(args):
+    """'backup' alt komutları: [VERİTABANI] [HEDEF] toplama, 'changes' cihazın son toplamasında değişenler,
+    'diff' fark. Veritabanı verilirse changes / diff sadece o envanterdeki cihazları kapsar."""
+    workers_arg = pop_option(args, "--parallel") or pop_option(args, "-j")
+    workers = int(workers_arg) if workers_arg and workers_arg.isdigit() and int(workers_arg) > 0 else BACKUP_WORKERS
+    db_path = pop_database_arg(args)
+    scope = None
+    if db_path is not None:
+        scope = {probe.ip for tm in load_database(db_path) for probe in tm['plan']}
+    sub = args[0].lower() if args else ""
+    store = tmbackup.ConfigStore(BACKUP_DIR)
+    if store.broken_index is not None:
+        print(f"{Colors.ORANGE}UYARI: Yedek index'i okunamadı, boş index ile devam ediliyor. Eski dosya: {store.broken_index}{Colors.NC}")
+
+    if sub in ["changes", "degisen"]:
+        last = store.last_collection()
+        if last is None:
+            print(f"{Colors.YELLOW}Henüz yedek alınmamış.{Colors.NC} ({BACKUP_DIR})")
+            return
+        print(f"{Colors.YELLOW}DEĞİŞEN KONFİGÜRASYONLAR:{Colors.NC} (Her cihazın kendi son toplaması, en yeni: {last})")
+        print("-" * 114)
+        changed = store.changed_in_last_collection(scope)
+        for ip, e in changed:
+            label = f"{Colors.CYAN}YENİ{Colors.NC}" if e["previous"] is None else f"{Colors.ORANGE}DEĞİŞTİ{Colors.NC}"
+            print(f"{str(e['region']):<3} | {clean_turkish(e['tm'])[:20]:<20} | {e['device'][:16]:<16} {ip:<15} : "
+                  f"{label}  {Colors.GRAY}{(e['previous'] or '-')[:12]} -> {e['hash'][:12]}{Colors.NC}")
+        if not changed:
+            print(f"{Colors.GREEN}Son toplamada değişen konfigürasyon yok.{Colors.NC}")
+        print("-" * 114)
+        return
+
+    if sub == "diff":
+        if len(args) < 2:
+            print(f"{Colors.RED}HATA: Kullanım: tmcheck.py backup diff <TM|IP> [Kyland-N]{Colors.NC}")
+            sys.exit(1)
+        search = normalize_text(args[1])
+        device = args[2].lower() if len(args) > 2 else "kyland-1"
+        entries = [(ip, e) for ip, e in store.index.items()
+                   if (scope is None or ip in scope)
+                   and (ip == args[1] or (search in normalize_text(e['tm']) and e['device'].lower() == device))]
+        if len(entries) != 1:
+            print(f"{Colors.RED}HATA: '{' '.join(args[1:])}' için {len(entries)} yedek kaydı bulundu, tekil olmalı.{Colors.NC}")
+            sys.exit(1)
+        ip, e = entries[0]
+        if e["previous"] is None:
+            print(f"{Colors.YELLOW}{e['tm']} {e['device']} için önceki sürüm yok (ilk yedek: {e['changed']}).{Colors.NC}")
+            return
+        diff = difflib.unified_diff(store.get(e["previous"]).splitlines(), store.get(e["hash"]).splitlines(),
+                                    f"{e['device']} {e['previous'][:12]}", f"{e['device']} {e['hash'][:12]} ({e['changed']})",
+                                    lineterm="")
+        for line in diff:
+            if line.startswith("+") and not line.startswith("+++"): print(f"{Colors.GREEN}{line}{Colors.NC}")
+            elif line.startswith("-") and not line.startswith("---"): print(f"{Colors.RED}{line}{Colors.NC}")
+            else: print(line)
+        return
+
+    if not os.path.exists(KYLAND_SCRIPT):
+        print(f"{Colors.RED}HATA: {KYLAND_SCRIPT} bulunamadı.{Colors.NC}")
+        sys.exit(1)
+    targets = backup_targets(load_database(db_path or DEFAULT_DB), args[0] if args else "")
+    if not targets:
+        print(f"{Colors.RED}HATA: Yedeklenecek Kyland bulunamadı.{Colors.NC}")
+        sys.exit(1)
+
+    ts = datetime.datetime.now().strftime(tmbackup.TS_FORMAT)
+    print(f"{Colors.YELLOW}MOD:{Colors.NC} Kyland Konfigürasyon Yedeği ({len(targets)} cihaz, {workers} paralel) -> {BACKUP_DIR}")
+    print("-" * 114)
+    counts = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        fetched = pool.map(lambda t: fetch_running_config(t[1].ip), targets)
+        for (tm, probe), (ok, result) in zip(targets, fetched):
+            line = (f"{str(tm['region']):<3} | {clean_turkish(tm['name'])[:20]:<20} | "
+                    f"{probe.name[:16]:<16} {probe.ip:<15} : ")
+            if not ok:
+                counts["HATA"] = counts.get("HATA", 0) + 1
+                print(f"{line}{Colors.RED}HATA{Colors.NC} ({result})")
+                continue
+            status, digest = store.record(probe.ip, {"region": tm['region'], "tm": tm['name'], "device": probe.name}, result, ts)
+            counts[status] = counts.get(status, 0) + 1
+            color = {tmbackup.NEW: Colors.CYAN, tmbackup.CHANGED: Colors.ORANGE}.get(status, Colors.GREEN)
+            print(f"{line}{color}{status:<8}{Colors.NC} {Colors.GRAY}{digest[:12]}{Colors.NC}")
+    store.save_index()
+    print("-" * 114)
+    print(f"{Colors.CYAN}YENİ:{Colors.NC} {counts.get(tmbackup.NEW, 0)}   {Colors.ORANGE}DEĞİŞTİ:{Colors.NC} {counts.get(tmbackup.CHANGED, 0)}   "
+          f"{Colors.GREEN}AYNI:{Colors.NC} {counts.get(tmbackup.SAME, 0)}   {Colors.RED}HATA:{Colors.NC} {counts.get('HATA', 0)}")
+    print(f"{Colors.GREEN}YEDEK BİTTİ.{Colors.NC} Index: {store.index_path}")
 
 # --- MAIN ---
 
 def main():
-    global INPUT_FILE, FILTER_SCOPE, FILTER_VAL, FILTER_DEVICE, LOG_TO_FILE, ONLY_LIST, PING_COUNT, VERBOSE_MODE, FILTER_EXACT, TARGET_IPS, CUSTOM_COMMAND_MODE, CUSTOM_COMMAND_STR
+    global INPUT_FILE, FILTER_SCOPE, FILTER_VAL, FILTER_DEVICE, LOG_TO_FILE, ONLY_LIST, PING_COUNT, SINGLE_TM, VERBOSE_MODE, FILTER_EXACT, TARGET_IPS, CUSTOM_COMMAND_MODE, CUSTOM_COMMAND_STR, CSV_FILENAME, HISTORY_ROWS, PARALLEL_WORKERS, GOVERNOR, DASHBOARD, WEB_DEEP, PROFILER, FILTER_QUERY, TWO_PHASE, CACHE, COST_HISTORY
     
     args = sys.argv[1:]
     
@@ -476,6 +1253,93 @@ def main():
     
     if "-h" in args or "-help" in args or "--help" in args:
         print_help()
+
+    # Rapor birleştirme modu: veritabanı gerekmez
+    if args and args[0].lower() in ["merge", "birlestir"]:
+        merge_reports(args[1:])
+        return
+
+    # Geçmiş deposu sorguları
+    if args and args[0].lower() in ["history", "gecmis"]:
+        run_history_command(args[1:])
+        return
+
+    # Kyland konfigürasyon yedeği
+    if args and args[0].lower() in ["backup", "yedek"]:
+        run_backup_command(args[1:])
+        return
+
+    if "--history" in args:
+        HISTORY_ROWS = []
+        args.remove("--history")
+        history_started = tmhistory.now_ts()
+
+    if "--web" in args:
+        WEB_DEEP = True
+        args.remove("--web")
+
+    if "--profile" in args or "--profile-py" in args:
+        PROFILER = Profiler(python="--profile-py" in args)
+        for flag in ("--profile", "--profile-py"):
+            if flag in args: args.remove(flag)
+
+    watch_interval = None
+    if "--watch" in args:
+        idx = args.index("--watch")
+        watch_interval = tmwatch.DEFAULT_INTERVAL
+        if idx + 1 < len(args) and re.match(r"^\d*\.?\d+$", args[idx + 1]):
+            watch_interval = float(args.pop(idx + 1))
+        args.pop(idx)
+        if watch_interval < 0.05:
+            print(f"{Colors.RED}HATA: --watch aralığı en az 0.05 sn olmalı.{Colors.NC}")
+            sys.exit(1)
+    window_arg = pop_option(args, "--window")
+    if window_arg and (not window_arg.isdigit() or int(window_arg) < 2):
+        print(f"{Colors.RED}HATA: --window en az 2 örnek olmalı.{Colors.NC}")
+        sys.exit(1)
+
+    refresh = "--refresh" in args
+    if refresh:
+        args.remove("--refresh")
+    CACHE = tmcache.OutputCache(CACHE_DIR, refresh=refresh)
+
+    prune_upstream = "--prune-upstream" in args
+    if prune_upstream:
+        args.remove("--prune-upstream")
+
+    dashboard_requested = "--dashboard" in args
+    if dashboard_requested:
+        args.remove("--dashboard")
+
+    two_phase_requested = "--two-phase" in args
+    if two_phase_requested:
+        args.remove("--two-phase")
+
+    parallel_arg = pop_option(args, "--parallel") or pop_option(args, "-j")
+    region_rate_arg = pop_option(args, "--region-rate")
+    prefix_rate_arg = pop_option(args, "--prefix-rate")
+    inflight_arg = pop_option(args, "--max-inflight")
+    if parallel_arg:
+        if not parallel_arg.isdigit() or int(parallel_arg) < 1:
+            print(f"{Colors.RED}HATA: --parallel pozitif bir sayı olmalı.{Colors.NC}")
+            sys.exit(1)
+        PARALLEL_WORKERS = int(parallel_arg)
+
+    filter_arg = pop_option(args, "--filter")
+    if filter_arg is not None:
+        try:
+            FILTER_QUERY = tmfilter.compile_query(filter_arg, normalize_text)
+        except tmfilter.FilterError as e:
+            print(f"{Colors.RED}HATA: Geçersiz filtre ifadesi: {e}{Colors.NC}")
+            print(f"{Colors.YELLOW}Örnek:{Colors.NC} --filter 'region in (3,5) and type=OTOMASYONLU and cKyland>=2 and name~\"GIS\"'")
+            sys.exit(1)
+        if not args:
+            LOG_TO_FILE = False  # Sadece --filter: seçilen TM'ler canlı taranır
+
+    shard_arg = pop_option(args, "--shard")
+    regions_arg = pop_option(args, "--regions")
+    shard = parse_shard(shard_arg) if shard_arg else None
+    shard_regions = parse_regions(regions_arg) if regions_arg else None
         
     input_file_path = DEFAULT_DB
     arg_filter = ""
@@ -495,7 +1359,9 @@ def main():
             arg_filter = args[0]
             if len(args) > 1: arg_device = args[1]
     
-    db_data = load_database(input_file_path)
+    with profiled("load_database", "faz", kaynak=input_file_path):
+        db_data = load_database(input_file_path)
+        inventory = tmfilter.Inventory(db_data, normalize_text)
     
     # Argüman Analizi
     if arg_filter:
@@ -533,15 +1399,13 @@ def main():
                 if re.match(r"^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$", s_line):
                     is_ip = True
                 
-                for tm in db_data:
+                for tm, row in zip(inventory.tms, inventory.rows):
                     if is_ip and tm['ip'] == s_line:
                         TARGET_IPS.add(tm['ip'])
                         found_for_line = True
-                    elif not is_ip:
-                        tm_norm = normalize_text(tm['name'])
-                        if s_norm in tm_norm:
-                            TARGET_IPS.add(tm['ip'])
-                            found_for_line = True
+                    elif not is_ip and s_norm in row['name']:
+                        TARGET_IPS.add(tm['ip'])
+                        found_for_line = True
                 
                 if not found_for_line:
                     UNMATCHED_LINES.append(s_line)
@@ -609,23 +1473,29 @@ def main():
             elif re.match(VALID_DEVICE_REGEX, val):
                 FILTER_DEVICE = val
                 LOG_TO_FILE = False
+            elif val in VALID_SHOW_COMMANDS and filter_arg is not None:
+                # --filter ile seçilen tüm TM'lerin Kyland-1'inde komut çalıştırılır
+                CUSTOM_COMMAND_MODE = True
+                CUSTOM_COMMAND_STR = val
+                LOG_TO_FILE = False
             else:
                 FILTER_SCOPE = "NAME"
                 FILTER_VAL = val
                 LOG_TO_FILE = False
                 PING_COUNT = 4
+                SINGLE_TM = True
     
     if FILTER_SCOPE == "NAME" and not ONLY_LIST:
         search_term = normalize_text(FILTER_VAL)
-        matches = []
-        for item in db_data:
-            nm_norm = normalize_text(item["name"])
-            if search_term in nm_norm:
-                matches.append(item["name"])
+        # İsimler envanterde bir kez normalize edildi; --filter verildiyse sadece ona uyan TM'ler aranır
+        allowed = {id(tm) for tm in inventory.select(FILTER_QUERY)}
+        matches = [tm["name"] for tm, row in zip(inventory.tms, inventory.rows)
+                   if id(tm) in allowed and search_term in row["name"]]
         
         count = len(matches)
         if count == 0:
-            print(f"{Colors.RED}HATA: '{FILTER_VAL}' veritabanında TM ismi olarak bulunamadı.{Colors.NC}")
+            where = f"--filter '{filter_arg}' ile seçilen TM'ler arasında" if filter_arg is not None else "veritabanında"
+            print(f"{Colors.RED}HATA: '{FILTER_VAL}' {where} TM ismi olarak bulunamadı.{Colors.NC}")
             print(f"{Colors.YELLOW}Eğer bir cihaz arıyorsanız geçerli liste:{Colors.NC} {', '.join(VALID_DEVICE_TYPES)}")
             sys.exit(1)
         elif count >= 1:
@@ -639,6 +1509,7 @@ def main():
                 FILTER_VAL = exact_match
                 FILTER_EXACT = True 
                 PING_COUNT = 4
+                SINGLE_TM = True
             else:
                 if count > 1:
                     print(f"\n{Colors.YELLOW}UYARI: Birden fazla TM bulundu. Lütfen işlem yapmak istediğiniz TM'yi seçin:{Colors.NC}")
@@ -664,6 +1535,7 @@ def main():
                             FILTER_VAL = selected_tm_name
                             FILTER_EXACT = True
                             PING_COUNT = 4
+                            SINGLE_TM = True
                         else:
                             print(f"{Colors.RED}HATA: Geçersiz seçim numarası!{Colors.NC}")
                             sys.exit(1)
@@ -673,20 +1545,70 @@ def main():
                         sys.exit(1)
                 else:
                     PING_COUNT = 4
+                    SINGLE_TM = True
+
+    # Parçalı tarama: bölge listesi ve/veya dengeli parça seçimi
+    shard_meta = None
+    if shard_regions is not None or shard is not None:
+        if shard_regions is not None:
+            unknown = sorted(r for r in shard_regions if not check_region_exists(db_data, r))
+            if unknown:
+                print(f"{Colors.RED}HATA: Bölge(ler) veritabanında bulunamadı: {', '.join(str(r) for r in unknown)}{Colors.NC}")
+                sys.exit(1)
+            db_data = [tm for tm in db_data if tm['region'] in shard_regions]
+        if shard is not None:
+            db_data = select_shard(db_data, shard[0], shard[1])
+        inventory = tmfilter.Inventory(db_data, normalize_text)
+
+        suffix = ""
+        if shard_regions is not None:
+            suffix += "_bolge" + "-".join(str(r) for r in sorted(shard_regions))
+        if shard is not None:
+            suffix += f"_parca{shard[0]}of{shard[1]}"
+        CSV_FILENAME = CSV_FILENAME[:-len(".csv")] + suffix + ".csv"
+
+        shard_meta = {
+            "parca": f"{shard[0]}/{shard[1]}" if shard else "1/1",
+            "bolgeler": ",".join(str(r) for r in sorted(shard_regions)) if shard_regions is not None else "ALL",
+            "host": socket.gethostname(),
+            "kaynak": input_file_path,
+            "tm_sayisi": len(db_data),
+            "prob_sayisi": sum(len(tm['plan']) for tm in db_data),
+            "baslangic": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+
+    if PARALLEL_WORKERS > 1 and not ONLY_LIST and not CUSTOM_COMMAND_MODE:
+        try:
+            region_rate = float(region_rate_arg) if region_rate_arg else DEFAULT_REGION_RATE
+            prefix_rate = float(prefix_rate_arg) if prefix_rate_arg else DEFAULT_PREFIX_RATE
+        except ValueError:
+            print(f"{Colors.RED}HATA: --region-rate / --prefix-rate sayısal olmalı.{Colors.NC}")
+            sys.exit(1)
+        if inflight_arg and (not inflight_arg.isdigit() or int(inflight_arg) < 1):
+            print(f"{Colors.RED}HATA: --max-inflight pozitif bir sayı olmalı.{Colors.NC}")
+            sys.exit(1)
+        GOVERNOR = Governor({tm['prefix']: tm['region'] for tm in db_data}, region_rate=region_rate, prefix_rate=prefix_rate,
+                            max_inflight=int(inflight_arg) if inflight_arg else DEFAULT_MAX_INFLIGHT)
+        COST_HISTORY = load_cost_history()
+
+    if watch_interval is not None:
+        watched = select_tms(inventory)
+        if ONLY_LIST or CUSTOM_COMMAND_MODE or len(watched) != 1:
+            print(f"{Colors.RED}HATA: --watch tek bir TM ile kullanılır. Örnek: tmcheck.py Bagcilar --watch 0.5{Colors.NC}")
+            sys.exit(1)
+        run_watch(watched[0], watch_interval, int(window_arg) if window_arg else tmwatch.DEFAULT_WINDOW)
+        return
 
-    # Komut Modu Kontrolü
-    if CUSTOM_COMMAND_MODE:
-        if count > 1 and not FILTER_EXACT:
-             # Eğer çoklu eşleşme varsa yukarıdaki menüden seçilmiştir.
-             # Seçilen TM için komutu çalıştıracağız.
-             # Loop zaten tekil TM için çalışacak
-             pass
-    
     if LOG_TO_FILE:
         try:
             with open(CSV_FILENAME, 'w') as f:
-                f.write("Bolge_No,TM_Adi,TM_Tipi,TM_Prefix,Cihaz_Adi,Cihaz_IP,Ping_Durumu,Web_Port_Durumu\n")
-            print(f"{Colors.YELLOW}MOD:{Colors.NC} Rapor Modu (+ Canlı Ekran) -> {CSV_FILENAME}")
+                f.write(REPORT_HEADER + "\n")
+            if shard_meta:
+                write_report_meta(shard_meta)
+                print(f"{Colors.YELLOW}MOD:{Colors.NC} Parçalı Rapor Modu (Parça {shard_meta['parca']}, "
+                      f"{shard_meta['tm_sayisi']} TM, {shard_meta['prob_sayisi']} prob) -> {CSV_FILENAME}")
+            else:
+                print(f"{Colors.YELLOW}MOD:{Colors.NC} Rapor Modu (+ Canlı Ekran) -> {CSV_FILENAME}")
         except:
             print(f"{Colors.RED}HATA: Dosya oluşturulamadı: {CSV_FILENAME}{Colors.NC}")
             sys.exit(1)
@@ -698,10 +1620,28 @@ def main():
         print(f"{Colors.YELLOW}MOD:{Colors.NC} Canlı İzleme Modu (Ping Count: {PING_COUNT})")
         if VERBOSE_MODE:
             print(f"{Colors.CYAN}BİLGİ:{Colors.NC} Detaylı tarama (-v) aktif. Kyland versiyonu kontrol edilecek.")
+        if WEB_DEEP:
+            print(f"{Colors.CYAN}BİLGİ:{Colors.NC} Derin web kontrolü (--web) aktif. TLS + HEAD, süre sınırı {tmprobe.WEB_TIMEOUT:g} sn.")
+    if two_phase_requested and not ONLY_LIST and not CUSTOM_COMMAND_MODE:
+        if SINGLE_TM:
+            print(f"{Colors.ORANGE}UYARI: --two-phase toplu taramalar içindir, tekil TM sorgusunda kullanılmıyor.{Colors.NC}")
+        else:
+            TWO_PHASE = True
+            print(f"{Colors.CYAN}BİLGİ:{Colors.NC} İki fazlı tarama (--two-phase): önce hızlı tur, sonra sadece hatalı TM'lerde "
+                  f"{SLOW_PASS['ping_count']} paketle tekrar. Çıktı tarama sonunda basılır.")
+            if dashboard_requested:
+                print(f"{Colors.ORANGE}UYARI: --dashboard iki fazlı taramada kullanılmıyor.{Colors.NC}")
+                dashboard_requested = False
+    if GOVERNOR is not None:
+        print(f"{Colors.CYAN}PARALEL:{Colors.NC} {PARALLEL_WORKERS} worker "
+              f"(Bölge: {GOVERNOR.max_region_rate:g}/sn, Prefix: {GOVERNOR.prefix_rate:g}/sn, Eşzamanlı prob: {GOVERNOR.max_inflight}). "
+              f"Sıra: en pahalı TM önce (geçmiş: {len(COST_HISTORY) if COST_HISTORY else 0} cihaz)")
         
     print(f"{Colors.YELLOW}KAYNAK:{Colors.NC} {input_file_path}")
     if FILTER_DEVICE and not CUSTOM_COMMAND_MODE:
         print(f"{Colors.CYAN}FİLTRE:{Colors.NC} '{FILTER_DEVICE}'")
+    if filter_arg is not None:
+        print(f"{Colors.CYAN}SORGU:{Colors.NC} {filter_arg}")
         
     print("-" * 114)
     if ONLY_LIST:
@@ -715,86 +1655,79 @@ def main():
     if not CUSTOM_COMMAND_MODE:
         print("-" * 114)
 
-    total_processed = 0
-    for tm in db_data:
-        if ONLY_LIST:
-            if FILTER_SCOPE == "REGION" and tm["region"] != int(FILTER_VAL): continue
-        else:
-            if FILTER_SCOPE == "REGION" and tm["region"] != int(FILTER_VAL): continue
-            elif FILTER_SCOPE == "NAME":
-                nm_norm = normalize_text(tm["name"])
-                input_norm = normalize_text(FILTER_VAL)
-                
-                if FILTER_EXACT:
-                    if nm_norm != input_norm:
-                        continue
-                else:
-                    if input_norm not in nm_norm: 
-                        continue
-            elif FILTER_SCOPE == "FILE":
-                if tm['ip'] not in TARGET_IPS:
-                    continue
+    with profiled("secim", "faz") as span:
+        selected = select_tms(inventory)
+        span["tm"] = len(selected)
 
-        total_processed += 1
-        
-        if ONLY_LIST:
-            nm_clean = clean_turkish(tm["name"])
-            line_color = Colors.WHITE
-            if tm["ip"].endswith(".93"): line_color = Colors.YELLOW
-            
-            print(f"{line_color}{str(tm['region']):<3}{Colors.NC} | "
-                  f"{line_color}{nm_clean[:25]:<25}{Colors.NC} | "
-                  f"{line_color}{tm['ip']:<15}{Colors.NC} | "
-                  f"{line_color}{str(tm['c3530']):<5}{Colors.NC} | "
-                  f"{line_color}{str(tm['cKyland']):<6}{Colors.NC} | "
-                  f"{line_color}{str(tm['mgmt_vlan'])}{Colors.NC}")
-            continue
-        
-        # KOMUT MODU: Sadece Kyland kontrolü yap ve çık
-        if CUSTOM_COMMAND_MODE:
-             # Sadece Kyland-1 için çalışır, bu yüzden prefix hesabı yeterli
-             run_check(tm, "Kyland-1", "0.0.0.94", "None") # IP run_check içinde hesaplanır
-             continue
+    scanner = None
+    if not ONLY_LIST and not CUSTOM_COMMAND_MODE:
+        options = scan_options(**FAST_PASS) if TWO_PHASE else scan_options()
+        scanner = tmscan.Scanner(options, GOVERNOR, PROFILER, prune_after=PRUNE_AFTER if prune_upstream else None,
+                                 cache=CACHE, history=COST_HISTORY)
 
-        # NORMAL MOD AKIŞI
-        parts = tm['ip'].split('.')
-        if len(parts) != 4: continue
-        prefix = ".".join(parts[:3])
-        last_octet = parts[3]
-        
-        tm_type = "BELIRSIZ"
-        if last_octet == "93": tm_type = "OTOMASYONLU"
-        elif last_octet == "66": tm_type = "KLASİK"
-        
-        if not check_infrastructure(tm, "Sdwan", f"{prefix}.97"): continue
-        if not check_infrastructure(tm, "ULAK_Fiziksel", f"{prefix}.99"): continue
-        if not check_infrastructure(tm, "ULAK_Sanal", f"{prefix}.98"): continue
-            
-        run_check(tm, "Kyland-1", f"{prefix}.94", "HTTP")
-        
-        if tm_type == "OTOMASYONLU":
-            run_check(tm, "SEL3555(O)", tm['ip'], "HTTPS")
+    if dashboard_requested and not ONLY_LIST and not CUSTOM_COMMAND_MODE:
+        if sys.stdout.isatty():
+            title = f"TM CHECKER - {'RAPOR' if LOG_TO_FILE else 'TARAMA'} ({input_file_path})"
+            DASHBOARD = Dashboard(title, len(selected), sum(len(tm['plan']) for tm in selected))
+            DASHBOARD.start()
         else:
-            run_check(tm, "SEL3555", tm['ip'], "HTTPS")
-            
-        if tm['cKyland'] >= 1:
-            if tm['cKyland'] > 1:
-                for k in range(2, tm['cKyland'] + 1):
-                    if tm_type == "OTOMASYONLU": octet = 94 - k
-                    else: octet = 94 - (k - 1)
-                    if not run_check(tm, f"Kyland-{k}", f"{prefix}.{octet}", "HTTP"): break
-                        
-        if tm['c3530'] > 0:
-            for i in range(1, tm['c3530'] + 1):
-                last = 66 + i
-                run_check(tm, f"SEL3530_{i}", f"{prefix}.{last}", "HTTPS")
-                
+            print(f"{Colors.ORANGE}UYARI: --dashboard için terminal gerekli, normal çıktıya dönülüyor.{Colors.NC}")
+
+    try:
+        with profiled("tarama", "faz", tm=len(selected), paralel=PARALLEL_WORKERS):
+            run_selected(selected, scanner)
+    finally:
+        if DASHBOARD is not None:
+            DASHBOARD.stop()
+
+    if DASHBOARD is not None and DASHBOARD.failed_devices:
+        print(f"{Colors.RED}BAŞARISIZ CİHAZLAR ({len(DASHBOARD.failed_devices)}):{Colors.NC}")
+        for region, tm_name, dev_name, dev_ip in sorted(DASHBOARD.failed_devices, key=operator.itemgetter(0, 1)):
+            print(f"{str(region):<3} | {clean_turkish(tm_name)[:20]:<20} | {dev_name[:16]:<16} {dev_ip:<15} : {Colors.RED}FAILED{Colors.NC}")
+
+    total_processed = len(selected)
+
     if not CUSTOM_COMMAND_MODE:
         print("-" * 114)
         print(f"{Colors.CYAN}TOPLAM İŞLENEN TM SAYISI: {total_processed}{Colors.NC}")
+        upstream = scanner.upstream if scanner is not None else None
+        for region, failed, sampled, inferred in (upstream.down_regions() if upstream is not None else []):
+            print(f"{Colors.ORANGE}UPSTREAM: Bölge {region} erişilemez ({failed} TM art arda FAILED, {sampled} örnekle doğrulandı). "
+                  f"{inferred} TM problanmadan işaretlendi (--prune-upstream olmadan tam tarama).{Colors.NC}")
+        if GOVERNOR is not None and GOVERNOR.backoffs:
+            slowed = ", ".join(f"{r}: {rate:g}/sn" for r, (rate, _) in sorted(GOVERNOR.region_rates().items(), key=lambda x: str(x[0]))
+                               if rate < GOVERNOR.max_region_rate)
+            print(f"{Colors.ORANGE}GOVERNOR: Kayıp / gecikme nedeniyle {GOVERNOR.backoffs} kez yavaşlatıldı. {slowed}{Colors.NC}")
         print("-" * 114)
     
+    if HISTORY_ROWS:
+        try:
+            with profiled("gecmis_kayit", "faz", satir=len(HISTORY_ROWS)):
+                conn = tmhistory.open_store(HISTORY_DB)
+                tmhistory.save_run(conn, {
+                    "started": history_started,
+                    "host": socket.gethostname(),
+                    "mode": "report" if LOG_TO_FILE else FILTER_SCOPE.lower(),
+                    "source": CSV_FILENAME if LOG_TO_FILE else input_file_path,
+                }, HISTORY_ROWS)
+                conn.close()
+            print(f"{Colors.CYAN}GEÇMİŞ:{Colors.NC} {len(HISTORY_ROWS)} sonuç kaydedildi -> {HISTORY_DB}")
+        except Exception as e:
+            print(f"{Colors.RED}HATA: Geçmiş deposuna yazılamadı: {e}{Colors.NC}")
+
+    if PROFILER is not None:
+        PROFILER.stop()
+        try:
+            paths = PROFILER.write(os.path.join(SOURCE_DIR, f"TM_Profil_{DATE_STR}"))
+            print(f"{Colors.GRAY}{PROFILER.summary()}{Colors.NC}")
+            print("-" * 114)
+            print(f"{Colors.CYAN}PROFİL:{Colors.NC} {', '.join(paths)}")
+        except Exception as e:
+            print(f"{Colors.RED}HATA: Profil dosyaları yazılamadı: {e}{Colors.NC}")
+
     if LOG_TO_FILE:
+        if shard_meta:
+            write_report_meta({"bitis": datetime.datetime.now().isoformat(timespec="seconds")})
         print(f"{Colors.GREEN}TARAMA BİTTİ.{Colors.NC} Rapor: {CSV_FILENAME}")
     elif not ONLY_LIST and not CUSTOM_COMMAND_MODE:
         print(f"{Colors.GREEN}İŞLEM TAMAMLANDI.{Colors.NC}")
@@ -805,3 +1738,6 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         print(f"\n{Colors.RED}İşlem kullanıcı tarafından durduruldu.{Colors.NC}")
         sys.exit(0)
+    finally:
+        if CACHE is not None:
+            CACHE.save()  # sys.exit / Ctrl+C ile çıkışta da son kullanım zamanları (LRU) korunur
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------------
+# TM Canlı Gösterge Paneli (curses)
+#
+# Uzun taramalarda ekranı yerinde günceller: ilerleme, kalan süre (ETA),
+# cihaz/saniye, bölge ve cihaz tipine göre hatalar, en yavaş cihazlar.
+# - Tarama thread'leri sadece sayaç günceller (record / tm_done), çizim yapmaz.
+# - Çizim ayrı bir thread'de en fazla REFRESH_HZ kez/sn yapılır ve yalnızca
+#   değişen satırlar yeniden yazılır.
+# ----------------------------------------------------------------------------------
+
+import curses
+import heapq
+import re
+import threading
+import time
+
+REFRESH_HZ = 4
+TOP_SLOWEST = 5
+BAR_WIDTH = 40
+
+def device_type(dev_name):
+    """Kyland-2 -> Kyland, SEL3530_1 -> SEL3530, SEL3555(O) -> SEL3555, ULAK_Sanal -> ULAK"""
+    return re.split(r"[-_(]", dev_name, 1)[0]
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+class Dashboard:
+    """Tarama istatistiklerini toplar ve curses ekranında yerinde gösterir."""
+
+    def __init__(self, title, total_tms, total_probes, refresh_hz=REFRESH_HZ, top_n=TOP_SLOWEST):
+        self.title = title
+        self.total_tms = total_tms
+        self.total_probes = max(total_probes, 1)
+        self.interval = 1.0 / refresh_hz
+        self.top_n = top_n
+
+        self.lock = threading.Lock()
+        self.version = 0
+        self.started = time.monotonic()
+        self.done_tms = 0
+        self.finished_units = 0
+        self.inflight = {}
+        self.probes = 0
+        self.failures = 0
+        self.fail_by_region = {}
+        self.fail_by_type = {}
+        self.failed_devices = []
+        self.slowest = []  # (süre, sıra, tm, cihaz, ip) min-heap, en fazla top_n eleman
+
+        self.screen = None
+        self.shadow = []
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    # --- Tarama tarafı (thread-safe, sadece sayaç) ---
+
+    def record(self, tm, dev_name, dev_ip, status, elapsed):
+        with self.lock:
+            self.probes += 1
+            key = id(tm)
+            self.inflight[key] = self.inflight.get(key, 0) + 1
+            if not status:
+                self.failures += 1
+                self.fail_by_region[tm['region']] = self.fail_by_region.get(tm['region'], 0) + 1
+                d_type = device_type(dev_name)
+                self.fail_by_type[d_type] = self.fail_by_type.get(d_type, 0) + 1
+                self.failed_devices.append((tm['region'], tm['name'], dev_name, dev_ip))
+            entry = (elapsed, self.probes, tm['name'], dev_name, dev_ip)
+            if len(self.slowest) < self.top_n:
+                heapq.heappush(self.slowest, entry)
+            elif elapsed > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+            self.version += 1
+
+    def tm_done(self, tm):
+        with self.lock:
+            self.inflight.pop(id(tm), None)
+            self.finished_units += len(tm['plan'])
+            self.done_tms += 1
+            self.version += 1
+
+    # --- Çizim tarafı ---
+
+    def start(self):
+        self.screen = curses.initscr()
+        curses.noecho()
+        curses.cbreak()
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass
+        if curses.has_colors():
+            curses.start_color()
+            curses.use_default_colors()
+            curses.init_pair(1, curses.COLOR_GREEN, -1)
+            curses.init_pair(2, curses.COLOR_RED, -1)
+            curses.init_pair(3, curses.COLOR_YELLOW, -1)
+            curses.init_pair(4, curses.COLOR_CYAN, -1)
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        if self.screen is not None:
+            self._render()
+            curses.nocbreak()
+            curses.echo()
+            curses.endwin()
+            self.screen = None
+
+    def _loop(self):
+        drawn_version = -1
+        drawn_at = 0.0
+        while not self.stop_event.wait(self.interval):
+            # ETA/süre her saniye değişir, sayaçlar değişmese de en az 1 Hz çizilir
+            now = time.monotonic()
+            if self.version != drawn_version or now - drawn_at >= 1.0:
+                drawn_version = self.version
+                drawn_at = now
+                self._render()
+
+    def _snapshot(self):
+        with self.lock:
+            done_units = self.finished_units + sum(self.inflight.values())
+            return {
+                "done_tms": self.done_tms,
+                "done_units": min(done_units, self.total_probes),
+                "probes": self.probes,
+                "failures": self.failures,
+                "by_region": sorted(self.fail_by_region.items()),
+                "by_type": sorted(self.fail_by_type.items(), key=lambda x: -x[1]),
+                "slowest": sorted(self.slowest, reverse=True),
+            }
+
+    def _lines(self):
+        """Ekrana basılacak (metin, renk) satırları."""
+        snap = self._snapshot()
+        elapsed = time.monotonic() - self.started
+        ratio = snap["done_units"] / self.total_probes
+        rate = snap["probes"] / elapsed if elapsed > 0 else 0.0
+        eta = elapsed * (1 - ratio) / ratio if ratio > 0 else 0.0
+        filled = int(BAR_WIDTH * ratio)
+
+        lines = [
+            (f" {self.title}", 3),
+            ("", 0),
+            (f" [{'#' * filled}{'.' * (BAR_WIDTH - filled)}] {ratio * 100:5.1f}%", 4),
+            (f" TM: {snap['done_tms']}/{self.total_tms}   Prob: {snap['done_units']}/{self.total_probes}   "
+             f"Hız: {rate:.1f} cihaz/sn", 0),
+            (f" Geçen: {format_duration(elapsed)}   Kalan (ETA): {format_duration(eta) if ratio > 0 else '--:--:--'}", 0),
+            ("", 0),
+            (f" HATALAR: {snap['failures']}", 2 if snap["failures"] else 1),
+            ("   Bölge : " + ("  ".join(f"{r}:{c}" for r, c in snap["by_region"]) or "-"), 0),
+            ("   Tip   : " + ("  ".join(f"{t}:{c}" for t, c in snap["by_type"]) or "-"), 0),
+            ("", 0),
+            (f" EN YAVAŞ {self.top_n} CİHAZ", 3),
+        ]
+        for elapsed_s, _, tm_name, dev_name, dev_ip in snap["slowest"]:
+            lines.append((f"   {elapsed_s:6.2f} sn  {tm_name[:20]:<20} {dev_name[:16]:<16} {dev_ip}", 0))
+        return lines
+
+    def _render(self):
+        screen = self.screen
+        if screen is None:
+            return
+        height, width = screen.getmaxyx()
+        lines = self._lines()[:height - 1]
+        changed = False
+        for row, (text, color) in enumerate(lines):
+            text = text[:width - 1]
+            if row < len(self.shadow) and self.shadow[row] == text:
+                continue
+            try:
+                screen.move(row, 0)
+                screen.clrtoeol()
+                screen.addstr(row, 0, text, curses.color_pair(color) if color else 0)
+            except curses.error:
+                pass
+            changed = True
+        for row in range(len(lines), len(self.shadow)):
+            try:
+                screen.move(row, 0)
+                screen.clrtoeol()
+            except curses.error:
+                pass
+            changed = True
+        self.shadow = [text[:width - 1] for text, _ in lines]
+        if changed:
+            screen.refresh()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------------
+# TM Seçim Sorguları (--filter)
+#
+# Küçük bir filtre dili:
+#     region in (3,5) and type=OTOMASYONLU and cKyland>=2 and name~"GIS"
+# - Alanlar : region (bolge), name (ad), ip, type (tip), prefix, c3530, cKyland (kyland), vlan
+# - Operatör: = != < <= > >= ~ (içerir) !~ (içermez) in (...) not in (...)
+# - Bağlaçlar: and / or / not ve parantez. İsim karşılaştırmaları Türkçe karakter ve
+#   büyük/küçük harf duyarsızdır.
+# Sorgu bir kez predicate ağacına derlenir. Inventory bölge / tip / ip / isim
+# index'lerini tutar; eşitlik ve 'in' testleri tüm listeyi taramadan aday kümesini
+# daraltır, kalan koşullar sadece adaylar üzerinde çalışır.
+# ----------------------------------------------------------------------------------
+
+import operator
+import re
+
+class FilterError(ValueError):
+    """Filtre ifadesi çözülemedi."""
+
+# Kullanıcı adı -> (TM sözlüğündeki anahtar, tip)
+FIELDS = {
+    "region": ("region", int), "bolge": ("region", int),
+    "name": ("name", str), "ad": ("name", str),
+    "ip": ("ip", str),
+    "type": ("type", str), "tip": ("type", str),
+    "prefix": ("prefix", str),
+    "c3530": ("c3530", int),
+    "ckyland": ("cKyland", int), "kyland": ("cKyland", int),
+    "vlan": ("mgmt_vlan", int),
+}
+ROW_KEYS = ("region", "name", "ip", "type", "prefix", "c3530", "cKyland", "mgmt_vlan")
+FOLDED = ("name", "type")  # Türkçe karakter / büyük-küçük harf duyarsız karşılaştırılan alanlar
+INDEXED = ("region", "type", "ip", "name")
+
+COMPARE = {
+    "=": operator.eq, "==": operator.eq, "!=": operator.ne,
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "~": lambda a, b: b in a, "!~": lambda a, b: b not in a,
+}
+ORDERED = ("<", "<=", ">", ">=")
+TEXT_ONLY = ("~", "!~")
+
+_TOKEN_RE = re.compile(r"""\s*(?:
+    (?P<punct>[(),])
+  | (?P<op>==|!=|<=|>=|!~|=|<|>|~)
+  | "(?P<dq>[^"]*)"
+  | '(?P<sq>[^']*)'
+  | (?P<word>[^\s()=!<>~,"']+)
+)""", re.VERBOSE)
+
+def _tokenize(text):
+    """(tür, değer, konum) listesi. tür: punct, op, str (tırnaklı), word."""
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise FilterError(f"Beklenmeyen karakter (konum {pos + 1}): '{text[pos:].strip()[:10]}'")
+        kind = match.lastgroup
+        value = match.group(kind)
+        where = match.start(kind) + 1
+        if kind in ("dq", "sq"):
+            kind = "str"
+        tokens.append((kind, value, where))
+        pos = match.end()
+    return tokens
+
+# --- PREDICATE AĞACI ---
+
+class Node:
+    """Predicate düğümü. matches() Inventory satırı (normalize edilmiş alanlar) üzerinde çalışır."""
+
+    def matches(self, row):
+        raise NotImplementedError
+
+    def candidates(self, inventory):
+        """Index'ten aday pozisyon kümesi, index kullanılamıyorsa None."""
+        return None
+
+class MatchAll(Node):
+    def matches(self, row):
+        return True
+
+MATCH_ALL = MatchAll()
+
+class Compare(Node):
+    """Tek alan testi. values: karşılaştırılacak (normalize edilmiş) değerler; 'in' için birden fazla."""
+
+    def __init__(self, key, op, values, negate=False):
+        self.key = key
+        self.op = op
+        self.values = values
+        self.negate = negate
+        if op == "in":
+            value_set = frozenset(values)
+            self.test = lambda v: v in value_set
+        else:
+            fn, target = COMPARE[op], values[0]
+            self.test = lambda v: fn(v, target)
+
+    def matches(self, row):
+        return self.test(row[self.key]) != self.negate
+
+    def candidates(self, inventory):
+        if self.negate or self.op not in ("in", "=", "==") or self.key not in INDEXED:
+            return None
+        index = inventory.indexes[self.key]
+        found = set()
+        for value in self.values:
+            found.update(index.get(value, ()))
+        return found
+
+class And(Node):
+    def __init__(self, *parts):
+        self.parts = parts
+
+    def matches(self, row):
+        return all(p.matches(row) for p in self.parts)
+
+    def candidates(self, inventory):
+        best = None
+        for part in self.parts:
+            found = part.candidates(inventory)
+            if found is not None and (best is None or len(found) < len(best)):
+                best = found
+        return best
+
+class Or(Node):
+    def __init__(self, *parts):
+        self.parts = parts
+
+    def matches(self, row):
+        return any(p.matches(row) for p in self.parts)
+
+    def candidates(self, inventory):
+        found = set()
+        for part in self.parts:
+            part_found = part.candidates(inventory)
+            if part_found is None:
+                return None
+            found |= part_found
+        return found
+
+class Not(Node):
+    def __init__(self, part):
+        self.part = part
+
+    def matches(self, row):
+        return not self.part.matches(row)
+
+def all_of(*parts):
+    """MATCH_ALL olmayan parçaların AND'i (tek parça ise kendisi)."""
+    parts = [p for p in parts if p is not MATCH_ALL]
+    if not parts:
+        return MATCH_ALL
+    return parts[0] if len(parts) == 1 else And(*parts)
+
+# --- ENVANTER ---
+
+class Inventory:
+    """Sıralı TM listesi, karşılaştırma satırları ve eşitlik testleri için index'ler.
+    İsim ve tip alanları burada bir kez normalize edilir, sorgular tekrar normalize etmez."""
+
+    def __init__(self, tms, normalize=str.upper):
+        self.tms = tms
+        self.normalize = normalize
+        self.rows = []
+        self.indexes = {key: {} for key in INDEXED}
+        for pos, tm in enumerate(tms):
+            row = {key: tm[key] for key in ROW_KEYS}
+            for key in FOLDED:
+                row[key] = normalize(row[key])
+            self.rows.append(row)
+            for key in INDEXED:
+                self.indexes[key].setdefault(row[key], []).append(pos)
+
+    def select(self, query):
+        """Sorguya uyan TM'ler, envanter sırasında."""
+        positions = query.candidates(self)
+        if positions is None:
+            positions = range(len(self.tms))
+        else:
+            positions = sorted(positions)
+        return [self.tms[pos] for pos in positions if query.matches(self.rows[pos])]
+
+# --- DERLEYİCİ ---
+
+def field_test(field, op, values, normalize, negate=False):
+    """Kullanıcı alan adı ve ham değer(ler)den Compare düğümü kurar."""
+    spec = FIELDS.get(field.lower())
+    if spec is None:
+        raise FilterError(f"Bilinmeyen alan '{field}'. Geçerli alanlar: {', '.join(sorted(set(FIELDS)))}")
+    key, kind = spec
+    if kind is int:
+        if op in TEXT_ONLY:
+            raise FilterError(f"'{op}' operatörü sayısal '{field}' alanı ile kullanılamaz.")
+        try:
+            values = [int(v) for v in values]
+        except ValueError:
+            raise FilterError(f"'{field}' alanı sayısal değer bekliyor: {', '.join(map(str, values))}")
+    else:
+        if op in ORDERED:
+            raise FilterError(f"'{op}' operatörü metin alanı '{field}' ile kullanılamaz.")
+        values = [normalize(v) if key in FOLDED else v for v in values]
+    return Compare(key, op, values, negate)
+
+class _Parser:
+    def __init__(self, text, normalize):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        self.normalize = normalize
+
+    def peek(self, offset=0):
+        idx = self.pos + offset
+        return self.tokens[idx] if idx < len(self.tokens) else (None, None, None)
+
+    def keyword(self, word, offset=0):
+        kind, value, _ = self.peek(offset)
+        return kind == "word" and value.lower() == word
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if token[0] is None:
+            raise FilterError("İfade beklenmedik şekilde bitti.")
+        if (kind and token[0] != kind) or (value and token[1] != value):
+            raise FilterError(f"Beklenmeyen '{token[1]}' (konum {token[2]}).")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise FilterError("Boş filtre ifadesi.")
+        node = self.parse_or()
+        if self.pos < len(self.tokens):
+            _, value, where = self.tokens[self.pos]
+            raise FilterError(f"Beklenmeyen '{value}' (konum {where}).")
+        return node
+
+    def parse_or(self):
+        parts = [self.parse_and()]
+        while self.keyword("or"):
+            self.pos += 1
+            parts.append(self.parse_and())
+        return parts[0] if len(parts) == 1 else Or(*parts)
+
+    def parse_and(self):
+        parts = [self.parse_not()]
+        while self.keyword("and"):
+            self.pos += 1
+            parts.append(self.parse_not())
+        return parts[0] if len(parts) == 1 else And(*parts)
+
+    def parse_not(self):
+        if self.keyword("not"):
+            self.pos += 1
+            return Not(self.parse_not())
+        if self.peek()[1] == "(" and self.peek()[0] == "punct":
+            self.pos += 1
+            node = self.parse_or()
+            self.take("punct", ")")
+            return node
+        return self.parse_test()
+
+    def value(self):
+        kind, value, where = self.take()
+        if kind not in ("word", "str"):
+            raise FilterError(f"Değer bekleniyordu, '{value}' bulundu (konum {where}).")
+        return value
+
+    def parse_test(self):
+        field = self.take("word")[1]
+        negate = False
+        if self.keyword("not") and self.keyword("in", 1):
+            self.pos += 1
+            negate = True
+        if self.keyword("in"):
+            self.pos += 1
+            self.take("punct", "(")
+            values = [self.value()]
+            while self.peek()[1] == ",":
+                self.pos += 1
+                values.append(self.value())
+            self.take("punct", ")")
+            return field_test(field, "in", values, self.normalize, negate)
+        kind, op, where = self.take()
+        if kind != "op":
+            raise FilterError(f"'{field}' alanından sonra operatör bekleniyordu (konum {where}).")
+        return field_test(field, op, [self.value()], self.normalize)
+
+def compile_query(text, normalize=str.upper):
+    """Filtre ifadesini predicate ağacına derler. Hatalı ifadede FilterError fırlatır."""
+    return _Parser(text, normalize).parse()
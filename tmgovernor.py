@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------------
+# TM Eşzamanlılık Yöneticisi (Governor)
+#
+# Paralel taramada ping/port problarının altında çalışır:
+# - Global eşzamanlılık sınırı (worker sayısından bağımsız; web havuzu dahil aynı
+#   anda en fazla N prob).
+# - Bölge başına ve /24 prefix başına token bucket hız sınırı.
+# - Bölgede gözlenen paket kaybı artınca bölge hızı otomatik düşürülür (AIMD),
+#   kayıp düşük kaldıkça yavaşça eski hızına çıkar. Böylece ince SD-WAN
+#   linklerinde kendi ürettiğimiz kayıp (sahte FAILED / Loss) oluşmaz.
+#   Tıkanıklık sinyali: kısmi paket kaybı, RTT'nin aynı /24'te görülen en düşük
+#   değerin çok üstüne çıkması veya ayakta olduğu bilinen cihazın hiç cevap vermemesi
+#   (varsayılan raporda cihaz başına 1 paket gider, kayıp bu şekilde görünür). Cihaz
+#   bu taramada daha önce cevap verdiyse veya çağıran kanıt verdiyse (bağımlı olduğu
+#   cihaz cevap verdi, geçmişte cevap veriyordu) ayakta sayılır. Kanıt yoksa cevapsız
+#   cihaz (kapalı / arızalı) tıkanıklık sayılmaz.
+# ----------------------------------------------------------------------------------
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Varsayılan limitler (prob / saniye)
+DEFAULT_REGION_RATE = 20.0
+DEFAULT_PREFIX_RATE = 5.0
+DEFAULT_MAX_INFLIGHT = 32
+MIN_REGION_RATE = 1.0
+
+# Kayıp tepkisi: EWMA eşikleri ve azaltma/artırma adımları
+LOSS_ALPHA = 0.2
+LOSS_HIGH = 0.25
+LOSS_LOW = 0.05
+DECREASE_FACTOR = 0.5
+INCREASE_STEP = 1.0
+ADJUST_COOLDOWN = 2.0
+# RTT şişmesi: prefix taban RTT'sinin bu katını ve ek payı aşan ölçüm tam kayıp gibi sayılır
+RTT_INFLATION = 3.0
+RTT_SLACK_MS = 20.0
+
+class TokenBucket:
+    """Basit token bucket. acquire() token yoksa gereken süre kadar bekler."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(rate, 1.0))
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill()
+            self.rate = float(rate)
+            self.capacity = max(self.rate, 1.0)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class Governor:
+    """Global / bölge / prefix limitlerini ve kayıp tabanlı geri çekilmeyi uygular.
+
+    region_of_prefix: '10.37.4' -> bölge numarası eşlemesi (veritabanından).
+    max_inflight: aynı anda çalışan prob sayısı üst sınırı (tüm worker'lar ve web havuzu toplamı)."""
+
+    def __init__(self, region_of_prefix=None, region_rate=DEFAULT_REGION_RATE, prefix_rate=DEFAULT_PREFIX_RATE,
+                 max_inflight=DEFAULT_MAX_INFLIGHT):
+        self.max_inflight = max(int(max_inflight), 1)
+        self.inflight = threading.BoundedSemaphore(self.max_inflight)
+        self.region_of_prefix = dict(region_of_prefix or {})
+        self.max_region_rate = float(region_rate)
+        self.prefix_rate = float(prefix_rate)
+        self.lock = threading.Lock()
+        self.region_buckets = {}
+        self.prefix_buckets = {}
+        self.region_loss = {}
+        self.prefix_rtt = {}
+        self.answered = set()
+        self.region_adjusted = {}
+        self.backoffs = 0
+
+    @staticmethod
+    def _prefix(ip):
+        return ip.rsplit('.', 1)[0]
+
+    def _buckets(self, prefix, region):
+        with self.lock:
+            r_bucket = self.region_buckets.get(region)
+            if r_bucket is None:
+                r_bucket = self.region_buckets[region] = TokenBucket(self.max_region_rate)
+            p_bucket = self.prefix_buckets.get(prefix)
+            if p_bucket is None:
+                p_bucket = self.prefix_buckets[prefix] = TokenBucket(self.prefix_rate)
+        return r_bucket, p_bucket
+
+    @contextmanager
+    def slot(self, ip):
+        """Bir prob için bölge + prefix token'ı ve global slot ayırır."""
+        prefix = self._prefix(ip)
+        r_bucket, p_bucket = self._buckets(prefix, self.region_of_prefix.get(prefix))
+        r_bucket.acquire()
+        p_bucket.acquire()
+        with self.inflight:
+            yield
+
+    def observe(self, ip, stats, expected=False):
+        """Ping sonucunu (tmprobe.PingStats) bölge kayıp istatistiğine işler ve hızı ayarlar.
+        Hiç cevap vermeyen cihaz sadece ayakta olduğu biliniyorsa (expected=True veya bu
+        taramada daha önce cevap verdi) tam kayıp sayılır; aksi halde düşük cihazdır, sayılmaz."""
+        prefix = self._prefix(ip)
+        region = self.region_of_prefix.get(prefix)
+        now = time.monotonic()
+        with self.lock:
+            if stats.received:
+                self.answered.add(ip)
+                signal = (stats.loss or 0) / 100.0
+            elif expected or ip in self.answered:
+                signal = 1.0
+            else:
+                return
+            rtt = stats.rtt_avg
+            if rtt is not None:
+                baseline = self.prefix_rtt.get(prefix)
+                if baseline is None or rtt < baseline:
+                    self.prefix_rtt[prefix] = rtt
+                elif rtt > baseline * RTT_INFLATION + RTT_SLACK_MS:
+                    signal = 1.0
+            ewma = self.region_loss.get(region, 0.0)
+            ewma = (1 - LOSS_ALPHA) * ewma + LOSS_ALPHA * signal
+            self.region_loss[region] = ewma
+            if now - self.region_adjusted.get(region, 0.0) < ADJUST_COOLDOWN:
+                return
+            bucket = self.region_buckets.get(region)
+            if bucket is None:
+                return
+            if ewma > LOSS_HIGH and bucket.rate > MIN_REGION_RATE:
+                new_rate = max(MIN_REGION_RATE, bucket.rate * DECREASE_FACTOR)
+                self.backoffs += 1
+            elif ewma < LOSS_LOW and bucket.rate < self.max_region_rate:
+                new_rate = min(self.max_region_rate, bucket.rate + INCREASE_STEP)
+            else:
+                return
+            self.region_adjusted[region] = now
+        bucket.set_rate(new_rate)
+
+    def region_rates(self):
+        """Bölge -> (güncel hız, kayıp EWMA) özet tablosu."""
+        with self.lock:
+            return {region: (bucket.rate, self.region_loss.get(region, 0.0))
+                    for region, bucket in self.region_buckets.items()}
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------------
+# TM Geçmiş Deposu (SQLite)
+#
+# tmcheck.py taramalarının sonuçlarını yerel bir SQLite dosyasında saklar.
+# - Her tarama tek bir 'runs' kaydı ve tek transaction içinde toplu 'results' ekler.
+# - (tm, device, ts) indeksi sayesinde TM/cihaz bazlı trend sorguları dosya
+#   taramadan cevaplanır (erişilebilirlik, kesinti pencereleri, en kötü TM'ler).
+# - Eski TM_Rapor_*.csv dosyaları içe aktarılabilir.
+# - Şema sürümü PRAGMA user_version ile tutulur; ileride şema değişirse yükseltme
+#   bu sürüme göre yapılır.
+# ----------------------------------------------------------------------------------
+
+import os
+import re
+import sqlite3
+import datetime
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id       INTEGER PRIMARY KEY,
+    started  TEXT NOT NULL,
+    finished TEXT,
+    host     TEXT,
+    mode     TEXT,
+    source   TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id      INTEGER NOT NULL REFERENCES runs(id),
+    ts          TEXT NOT NULL,
+    region      INTEGER NOT NULL,
+    tm          TEXT NOT NULL,
+    tm_type     TEXT,
+    prefix      TEXT,
+    device      TEXT NOT NULL,
+    ip          TEXT,
+    status      INTEGER NOT NULL,
+    web         TEXT,
+    loss        REAL,
+    rtt_min     REAL,
+    rtt_avg     REAL,
+    rtt_max     REAL,
+    rtt_mdev    REAL,
+    jitter      REAL,
+    web_code    INTEGER,
+    web_connect REAL,
+    web_tls     REAL,
+    web_ttfb    REAL,
+    inferred    INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_results_tm_device_ts ON results(tm, device, ts);
+CREATE INDEX IF NOT EXISTS idx_results_region_ts ON results(region, ts);
+CREATE INDEX IF NOT EXISTS idx_runs_source ON runs(source);
+"""
+SCHEMA_VERSION = 1
+
+RESULT_COLUMNS = ("run_id", "ts", "region", "tm", "tm_type", "prefix", "device", "ip", "status", "web",
+                  "loss", "rtt_min", "rtt_avg", "rtt_max", "rtt_mdev", "jitter",
+                  "web_code", "web_connect", "web_tls", "web_ttfb", "inferred")
+
+def now_ts():
+    return datetime.datetime.now().strftime(TS_FORMAT)
+
+def since_ts(days):
+    """Son N gün için alt zaman sınırı. days None ise sınır yoktur."""
+    if not days:
+        return "0000-00-00 00:00:00"
+    return (datetime.datetime.now() - datetime.timedelta(days=days)).strftime(TS_FORMAT)
+
+def open_store(path):
+    """Depoyu açar, yoksa şemayla birlikte oluşturur."""
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    if conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return conn
+
+# --- YAZMA ---
+
+def make_row(tm, dev_name, dev_ip, status, web_stat, stats=None, web=None, inferred=False, ts=None):
+    """Tek cihaz sonucunu results satırına çevirir (run_id sonradan atanır).
+    stats: tmprobe.PingStats, web: tmprobe.WebStats (derin web kontrolü), yoksa None.
+    inferred: sonuç problanmadan çıkarıldı (upstream erişilemez)."""
+    if stats is None:
+        measures = (None, None, None, None, None, None)
+    else:
+        measures = (stats.loss, stats.rtt_min, stats.rtt_avg, stats.rtt_max, stats.rtt_mdev, stats.jitter)
+    if web is None:
+        measures += (None, None, None, None)
+    else:
+        measures += (web.code, web.connect_ms, web.tls_ms, web.ttfb_ms)
+    measures += (1 if inferred else 0,)
+    return (
+        ts or now_ts(), tm['region'], tm['name'], tm.get('type'), tm.get('prefix'),
+        dev_name, dev_ip, 1 if status else 0, web_stat
+    ) + measures
+
+def save_run(conn, meta, rows):
+    """Bir taramayı (runs + tüm results) tek transaction içinde yazar. run_id döner."""
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO runs (started, finished, host, mode, source) VALUES (?, ?, ?, ?, ?)",
+            (meta.get("started"), meta.get("finished") or now_ts(), meta.get("host"), meta.get("mode"), meta.get("source"))
+        )
+        run_id = cur.lastrowid
+        conn.executemany(
+            f"INSERT INTO results ({', '.join(RESULT_COLUMNS)}) VALUES ({', '.join('?' * len(RESULT_COLUMNS))})",
+            ((run_id,) + row for row in rows)
+        )
+    return run_id
+
+def import_report(conn, path, meta, header, rows):
+    """Okunmuş bir TM_Rapor CSV'sini depoya aktarır.
+    Aynı dosya daha önce aktarıldıysa None, aksi halde eklenen satır sayısını döner."""
+    source = os.path.abspath(path)
+    if conn.execute("SELECT 1 FROM runs WHERE source = ?", (source,)).fetchone():
+        return None
+
+    match = re.search(r"TM_Rapor_(\d{4}-\d{2}-\d{2})_(\d{2})-(\d{2})-(\d{2})", os.path.basename(path))
+    if match:
+        ts = f"{match.group(1)} {match.group(2)}:{match.group(3)}:{match.group(4)}"
+    else:
+        ts = datetime.datetime.fromtimestamp(os.path.getmtime(path)).strftime(TS_FORMAT)
+
+    col = {name: i for i, name in enumerate(header)}
+    needed = ["Bolge_No", "TM_Adi", "Cihaz_Adi", "Ping_Durumu"]
+    if any(name not in col for name in needed):
+        raise ValueError("Rapor başlığı tanınmadı")
+
+    def get(row, name):
+        i = col.get(name)
+        return row[i] if i is not None and i < len(row) else None
+
+    def get_float(row, name):
+        try:
+            return float(get(row, name))
+        except (TypeError, ValueError):
+            return None
+
+    result_rows = []
+    for row in rows:
+        region = get(row, "Bolge_No")
+        if not region or not region.isdigit():
+            continue
+        result_rows.append((
+            ts, int(region), get(row, "TM_Adi"), get(row, "TM_Tipi"), get(row, "TM_Prefix"),
+            get(row, "Cihaz_Adi"), get(row, "Cihaz_IP"), 1 if get(row, "Ping_Durumu") == "SUCCESS" else 0,
+            get(row, "Web_Port_Durumu"), get_float(row, "Kayip_Yuzde"), get_float(row, "RTT_Min"),
+            get_float(row, "RTT_Ort"), get_float(row, "RTT_Max"), get_float(row, "RTT_Mdev"), get_float(row, "Jitter"),
+            get_float(row, "Web_Kod"), get_float(row, "Web_Baglanti_ms"), get_float(row, "Web_TLS_ms"),
+            get_float(row, "Web_Ilk_Bayt_ms"), 1 if get(row, "Cikarim") else 0
+        ))
+
+    save_run(conn, {
+        "started": ts, "finished": meta.get("bitis", ts).replace("T", " "),
+        "host": meta.get("host"), "mode": "import", "source": source
+    }, result_rows)
+    return len(result_rows)
+
+# --- SORGULAR ---
+
+def tm_names(conn):
+    """Depoda kaydı olan tüm TM isimleri."""
+    return [r[0] for r in conn.execute("SELECT DISTINCT tm FROM results ORDER BY tm")]
+
+def availability(conn, tm, device=None, days=30):
+    """Cihaz bazında erişilebilirlik: [(device, toplam, başarılı, yüzde, son_ts, son_durum)]"""
+    sql = ("SELECT device, COUNT(*), SUM(status), MAX(ts) FROM results "
+           "WHERE tm = ? AND ts >= ?")
+    params = [tm, since_ts(days)]
+    if device:
+        sql += " AND device = ?"
+        params.append(device)
+    sql += " GROUP BY device ORDER BY device"
+
+    out = []
+    for dev, total, ok, last_ts in conn.execute(sql, params).fetchall():
+        last_status = conn.execute(
+            "SELECT status FROM results WHERE tm = ? AND device = ? AND ts = ? LIMIT 1", (tm, dev, last_ts)
+        ).fetchone()[0]
+        out.append((dev, total, ok, 100.0 * ok / total, last_ts, bool(last_status)))
+    return out
+
+def outages(conn, tm, device=None, days=30):
+    """Ardışık FAILED örneklerden kesinti pencereleri çıkarır.
+    [(device, başlangıç_ts, bitiş_ts veya None (devam ediyor), örnek_sayısı)]"""
+    sql = "SELECT device, ts, status FROM results WHERE tm = ? AND ts >= ?"
+    params = [tm, since_ts(days)]
+    if device:
+        sql += " AND device = ?"
+        params.append(device)
+    sql += " ORDER BY device, ts"
+
+    windows = []
+    current = None  # [device, start, samples]
+    for dev, ts, status in conn.execute(sql, params):
+        if current and current[0] != dev:
+            windows.append((current[0], current[1], None, current[2]))
+            current = None
+        if not status:
+            if current:
+                current[2] += 1
+            else:
+                current = [dev, ts, 1]
+        elif current:
+            windows.append((current[0], current[1], ts, current[2]))
+            current = None
+    if current:
+        windows.append((current[0], current[1], None, current[2]))
+    return windows
+
+def worst_tms(conn, region=None, days=30, top=10):
+    """Bölge bazında en düşük erişilebilirliğe sahip TM'ler.
+    {bölge: [(tm, toplam, başarısız, yüzde)]}"""
+    sql = ("SELECT region, tm, COUNT(*), COUNT(*) - SUM(status) FROM results "
+           "WHERE ts >= ?")
+    params = [since_ts(days)]
+    if region is not None:
+        sql += " AND region = ?"
+        params.append(region)
+    sql += " GROUP BY region, tm"
+
+    by_region = {}
+    for reg, tm, total, failed in conn.execute(sql, params):
+        if failed:
+            by_region.setdefault(reg, []).append((tm, total, failed, 100.0 * (total - failed) / total))
+    for reg in by_region:
+        by_region[reg].sort(key=lambda r: (r[3], r[0]))
+        del by_region[reg][top:]
+    return by_region
+
+def device_costs(conn, days=14):
+    """Tarama zamanlaması için cihaz bazında geçmiş ölçümler.
+    {(bölge, tm, cihaz): (örnek, başarısız, rtt_ort_ms, web_ms, port_kapali)}
+    Çıkarımla işaretlenen (problanmamış) sonuçlar sayılmaz. rtt_ort_ms / web_ms ölçüm yoksa None."""
+    sql = ("SELECT region, tm, device, COUNT(*), COUNT(*) - SUM(status), AVG(rtt_avg), "
+           "AVG(COALESCE(web_ttfb, web_connect)), SUM(web LIKE '%KAPALI%') FROM results "
+           "WHERE ts >= ? AND inferred = 0 GROUP BY region, tm, device")
+    return {(reg, tm, dev): (total, failed, rtt, web_ms, closed or 0)
+            for reg, tm, dev, total, failed, rtt, web_ms, closed in conn.execute(sql, [since_ts(days)])}
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------------
+# TM Prob Fonksiyonları (global durum içermez)
+#
+# ping çıktısı yapılandırılmış PingStats olarak döner: gönderilen/alınan paket,
+# kayıp yüzdesi, min/ort/max/mdev RTT ve jitter (ardışık RTT farklarının
+# ortalaması). ping_many() bir TM'nin tüm cihazlarına prob dizisini aynı anda
+# gönderir; toplam süre cihaz sayısından bağımsız olarak tek ping süresi kadardır.
+#
+# web_check() HTTP/HTTPS servisini uygulama seviyesinde test eder: TCP bağlantısı,
+# TLS el sıkışması ve HEAD isteğinin ilk baytı ayrı ayrı ölçülür. Her kontrol tam
+# el sıkışması yapar (TLS süresi cihazlar arasında karşılaştırılabilir kalır).
+# ----------------------------------------------------------------------------------
+
+import re
+import socket
+import ssl
+import subprocess
+import time
+from collections import namedtuple
+
+# Birden fazla paket gönderilirken paketler arası süre (root olmayan kullanıcı için en düşük değer)
+TRAIN_INTERVAL = 0.2
+
+# Web kontrolü için toplam süre sınırı (bağlantı + TLS + ilk bayt)
+WEB_TIMEOUT = 3.0
+WEB_PORTS = {"HTTP": 80, "HTTPS": 443}
+
+_RTT_RE = re.compile(r"time[=<]([\d.]+)\s*ms")
+_SUMMARY_RE = re.compile(r"(\d+) packets transmitted, (\d+) (?:packets )?received")
+_STATS_RE = re.compile(r"= ([\d.]+)/([\d.]+)/([\d.]+)/([\d.]+) ms")
+
+class PingStats(namedtuple("PingStats", ["sent", "received", "loss", "rtt_min", "rtt_avg", "rtt_max", "rtt_mdev", "jitter"])):
+    """Tek cihazın ping sonucu. RTT alanları ms cinsindendir, cevap yoksa None. loss: yüzde, okunamadıysa None."""
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.received > 0
+
+def failed_stats(count):
+    return PingStats(count, 0, 100, None, None, None, None, None)
+
+def ping_command(ip, count, timeout=1):
+    command = ['ping', '-c', str(count), '-W', str(timeout)]
+    if count > 1:
+        command += ['-i', str(TRAIN_INTERVAL)]
+    command.append(ip)
+    return command
+
+def parse_ping(output, count):
+    """iputils ping çıktısını PingStats'a çevirir."""
+    rtts = [float(x) for x in _RTT_RE.findall(output)]
+    match = _SUMMARY_RE.search(output)
+    sent, received = (int(match.group(1)), int(match.group(2))) if match else (count, len(rtts))
+    if received == 0:
+        return failed_stats(sent)
+    loss = int(round(100.0 * (sent - received) / sent)) if sent >= received else None
+
+    match = _STATS_RE.search(output)
+    if match:
+        rtt_min, rtt_avg, rtt_max, rtt_mdev = (float(g) for g in match.groups())
+    elif rtts:
+        rtt_min, rtt_max = min(rtts), max(rtts)
+        rtt_avg = sum(rtts) / len(rtts)
+        rtt_mdev = (sum((r - rtt_avg) ** 2 for r in rtts) / len(rtts)) ** 0.5
+    else:
+        rtt_min = rtt_avg = rtt_max = rtt_mdev = None
+
+    jitter = None
+    if len(rtts) > 1:
+        jitter = sum(abs(b - a) for a, b in zip(rtts, rtts[1:])) / (len(rtts) - 1)
+    return PingStats(sent, received, loss, rtt_min, rtt_avg, rtt_max, rtt_mdev, jitter)
+
+def ping(ip, count=1, timeout=1):
+    """Tek cihaza ping atar ve PingStats döner."""
+    try:
+        result = subprocess.run(ping_command(ip, count, timeout),
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    except Exception:
+        return failed_stats(count)
+    return parse_ping(result.stdout, count)
+
+def ping_many(ips, count=4, timeout=1):
+    """Tüm IP'lere ping dizisini aynı anda başlatır. {ip: PingStats} döner."""
+    procs = {}
+    for ip in dict.fromkeys(ips):
+        try:
+            procs[ip] = subprocess.Popen(ping_command(ip, count, timeout),
+                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        except Exception:
+            procs[ip] = None
+    results = {}
+    for ip, proc in procs.items():
+        if proc is None:
+            results[ip] = failed_stats(count)
+            continue
+        output, _ = proc.communicate()
+        results[ip] = parse_ping(output, count)
+    return results
+
+# --- WEB (HTTP / HTTPS) ---
+
+# state: OK, KAPALI (TCP bağlantısı yok), TLS_HATA, YANIT_YOK (bağlandı ama HTTP cevabı yok)
+# Süreler ms cinsindendir, ölçülemeyen adım None'dır.
+WebStats = namedtuple("WebStats", ["state", "code", "connect_ms", "tls_ms", "ttfb_ms"])
+
+def _tls_context():
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE  # Cihazlar self-signed sertifika kullanıyor
+    try:
+        context.set_ciphers("DEFAULT:@SECLEVEL=1")  # Eski SEL firmware'leri için
+    except ssl.SSLError:
+        pass
+    return context
+
+TLS_CONTEXT = _tls_context()
+
+def _ms(start):
+    return (time.monotonic() - start) * 1000.0
+
+def web_check(ip, scheme, timeout=WEB_TIMEOUT):
+    """TCP bağlantısı, (HTTPS ise) TLS el sıkışması ve HEAD isteği yapar. WebStats döner."""
+    deadline = time.monotonic() + timeout
+
+    def remaining():
+        return max(deadline - time.monotonic(), 0.01)
+
+    started = time.monotonic()
+    try:
+        sock = socket.create_connection((ip, WEB_PORTS[scheme]), timeout=remaining())
+    except OSError:
+        return WebStats("KAPALI", None, None, None, None)
+    connect_ms = _ms(started)
+
+    tls_ms = None
+    try:
+        if scheme == "HTTPS":
+            started = time.monotonic()
+            sock.settimeout(remaining())
+            try:
+                sock = TLS_CONTEXT.wrap_socket(sock)
+            except (ssl.SSLError, ValueError, OSError) as e:
+                if isinstance(e, socket.timeout):
+                    return WebStats("YANIT_YOK", None, connect_ms, None, None)
+                return WebStats("TLS_HATA", None, connect_ms, None, None)
+            tls_ms = _ms(started)
+
+        started = time.monotonic()
+        sock.settimeout(remaining())
+        sock.sendall(f"HEAD / HTTP/1.0\r\nHost: {ip}\r\nUser-Agent: tmcheck\r\nConnection: close\r\n\r\n".encode())
+        first = sock.recv(64)
+        ttfb_ms = _ms(started)
+
+        match = re.match(rb"HTTP/\d(?:\.\d)? (\d{3})", first)
+        if not match:
+            return WebStats("YANIT_YOK", None, connect_ms, tls_ms, None)
+        return WebStats("OK", int(match.group(1)), connect_ms, tls_ms, ttfb_ms)
+    except OSError:
+        return WebStats("YANIT_YOK", None, connect_ms, tls_ms, None)
+    finally:
+        sock.close()
+
+def format_ms(value):
+    return "-" if value is None else f"{value:.1f}"
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------------
+# TM Tarama Profilleyicisi
+#
+# --profile ile taramanın her aşaması (veritabanı yükleme, seçim, tarama, geçmiş)
+# ve her prob (ping, port, web, kyland_check.py, konsol çıktısı) bir span olarak
+# kaydedilir. Kayıt sırasında sadece (ad, kategori, başlangıç, bitiş, thread, ek bilgi)
+# tuple'ı listeye eklenir; JSON'a çevirme ve özetleme tarama bittikten sonra yapılır.
+# - Chrome trace-event JSON (chrome://tracing veya ui.perfetto.dev ile açılır).
+# - En çok zaman harcayan span gruplarının ve en yavaş tekil spanların metin özeti.
+# - İsteğe bağlı cProfile (sadece ana thread'deki Python kodu ölçülür).
+# ----------------------------------------------------------------------------------
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+TOP_GROUPS = 15
+TOP_SPANS = 10
+TOP_FUNCTIONS = 20
+
+class Profiler:
+    """Span kayıtlarını toplar, trace JSON ve metin özeti üretir (thread-safe)."""
+
+    def __init__(self, python=False):
+        self.started = time.perf_counter_ns()
+        self.finished = None
+        self.spans = []  # list.append atomiktir, kayıt için kilit gerekmez
+        self.threads = {}  # thread ident -> isim (thread'ler trace yazılırken bitmiş olabilir)
+        self.python = cProfile.Profile() if python else None
+        if self.python is not None:
+            self.python.enable()
+
+    @contextmanager
+    def span(self, name, cat, **args):
+        """Bloğun süresini kaydeder. Dönen sözlüğe sonuç bilgisi (ör. 'sonuc') eklenebilir."""
+        ident = threading.get_ident()
+        if ident not in self.threads:
+            self.threads[ident] = threading.current_thread().name
+        start = time.perf_counter_ns()
+        try:
+            yield args
+        finally:
+            self.spans.append((name, cat, start, time.perf_counter_ns(), ident, args))
+
+    def stop(self):
+        self.finished = time.perf_counter_ns()
+        if self.python is not None:
+            self.python.disable()
+
+    # --- ÇIKTI ---
+
+    def trace_events(self):
+        """Chrome trace-event formatında olay listesi ('X' tam süreli olay, us cinsinden)."""
+        tids = {}
+        events = []
+        for name, cat, start, end, ident, args in self.spans:
+            tid = tids.setdefault(ident, len(tids) + 1)
+            events.append({
+                "name": name, "cat": cat, "ph": "X", "pid": 1, "tid": tid,
+                "ts": (start - self.started) / 1000.0, "dur": (end - start) / 1000.0,
+                "args": {k: v for k, v in args.items() if v is not None},
+            })
+        for ident, tid in tids.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid,
+                           "args": {"name": self.threads.get(ident, f"thread-{tid}")}})
+        return events
+
+    def write_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+    def summary(self, top_groups=TOP_GROUPS, top_spans=TOP_SPANS):
+        """Metin özeti: kategori/ad bazında toplam süre ve en yavaş tekil spanlar."""
+        wall = ((self.finished or time.perf_counter_ns()) - self.started) / 1e9
+        groups = {}
+        for name, cat, start, end, _, _ in self.spans:
+            entry = groups.setdefault((cat, name), [0, 0, 0])
+            dur = end - start
+            entry[0] += dur
+            entry[1] += 1
+            entry[2] = max(entry[2], dur)
+
+        lines = [f"TOPLAM SÜRE: {wall:.3f} sn   SPAN: {len(self.spans)}", "",
+                 "EN ÇOK ZAMAN HARCAYANLAR (kümülatif; iç içe spanlar üst spanın içinde de sayılır)",
+                 f"{'KATEGORI':<8} {'AD':<16} {'TOPLAM sn':>10} {'ORAN':>7} {'ADET':>7} {'ORT ms':>9} {'MAX ms':>9}"]
+        for (cat, name), (total, count, longest) in sorted(groups.items(), key=lambda x: -x[1][0])[:top_groups]:
+            share = 100.0 * total / 1e9 / wall if wall > 0 else 0.0
+            lines.append(f"{cat[:8]:<8} {name[:16]:<16} {total / 1e9:>10.3f} {share:>6.1f}% {count:>7} "
+                         f"{total / count / 1e6:>9.2f} {longest / 1e6:>9.2f}")
+
+        lines += ["", f"EN YAVAŞ {top_spans} PROB"]
+        probes = [s for s in self.spans if s[1] == "prob"]
+        for name, _, start, end, _, args in sorted(probes, key=lambda s: s[2] - s[3])[:top_spans]:
+            detail = " ".join(f"{k}={v}" for k, v in args.items() if v is not None)
+            lines.append(f"{(end - start) / 1e6:>9.2f} ms  {name:<12} {detail}")
+        return "\n".join(lines)
+
+    def python_summary(self, top=TOP_FUNCTIONS):
+        """cProfile sonucu: kümülatif süreye göre ilk N fonksiyon."""
+        if self.python is None:
+            return ""
+        out = io.StringIO()
+        pstats.Stats(self.python, stream=out).sort_stats("cumulative").print_stats(top)
+        return out.getvalue()
+
+    def write(self, base_path):
+        """<base>.json (trace), <base>.txt (özet) ve cProfile açıksa <base>.pstats yazar.
+        Yazılan dosya yollarını döner."""
+        paths = [base_path + ".json", base_path + ".txt"]
+        self.write_trace(paths[0])
+        text = self.summary()
+        if self.python is not None:
+            paths.append(base_path + ".pstats")
+            self.python.dump_stats(paths[2])
+            text += "\n\nPYTHON (cProfile, ana thread)\n" + self.python_summary()
+        with open(paths[1], "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        return [os.path.abspath(p) for p in paths]
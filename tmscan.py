@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------------
+# TM Tarama API'si (global durum içermez)
+#
+# tmcheck.py'nin prob motoru. Scanner bir taramanın tüm durumunu (ayarlar, governor,
+# profiler, upstream izleyicisi, TLS oturum önbelleği, web havuzu) kendi içinde tutar;
+# aynı süreçte birden fazla tarama birbirini etkilemeden çalışabilir.
+# - Scanner.scan(tms, concurrency): cihaz sonuçlarını (DeviceResult) bittikleri anda verir.
+#   Her TM planındaki her prob için tam bir sonuç üretilir; problanmayan cihazlar
+#   skipped alanıyla (GATED / FILTERED) işaretlenir. Bir TM'nin sonuçları plan
+#   sırasındadır, concurrency > 1 iken farklı TM'lerin sonuçları karışık gelir.
+# - concurrency > 1 iken TM'ler tahmini maliyetlerine göre en pahalıdan başlayarak
+#   worker'lara dağıtılır (LPT); uzun TM'ler taramanın sonuna kalıp süreyi uzatmaz.
+#   Maliyet prob planından (ping / port / web / versiyon) ve varsa geçmiş ölçümlerden
+#   (tmhistory.device_costs: gecikme, zaman aşımı oranı) tahmin edilir.
+# - scan(selection, checks, concurrency, ...) kısayolu ve ascan(...) async iterator.
+#
+# Örnek:
+#     import tmcheck, tmfilter, tmscan
+#     db = tmcheck.load_database(tmcheck.DEFAULT_DB)
+#     tms = tmfilter.Inventory(db, tmcheck.normalize_text).select(
+#         tmfilter.compile_query("region=5 and cKyland>=2", tmcheck.normalize_text))
+#     for r in tmscan.scan(tms, checks=("ping", "port"), concurrency=4):
+#         print(r.tm['name'], r.name, r.ip, r.status_text, r.web_stat)
+# ----------------------------------------------------------------------------------
+
+import asyncio
+import collections
+import contextlib
+import os
+import queue
+import socket
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import tmprobe
+from tmtopology import root_probe
+from tmupstream import UpstreamTracker
+
+# Kontroller: ping her zaman yapılır (bağımlılık zinciri ping sonucuna göre işler).
+# port: HTTP/HTTPS cihazlarında TCP port kontrolü, web: TLS + HEAD (port yerine),
+# version: Kyland cihazlarında kyland_check.py ile 'show ver' versiyon kontrolü.
+CHECKS = ("ping", "port", "web", "version")
+DEFAULT_CHECKS = ("ping", "port")
+
+KYLAND_SCRIPT = "/usr/local/bin/kyland_check.py"
+KYLAND_VERSION = "SICOM3028GPT-L2GT-T1080" # Beklenen Kyland yazılım versiyonu
+VERSION_COMMAND = "show ver"
+VERSION_TIMEOUT = 10 # kyland_check.py çağrısı için süre sınırı (sn)
+WEB_WORKERS = 16 # TM içindeki web kontrollerini eşzamanlı çalıştıran havuz boyutu
+
+# Maliyet modeli varsayılanları (geçmiş ölçümü olmayan cihazlar için)
+DEFAULT_FAIL_RATE = 0.05   # Ping zaman aşımı oranı
+DEFAULT_CLOSED_RATE = 0.1  # Port / web kontrolünün zaman aşımına kadar beklediği oran
+DEFAULT_RTT_MS = 5.0
+VERSION_COST = 8.0         # kyland_check.py 'show ver' (giriş + komut) süresi, sn
+
+# Atlama nedenleri (DeviceResult.skipped)
+GATED = "BAGIMLI"    # Bağımlı olduğu cihaz başarısız oldu (veya atlandı)
+FILTERED = "FILTRE"  # Cihaz filtresi dışında kaldı
+
+# Tekrar turunda (previous verildiğinde) cihazın önceki tur sonucuna göre işaret (DeviceResult.retry)
+RECOVERED = "KURTARILDI"   # Önceki turda FAILED, bu turda cevap verdi
+CONFIRMED = "DOGRULANDI"   # İki turda da FAILED
+PHASE2_ONLY = "YENI_OLCUM" # Önceki turda atlanmıştı, ilk kez bu turda ölçüldü
+
+class ScanOptions(namedtuple("ScanOptions", ["checks", "ping_count", "ping_timeout", "port_timeout",
+                                             "device_filter", "prefetch", "kyland_script", "web_timeout",
+                                             "version_timeout"],
+                             defaults=(DEFAULT_CHECKS, 1, 1, 2.0, "", False, KYLAND_SCRIPT, tmprobe.WEB_TIMEOUT,
+                                       VERSION_TIMEOUT))):
+    """Tarama ayarları. ping_timeout: ping -W (sn, iputils kesirli değer kabul eder), port_timeout: TCP bağlantı süre sınırı (sn).
+    web_timeout: web kontrolünün toplam süre sınırı (sn), version_timeout: kyland_check.py süre sınırı (sn).
+    device_filter: sadece adında bu metin geçen cihazlar (altyapı cihazları her zaman problanır).
+    prefetch: TM başında tüm cihazlara ping aynı anda gönderilir (ping_count > 1 iken her zaman)."""
+    __slots__ = ()
+
+class DeviceResult(namedtuple("DeviceResult", ["tm", "name", "ip", "check", "infra", "ok", "web_stat", "stats",
+                                               "web", "version", "skipped", "inferred", "retry", "elapsed"])):
+    """Tek cihazın tarama sonucu.
+    ok: ping cevabı (FILTERED için None). web_stat: 'HTTPS_OPEN', 'HTTP_KAPALI (Ping Var)', 'HTTPS_OK (200)' veya 'N/A'.
+    stats: tmprobe.PingStats, web: tmprobe.WebStats ('web' kontrolünde).
+    version: (uygun mu, metin, önbellek yaşı sn veya canlıysa None) ('version' kontrolünde).
+    skipped: '' veya GATED / FILTERED. inferred: upstream kesintisinden çıkarım (problanmadı).
+    retry: tekrar turunda RECOVERED / CONFIRMED / PHASE2_ONLY. elapsed: sn."""
+    __slots__ = ()
+
+    @property
+    def probed(self):
+        return not self.skipped and not self.inferred
+
+    @property
+    def timed_out(self):
+        """Ping cevap verdi ama web veya versiyon kontrolü süre sınırında sonuçlanmadı (tekrar turunda yeniden denenir)."""
+        return ((self.web is not None and self.web.state == "YANIT_YOK")
+                or (self.version is not None and self.version[1] == "Timeout"))
+
+    @property
+    def status_text(self):
+        """'SUCCESS' / 'FAILED'; cihaz filtresi dışında kalan (problanmayan) cihazlar için FILTERED."""
+        if self.skipped == FILTERED:
+            return FILTERED
+        return "SUCCESS" if self.ok else "FAILED"
+
+def web_status(check, web):
+    """WebStats'ı rapor metnine çevirir: 'HTTPS_OK (200)', 'HTTP_KAPALI (Ping Var)', 'HTTPS_TLS_HATA (Ping Var)'."""
+    if web.state == "OK":
+        return f"{check}_OK ({web.code})"
+    return f"{check}_{web.state} (Ping Var)"
+
+def root_ip(tm):
+    root = root_probe(tm['plan'])
+    return root.ip if root else None
+
+def parse_version(output):
+    """'show ver' çıktısından (beklenen versiyon mu, versiyon) döner, versiyon satırı yoksa None."""
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith("SICOM"):
+            found = line.split(',')[0].strip()
+            return found == KYLAND_VERSION, found
+    return None
+
+def kyland_version(ip, script=KYLAND_SCRIPT, timeout=VERSION_TIMEOUT):
+    """kyland_check.py ile 'show ver' çalıştırır.
+    (beklenen versiyon mu, versiyon veya hata metni, ham çıktı) döner; ham çıktı sadece versiyon okunduysa dolu."""
+    cmd = ["python3", script, ip, VERSION_COMMAND]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return False, "Timeout", ""
+    except Exception:
+        return False, "Script Hatası", ""
+    parsed = parse_version(result.stdout)
+    if parsed is None:
+        return False, "Versiyon Okunamadı", ""
+    return parsed[0], parsed[1], result.stdout
+
+def wanted(probe, device_filter):
+    """Cihaz filtresine uyuyor mu (altyapı cihazları filtreden bağımsız problanır)."""
+    return probe.infra or not device_filter or device_filter.lower() in probe.name.lower()
+
+def probe_cost(probe, options, history=None):
+    """Probun beklenen süresi (sn) ve ping zaman aşımı oranı: (sn, oran).
+    history: tmhistory.device_costs() kaydı (örnek, başarısız, rtt_ort_ms, web_ms, port_kapali) veya None."""
+    samples, failed, rtt_ms, web_ms, closed = history or (0, 0, None, None, 0)
+    fail = failed / samples if samples else DEFAULT_FAIL_RATE
+    rtt = (DEFAULT_RTT_MS if rtt_ms is None else rtt_ms) / 1000.0
+    train = (options.ping_count - 1) * tmprobe.TRAIN_INTERVAL
+    cost = fail * (train + options.ping_timeout) + (1 - fail) * (train + rtt)
+
+    answered = samples - failed
+    if probe.check in tmprobe.WEB_PORTS and ("web" in options.checks or "port" in options.checks):
+        timeout = options.web_timeout if "web" in options.checks else options.port_timeout
+        closed_rate = closed / answered if answered > 0 else DEFAULT_CLOSED_RATE
+        open_cost = rtt if web_ms is None else web_ms / 1000.0
+        cost += (1 - fail) * (closed_rate * timeout + (1 - closed_rate) * open_cost)
+    if "version" in options.checks and "Kyland" in probe.name:
+        cost += (1 - fail) * min(VERSION_COST, options.version_timeout)
+    return cost, fail
+
+def tm_cost(tm, options, history=None):
+    """TM planının beklenen süresi (sn). Her prob, ulaşılma olasılığıyla (bağımlı olduğu
+    cihazların cevap verme olasılığı) ağırlıklandırılır; filtre dışı cihazlar sayılmaz.
+    history: {(bölge, tm, cihaz): kayıt} (tmhistory.device_costs) veya None."""
+    reached = {}  # cihaz -> problanıp cevap verme olasılığı
+    total = 0.0
+    for probe in tm['plan']:
+        reach = reached.get(probe.gate, 0.0) if probe.gate else 1.0
+        if not wanted(probe, options.device_filter):
+            reached[probe.name] = 0.0
+            continue
+        record = history.get((tm['region'], tm['name'], probe.name)) if history else None
+        cost, fail = probe_cost(probe, options, record)
+        total += reach * cost
+        reached[probe.name] = reach * (1 - fail)
+    return total
+
+class Scanner:
+    """Tek bir taramanın ayarları ve durumu.
+    governor: tmgovernor.Governor (prob hız/eşzamanlılık sınırı), profiler: tmprofile.Profiler.
+    prune_after: verilirse bölgede art arda bu kadar TM'nin kök cihazı düşünce upstream
+    kesintisi doğrulanır ve kalan TM'ler problanmadan işaretlenir (tmupstream.py).
+    cache: tmcache.OutputCache; verilirse 'show ver' çıktısı süresi dolana kadar cihaza gidilmeden kullanılır.
+    history: tmhistory.device_costs() sonucu; paralel taramada TM maliyet tahminini geçmişe dayandırır."""
+
+    def __init__(self, options=None, governor=None, profiler=None, prune_after=None, cache=None, history=None):
+        self.options = options or ScanOptions()
+        unknown = set(self.options.checks) - set(CHECKS)
+        if unknown:
+            raise ValueError(f"Bilinmeyen kontrol: {', '.join(sorted(unknown))}. Geçerli: {', '.join(CHECKS)}")
+        self.governor = governor
+        self.profiler = profiler
+        self.prune_after = prune_after
+        self.cache = cache
+        self.history = history
+        self.upstream = None
+        self.web_pool = None
+        self.lock = threading.Lock()
+
+    # --- PROBLAR ---
+
+    def span(self, name, cat="prob", **args):
+        if self.profiler is None:
+            return contextlib.nullcontext({})
+        return self.profiler.span(name, cat, **args)
+
+    def slot(self, ip):
+        if self.governor is None:
+            return contextlib.nullcontext()
+        return self.governor.slot(ip)
+
+    def ping(self, ip, expected=False):
+        """expected: cihazın ayakta olduğuna dair kanıt var; cevap gelmezse governor bunu tıkanıklık sayar."""
+        with self.slot(ip), self.span("ping", ip=ip) as span:
+            stats = tmprobe.ping(ip, self.options.ping_count, self.options.ping_timeout)
+            span["sonuc"] = "OK" if stats.ok else "FAILED"
+        if self.governor is not None:
+            self.governor.observe(ip, stats, expected)
+        return stats
+
+    def port(self, ip, port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.options.port_timeout)
+        try:
+            with self.slot(ip), self.span("port", ip=ip, port=port) as span:
+                result = sock.connect_ex((ip, port))
+                span["sonuc"] = "OPEN" if result == 0 else "KAPALI"
+            return result == 0
+        except OSError:
+            return False
+        finally:
+            sock.close()
+
+    def web(self, ip, check):
+        with self.slot(ip), self.span("web", ip=ip, tip=check) as span:
+            web = tmprobe.web_check(ip, check, self.options.web_timeout)
+            span["sonuc"] = web.state
+        return web
+
+    def version(self, ip):
+        hit = self.cache.get(ip, VERSION_COMMAND) if self.cache is not None else None
+        if hit is not None:
+            parsed = parse_version(hit[0])
+            if parsed is not None:
+                return parsed + (hit[1],)
+        with self.slot(ip), self.span("kyland_check", ip=ip, komut=VERSION_COMMAND):
+            ok, text, output = kyland_version(ip, self.options.kyland_script, self.options.version_timeout)
+        if output and self.cache is not None:
+            self.cache.put(ip, VERSION_COMMAND, output)
+        return ok, text, None
+
+    def confirm_upstream(self, ips):
+        """Bölge kesintisi doğrulaması: örnek kök IP'lerini aynı anda pingler, {ip: PingStats} döner."""
+        with self.span("upstream_onay", ip=",".join(ips)) as span:
+            measured = tmprobe.ping_many(ips, self.options.ping_count, self.options.ping_timeout)
+            span["sonuc"] = "CEVAP VAR" if any(stats.ok for stats in measured.values()) else "CEVAP YOK"
+        return measured
+
+    def answered_before(self, tm, probe):
+        """Cihaz geçmiş kayıtlarında (history) en az bir kez cevap vermiş mi."""
+        record = self.history.get((tm['region'], tm['name'], probe.name)) if self.history else None
+        return record is not None and record[1] < record[0]
+
+    def wants(self, probe):
+        return wanted(probe, self.options.device_filter)
+
+    def estimate(self, tm):
+        """TM'nin bu taramadaki tahmini süresi (sn)."""
+        return tm_cost(tm, self.options, self.history)
+
+    def dispatch_order(self, tms):
+        """Paralel tarama başlatma sırası: en pahalı TM önce (LPT), eşitlikte verilen sıra korunur."""
+        return sorted(tms, key=self.estimate, reverse=True)
+
+    def _web_pool(self):
+        with self.lock:
+            if self.web_pool is None:
+                self.web_pool = ThreadPoolExecutor(max_workers=WEB_WORKERS)
+            return self.web_pool
+
+    # --- TM PLANI ---
+
+    def _result(self, tm, probe, ok, **fields):
+        values = dict(web_stat="N/A", stats=None, web=None, version=None, skipped="", inferred=False, retry="", elapsed=0.0)
+        values.update(fields)
+        return DeviceResult(tm, probe.name, probe.ip, probe.check, probe.infra, ok, **values)
+
+    def _timed_web(self, ip, check):
+        started = time.monotonic()
+        return self.web(ip, check), time.monotonic() - started
+
+    def _probe(self, tm, probe, known, previous, expected=False):
+        """Probun ping ve port / versiyon kontrollerini yapar. (DeviceResult, web future veya None) döner.
+        expected: cihazın ayakta olması beklenir (governor kayıp sinyali için, bkz. ping()).
+        'web' kontrolü sadece cihaz ping'e cevap verdiyse (bağımlı olduğu cihazlar da geçmiş demektir)
+        havuza gönderilir; sonuç _drain() ile tamamlanır."""
+        checks = self.options.checks
+        started = time.monotonic()
+        stats = known.pop(probe.ip) if probe.ip in known else self.ping(probe.ip, expected)
+        web_stat, version, future = "N/A", None, None
+        if stats.ok and probe.check in tmprobe.WEB_PORTS:
+            if "web" in checks:
+                future = self._web_pool().submit(self._timed_web, probe.ip, probe.check)
+            elif "port" in checks:
+                is_open = self.port(probe.ip, tmprobe.WEB_PORTS[probe.check])
+                web_stat = f"{probe.check}_OPEN" if is_open else f"{probe.check}_KAPALI (Ping Var)"
+        if (stats.ok and "version" in checks and "Kyland" in probe.name
+                and os.path.exists(self.options.kyland_script)):
+            version = self.version(probe.ip)
+
+        retry = ""
+        if previous is not None:
+            first = previous.get(probe.ip)
+            if first is None or not first.probed:
+                retry = PHASE2_ONLY
+            elif not first.ok:
+                retry = RECOVERED if stats.ok else CONFIRMED
+        result = self._result(tm, probe, stats.ok, web_stat=web_stat, stats=stats, version=version,
+                              retry=retry, elapsed=time.monotonic() - started)
+        return result, future
+
+    @staticmethod
+    def _drain(waiting, block):
+        """Bekleyen sonuçları plan sırasında verir. block=False iken web kontrolü bitmemiş ilk sonuçta durur."""
+        while waiting:
+            result, future = waiting[0]
+            if future is not None:
+                if not block and not future.done():
+                    return
+                web, secs = future.result()
+                result = result._replace(web=web, web_stat=web_status(result.check, web),
+                                         elapsed=result.elapsed + secs)
+            waiting.popleft()
+            yield result
+
+    def scan_tm(self, tm, previous=None):
+        """TM'nin derlenmiş prob planını sırayla çalıştırır, her prob için bir DeviceResult verir.
+        Bağımlı olduğu cihaz başarısız olan (veya atlanan) problar GATED olarak atlanır.
+        previous: önceki turun {ip: DeviceResult} sonuçları. Önceki turda cevap vermiş cihazların sonucu
+        (ping, port / web, versiyon) aynen kullanılır; sadece başarısız, atlanmış veya web / versiyon kontrolü
+        süre sınırına takılmış cihazlar problanır. Toplu ping, önceki turda bağımlı olduğu cihaz cevap vermiş
+        cihazlara gönderilir; diğerleri ancak bağımlı olduğu cihaz bu turda cevap verirse pinglenir."""
+        plan = tm['plan']
+        if self.upstream is not None and self.upstream.begin(tm):
+            root = root_probe(plan)
+            for probe in plan:
+                if probe is root:
+                    yield self._result(tm, probe, False, inferred=True)
+                else:
+                    yield self._result(tm, probe, False, skipped=GATED)
+            return
+
+        options = self.options
+        answered_before = {ip: r for ip, r in (previous or {}).items() if r.probed and r.ok}
+        carried = {ip: r for ip, r in answered_before.items() if not r.timed_out}
+        known = {}
+        if self.upstream is not None:
+            sampled = self.upstream.sample_result(tm)  # Kök cihaz doğrulama örneğinde zaten ölçüldü
+            if sampled is not None:
+                known[root_probe(plan).ip] = sampled
+        if (options.ping_count > 1 or options.prefetch) and self.governor is None:
+            ips = {p.name: p.ip for p in plan}
+            targets = [p.ip for p in plan if p.ip not in carried and p.ip not in known and self.wants(p)
+                       and (previous is None or p.gate is None or ips[p.gate] in answered_before)]
+            with self.span("ping_many", tm=tm['name'], cihaz=len(targets)):
+                known.update(tmprobe.ping_many(targets, options.ping_count, options.ping_timeout))
+
+        # Web kontrolleri sonraki cihazların ping'leriyle eşzamanlı sürer; sonuçlar yine plan sırasında verilir
+        failed = set()
+        answered = set()  # Bu taramada cevap veren cihazlar (bağımlıları için ayakta olma kanıtı)
+        waiting = collections.deque()  # (DeviceResult, web future veya None)
+        try:
+            with self.span("tm", "tm", tm=tm['name'], bolge=tm['region']) as span:
+                for probe in plan:
+                    if probe.gate in failed:
+                        failed.add(probe.name)
+                        waiting.append((self._result(tm, probe, False, skipped=GATED), None))
+                    elif not self.wants(probe):
+                        waiting.append((self._result(tm, probe, None, skipped=FILTERED), None))
+                    elif probe.ip in carried:
+                        answered.add(probe.name)
+                        waiting.append((carried[probe.ip], None))
+                    else:
+                        expected = probe.gate in answered or self.answered_before(tm, probe)
+                        result, future = self._probe(tm, probe, known, previous, expected)
+                        if result.ok:
+                            answered.add(probe.name)
+                        else:
+                            failed.add(probe.name)
+                        waiting.append((result, future))
+                    yield from self._drain(waiting, block=False)
+                yield from self._drain(waiting, block=True)
+                span["hata"] = len(failed)
+        finally:
+            for _, future in waiting:
+                if future is not None:
+                    future.cancel()
+        if self.upstream is not None:
+            root = root_probe(plan)
+            if root is not None:
+                self.upstream.report(tm, root.name not in failed)
+
+    # --- TARAMA ---
+
+    def scan(self, tms, concurrency=1, previous=None):
+        """TM'leri tarar, cihaz sonuçlarını bittikleri anda verir.
+        concurrency > 1 ise TM'ler worker thread'lerinde en pahalıdan başlayarak (dispatch_order) başlatılır;
+        sonuçların TM sırası verilen sıradan farklıdır, sıralı çıktı isteyen çağıran tamponlamalıdır."""
+        tms = list(tms)
+        if self.prune_after is not None and len(tms) > self.prune_after:
+            self.upstream = UpstreamTracker(tms, root_ip, self.confirm_upstream, self.prune_after)
+        try:
+            if concurrency <= 1:
+                for tm in tms:
+                    yield from self.scan_tm(tm, previous)
+            else:
+                yield from self._scan_parallel(self.dispatch_order(tms), concurrency, previous)
+        finally:
+            if self.web_pool is not None:
+                self.web_pool.shutdown(wait=False, cancel_futures=True)
+                self.web_pool = None
+
+    def _scan_parallel(self, tms, concurrency, previous):
+        results = queue.Queue()
+        stop = threading.Event()
+        tm_done = object()
+
+        def worker(tm):
+            try:
+                for result in self.scan_tm(tm, previous):
+                    if stop.is_set():
+                        return
+                    results.put(result)
+            finally:
+                results.put(tm_done)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(worker, tm) for tm in tms]
+            remaining = len(futures)
+            try:
+                while remaining:
+                    item = results.get()
+                    if item is tm_done:
+                        remaining -= 1
+                        continue
+                    yield item
+            finally:
+                stop.set()
+                for future in futures:
+                    future.cancel()
+        for future in futures:
+            future.result()  # Worker'da oluşan hatayı çağırana ilet
+
+def scan(selection, checks=DEFAULT_CHECKS, concurrency=1, governor=None, profiler=None, prune_after=None, **options):
+    """selection'daki TM'leri (derlenmiş 'plan' alanlı TM sözlükleri) tarar, DeviceResult'ları
+    bittikleri anda veren generator döner. options: ScanOptions alanları (ping_count, ...)."""
+    scanner = Scanner(ScanOptions(checks=tuple(checks), **options), governor, profiler, prune_after)
+    return scanner.scan(selection, concurrency)
+
+async def ascan(selection, checks=DEFAULT_CHECKS, concurrency=1, **kwargs):
+    """scan()'in async iterator hali. Tarama ayrı bir thread'de çalışır, event loop bloklanmaz.
+    Döngüden çıkıldığında veya görev iptal edildiğinde tarama thread'i bir sonraki sonuçta durur,
+    scan() generator'ını kendi thread'inde kapatır (worker'lar ve web havuzu kapanır)."""
+    loop = asyncio.get_running_loop()
+    channel = asyncio.Queue()
+    stop = threading.Event()
+    finished = object()
+
+    def send(item):
+        with contextlib.suppress(RuntimeError):  # Event loop kapandıysa sonuç bekleyen yok
+            loop.call_soon_threadsafe(channel.put_nowait, item)
+
+    def produce():
+        results = scan(selection, checks, concurrency, **kwargs)
+        try:
+            for result in results:
+                if stop.is_set():
+                    break
+                send(result)
+        except Exception as e:
+            send(e)
+        finally:
+            results.close()
+            send(finished)
+
+    threading.Thread(target=produce, name="ascan", daemon=True).start()
+    try:
+        while True:
+            item = await channel.get()
+            if item is finished:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
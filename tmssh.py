@@ -8,19 +8,22 @@ import csv
 import termios
 import tty
 
+from tmtopology import SSH_DEVICES, device_octet
+
 # 'kyland' veya 'ulak' seçimine göre otomatik IP ayarlar ve bağlanır.
 
 CSV_PATH = "source/veritabani.csv"
 
 # --- CİHAZ YAPILANDIRMALARI ---
+# Son oktetler tmcheck.py ile ortak topoloji tanımından (tmtopology.py) gelir.
 DEVICE_CONFIG = {
     "kyland": {
-        "octet": "94",
+        "octet": device_octet(SSH_DEVICES["kyland"]),
         "user": "admin",
         "pass": "Kyl@Nd1234.!"
     },
     "ulak": {
-        "octet": "98",
+        "octet": device_octet(SSH_DEVICES["ulak"]),
         "user": "cliadmin",
         "pass": "sobesobe"
     }
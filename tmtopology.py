@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------------
+# TM Cihaz Topolojisi (tmcheck.py ve tmssh.py ortak tanımı)
+#
+# Bir TM'deki cihaz yerleşimi (IP son okteti, kontrol tipi, bağımlılık) burada
+# tek bir tablo olarak tanımlanır. compile_plan() her veritabanı satırını yükleme
+# anında bir kez düz bir prob planına çevirir; tarama modları bu planı doğrudan
+# çalıştırır, cihaz başına string bölme ve dallanma tekrar edilmez.
+# ----------------------------------------------------------------------------------
+
+from collections import namedtuple
+
+# Ana IP'nin son okteti TM tipini belirler
+TM_TYPES = {"93": "OTOMASYONLU", "66": "KLASİK"}
+DEFAULT_TM_TYPE = "BELIRSIZ"
+DEFAULT_PREFIX = "0.0.0"
+
+# Derlenmiş tek prob:
+#   name  : Cihaz adı (Kyland-2, SEL3530_1 ...)
+#   ip    : Hedef IP
+#   check : PING, HTTP veya HTTPS
+#   gate  : Bu cihaz adı başarısız olursa (ya da atlanırsa) prob atlanır
+#   infra : Altyapı cihazı mı (Sdwan / ULAK) - başarısızlığı TM'nin geri kalanını keser
+Probe = namedtuple("Probe", ["name", "ip", "check", "gate", "infra"])
+
+# --- TOPOLOJİ TANIMI ---
+# name  : Sabit ad, TM tipine göre ad sözlüğü ya da sayaçlı cihazlar için "{n}" şablonu
+# octet : Sabit son oktet | "TM" (veritabanındaki ana IP) | (taban, adım)
+#         Sayaçlı cihazlarda oktet = taban + adım * n. Taban TM tipine göre sözlük olabilir.
+# count : Sayaçlı cihazlarda adedi veren veritabanı alanı (cKyland, c3530)
+# start : Sayacın başlangıç değeri
+# chain : True ise her cihaz bir öncekine bağlıdır (biri düşerse sonrakiler atlanır)
+# "*" anahtarı sözlüklerde varsayılan TM tipini ifade eder.
+TOPOLOGY = [
+    {"name": "Sdwan",         "octet": 97,  "check": "PING",  "gate": None,            "infra": True},
+    {"name": "ULAK_Fiziksel", "octet": 99,  "check": "PING",  "gate": "Sdwan",         "infra": True},
+    {"name": "ULAK_Sanal",    "octet": 98,  "check": "PING",  "gate": "ULAK_Fiziksel", "infra": True},
+    {"name": "Kyland-1",      "octet": 94,  "check": "HTTP",  "gate": "ULAK_Sanal"},
+    {"name": {"OTOMASYONLU": "SEL3555(O)", "*": "SEL3555"},
+                              "octet": "TM", "check": "HTTPS", "gate": "ULAK_Sanal"},
+    {"name": "Kyland-{n}",    "count": "cKyland", "start": 2, "chain": True,
+                              "octet": ({"OTOMASYONLU": 94, "*": 95}, -1),
+                              "check": "HTTP",  "gate": "ULAK_Sanal"},
+    {"name": "SEL3530_{n}",   "count": "c3530", "start": 1,
+                              "octet": (66, 1),
+                              "check": "HTTPS", "gate": "ULAK_Sanal"},
+]
+
+# tmssh.py cihaz tipi -> topolojideki cihaz adı
+SSH_DEVICES = {"kyland": "Kyland-1", "ulak": "ULAK_Sanal"}
+
+# --- YARDIMCI FONKSİYONLAR ---
+
+def _by_type(value, tm_type):
+    """TM tipine göre sözlük değerini çözer, sözlük değilse aynen döner."""
+    if isinstance(value, dict):
+        return value.get(tm_type, value["*"])
+    return value
+
+def split_ip(ip):
+    """Ana IP'den (prefix, tm_type) döner. Geçersiz IP için prefix None olur."""
+    parts = ip.split('.')
+    if len(parts) != 4:
+        return None, DEFAULT_TM_TYPE
+    return ".".join(parts[:3]), TM_TYPES.get(parts[3], DEFAULT_TM_TYPE)
+
+def device_octet(dev_name):
+    """Sabit oktetli bir cihazın son oktetini string olarak döner (tmssh için)."""
+    for spec in TOPOLOGY:
+        if spec["name"] == dev_name and isinstance(spec["octet"], int):
+            return str(spec["octet"])
+    raise KeyError(dev_name)
+
+def compile_plan(tm):
+    """Veritabanı satırını (dict) sıralı ve düz bir Probe listesine (tuple) derler."""
+    prefix, tm_type = split_ip(tm["ip"])
+    if prefix is None:
+        return ()
+
+    plan = []
+    for spec in TOPOLOGY:
+        check = spec["check"]
+        infra = spec.get("infra", False)
+
+        if "count" not in spec:
+            name = _by_type(spec["name"], tm_type)
+            octet = spec["octet"]
+            ip = tm["ip"] if octet == "TM" else f"{prefix}.{octet}"
+            plan.append(Probe(name, ip, check, spec["gate"], infra))
+            continue
+
+        base, step = spec["octet"]
+        base = _by_type(base, tm_type)
+        gate = spec["gate"]
+        for n in range(spec["start"], tm[spec["count"]] + 1):
+            name = spec["name"].format(n=n)
+            plan.append(Probe(name, f"{prefix}.{base + step * n}", check, gate, infra))
+            if spec.get("chain"):
+                gate = name
+
+    return tuple(plan)
+
+def root_probe(plan):
+    """Planın kök cihazı (hiçbir cihaza bağlı olmayan ilk prob, Sdwan). Plan boşsa None."""
+    for probe in plan:
+        if probe.gate is None:
+            return probe
+    return None
+
+def find_probe(plan, dev_name):
+    """Plan içinde ada göre prob arar, bulunamazsa None döner."""
+    for probe in plan:
+        if probe.name == dev_name:
+            return probe
+    return None
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------------
+# Upstream (Bölge) Kesinti Tespiti
+#
+# Bölge hub'ı veya omurga linki düştüğünde bölgedeki her TM'nin kök cihazı (Sdwan)
+# tek tek zaman aşımına uğrar. UpstreamTracker bölgedeki ilk K TM'nin kök cihazı
+# art arda başarısız olursa henüz taranmamış TM'lerden küçük bir örneği aynı anda
+# pingleyerek kesintiyi doğrular. Örneğin hiçbiri cevap vermezse bölgenin kalan
+# TM'leri problanmadan "upstream erişilemez" olarak işaretlenir (çıkarım). Örneklenen
+# TM'lerin kök cihazı zaten ölçüldüğü için bunlar çıkarım sayılmaz; örnek ping sonucu
+# o TM taranırken kök cihazın ölçümü olarak kullanılır.
+# Bölgede tek bir kök cihaz bile cevap verirse o bölge için budama yapılmaz.
+# ----------------------------------------------------------------------------------
+
+import threading
+
+PRUNE_AFTER = 3     # Art arda kök cihazı düşen TM sayısı (K)
+CONFIRM_SAMPLE = 2  # Doğrulama için pinglenen, henüz taranmamış TM sayısı
+
+# Bölge durumları
+OPEN = "ACIK"              # Henüz karar yok, taramaya devam
+HEALTHY = "SAGLAM"         # En az bir kök cihaz cevap verdi, budama yok
+CONFIRMING = "DOGRULANIYOR"
+DOWN = "ERISILEMEZ"        # Kalan TM'ler çıkarımla işaretlenir
+
+class UpstreamTracker:
+    """Tarama sırasında bölge bazında kök cihaz sonuçlarını izler (thread-safe).
+
+    confirm(ips): örnek kök IP'lerini pingler, {ip: tmprobe.PingStats} döner."""
+
+    def __init__(self, tms, root_ip, confirm, prune_after=PRUNE_AFTER, sample=CONFIRM_SAMPLE):
+        self.root_ip = root_ip
+        self.confirm = confirm
+        self.prune_after = prune_after
+        self.sample = sample
+        self.lock = threading.Lock()
+        self.pending = {}
+        for tm in tms:
+            if root_ip(tm):
+                self.pending.setdefault(tm['region'], {})[id(tm)] = tm
+        self.state = {region: OPEN for region in self.pending}
+        self.failures = dict.fromkeys(self.pending, 0)
+        self.inferred = dict.fromkeys(self.pending, 0)
+        self.sampled = {}
+        self.measured = {}  # id(tm) -> örnekte ölçülen kök cihaz ping sonucu
+
+    def begin(self, tm):
+        """TM taranmadan önce çağrılır. Bölge erişilemez olarak doğrulandıysa True (çıkarım) döner."""
+        with self.lock:
+            region = tm['region']
+            pending = self.pending.get(region)
+            if pending is None:
+                return False
+            pending.pop(id(tm), None)
+            if self.state[region] == DOWN and id(tm) not in self.measured:
+                self.inferred[region] += 1
+                return True
+            return False
+
+    def sample_result(self, tm):
+        """TM doğrulama örneğindeyse kök cihazın ölçülen ping sonucunu (bir kez) döner, değilse None."""
+        with self.lock:
+            return self.measured.pop(id(tm), None)
+
+    def report(self, tm, root_ok):
+        """TM'nin kök cihaz sonucunu işler; ilk K başarısızlıkta doğrulama örneği pingler."""
+        region = tm['region']
+        with self.lock:
+            if self.state.get(region) != OPEN:
+                return
+            if root_ok:
+                self.state[region] = HEALTHY
+                return
+            self.failures[region] += 1
+            if self.failures[region] < self.prune_after:
+                return
+            pending = list(self.pending[region].values())
+            if not pending:
+                return
+            n = len(pending)
+            if self.sample > 1:
+                picks = sorted({round(i * (n - 1) / (self.sample - 1)) for i in range(self.sample)})
+            else:
+                picks = [0]
+            sample = [pending[i] for i in picks]
+            self.state[region] = CONFIRMING
+
+        measured = self.confirm([self.root_ip(tm) for tm in sample])
+        with self.lock:
+            for tm in sample:
+                stats = measured.get(self.root_ip(tm))
+                if stats is not None:
+                    self.measured[id(tm)] = stats
+            self.sampled[region] = len(sample)
+            self.state[region] = HEALTHY if any(stats.ok for stats in measured.values()) else DOWN
+
+    def down_regions(self):
+        """Erişilemez olarak doğrulanan bölgeler: [(bölge, ölçülen başarısız TM, örnek, çıkarım TM)]"""
+        with self.lock:
+            return [(region, self.failures[region], self.sampled.get(region, 0), self.inferred[region])
+                    for region in sorted(self.state) if self.state[region] == DOWN]
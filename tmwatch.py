@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# ----------------------------------------------------------------------------------
+# TM İzleme (--watch) Yardımcıları
+#
+# Tek bir TM'yi aralıklarla sürekli pinglemek için:
+# - IcmpPinger: tek bir ICMP soketi açık tutulur, her turda tüm cihazlara echo
+#   gönderilir ve cevaplar tek select() döngüsünde toplanır (fork/exec yok).
+#   Sırasıyla yetkisiz ICMP (ping_group_range), raw soket (root) denenir; ikisi de
+#   açılamazsa her tur tmprobe.ping_many ile sistem ping'ine düşülür.
+# - DeviceWindow: cihaz başına kayan pencere (son N örnek), durum geçişleri,
+#   pencere kayıp yüzdesi ve RTT eğilimi.
+# ----------------------------------------------------------------------------------
+
+import os
+import select
+import socket
+import struct
+import time
+from collections import deque
+
+import tmprobe
+
+DEFAULT_INTERVAL = 1.0
+DEFAULT_WINDOW = 30
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+TREND_THRESHOLD = 0.2  # Pencerenin ikinci yarısı ilk yarısından %20 farklıysa eğilim var sayılır
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+class IcmpPinger:
+    """Açık tutulan tek ICMP soketiyle toplu ping. mode: 'icmp', 'raw' veya 'ping'."""
+
+    def __init__(self):
+        self.sock = None
+        self.mode = "ping"
+        self.ident = os.getpid() & 0xFFFF
+        self.seq = 0
+        for kind, mode in ((socket.SOCK_DGRAM, "icmp"), (socket.SOCK_RAW, "raw")):
+            try:
+                self.sock = socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP)
+                self.sock.setblocking(False)
+                self.mode = mode
+                break
+            except OSError:
+                continue
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def _packet(self, seq):
+        payload = struct.pack("!d", time.monotonic())
+        header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, self.ident, seq)
+        return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, _checksum(header + payload), self.ident, seq) + payload
+
+    def probe(self, ips, timeout):
+        """Tüm IP'lere birer echo gönderir. {ip: rtt_ms veya None} döner."""
+        if self.sock is None:
+            stats = tmprobe.ping_many(ips, 1, max(int(round(timeout)), 1))
+            return {ip: s.rtt_avg if s.ok else None for ip, s in stats.items()}
+
+        self.seq = (self.seq + 1) & 0xFFFF
+        results = dict.fromkeys(ips)
+        sent_at = {}
+        packet = self._packet(self.seq)
+        for ip in results:
+            try:
+                self.sock.sendto(packet, (ip, 0))
+                sent_at[ip] = time.monotonic()
+            except OSError:
+                pass
+
+        deadline = time.monotonic() + timeout
+        waiting = set(sent_at)
+        while waiting:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ready, _, _ = select.select([self.sock], [], [], remaining)
+            if not ready:
+                break
+            while True:
+                try:
+                    data, (addr, _) = self.sock.recvfrom(1024)
+                except (BlockingIOError, InterruptedError):
+                    break
+                if self.mode == "raw":
+                    data = data[(data[0] & 0x0F) * 4:]  # IP başlığını atla
+                if len(data) < 8:
+                    continue
+                msg_type, _, _, ident, seq = struct.unpack("!BBHHH", data[:8])
+                # Yetkisiz ICMP soketinde ident'i çekirdek atar, sadece seq karşılaştırılır
+                if msg_type != ICMP_ECHO_REPLY or seq != self.seq or (self.mode == "raw" and ident != self.ident):
+                    continue
+                if addr in waiting:
+                    results[addr] = (time.monotonic() - sent_at[addr]) * 1000.0
+                    waiting.discard(addr)
+        return results
+
+class DeviceWindow:
+    """Bir cihazın son N ping örneği ve durum geçmişi."""
+
+    def __init__(self, name, ip, size=DEFAULT_WINDOW):
+        self.name = name
+        self.ip = ip
+        self.samples = deque(maxlen=size)  # rtt_ms veya None (kayıp)
+        self.up = None
+        self.changed_at = None
+        self.transitions = 0
+        self.sent = 0
+        self.lost = 0
+
+    def add(self, rtt, now):
+        """Örneği ekler. Durum değiştiyse True döner (ilk örnek geçiş sayılmaz)."""
+        self.samples.append(rtt)
+        self.sent += 1
+        up = rtt is not None
+        if not up:
+            self.lost += 1
+        if up == self.up:
+            return False
+        first = self.up is None
+        self.up = up
+        self.changed_at = now
+        if first:
+            return False
+        self.transitions += 1
+        return True
+
+    @property
+    def loss(self):
+        """Pencere içindeki kayıp yüzdesi."""
+        if not self.samples:
+            return 0.0
+        return 100.0 * sum(1 for s in self.samples if s is None) / len(self.samples)
+
+    @property
+    def rtts(self):
+        return [s for s in self.samples if s is not None]
+
+    @property
+    def rtt_avg(self):
+        rtts = self.rtts
+        return sum(rtts) / len(rtts) if rtts else None
+
+    @property
+    def last_rtt(self):
+        return self.samples[-1] if self.samples else None
+
+    def trend(self):
+        """Pencerenin ikinci yarısının RTT ortalaması ilk yarısına göre: '↑', '↓' veya '→'."""
+        half = len(self.samples) // 2
+        older = [s for s in list(self.samples)[:half] if s is not None]
+        newer = [s for s in list(self.samples)[half:] if s is not None]
+        if not older or not newer:
+            return " "
+        a, b = sum(older) / len(older), sum(newer) / len(newer)
+        if b > a * (1 + TREND_THRESHOLD):
+            return "↑"
+        if b < a * (1 - TREND_THRESHOLD):
+            return "↓"
+        return "→"
+
+    def sparkline(self, width):
+        """Son örneklerin RTT grafiği. Kayıp örnekler 'x' ile gösterilir."""
+        recent = list(self.samples)[-width:]
+        rtts = [s for s in recent if s is not None]
+        if not rtts:
+            return "x" * len(recent)
+        low, high = min(rtts), max(rtts)
+        span = (high - low) or 1.0
+        top = len(SPARK_CHARS) - 1
+        return "".join("x" if s is None else SPARK_CHARS[int((s - low) / span * top)] for s in recent)